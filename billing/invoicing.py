@@ -0,0 +1,159 @@
+"""
+Set-based invoice generation for corporate customers.
+
+An invoice bills every item of the customer's COMPLETED jobs created in the
+billing period, one line item per job item. Instead of walking jobs and
+items per row, a run is:
+
+- one fetch of the billable items, from which each customer's subtotal
+  is summed (service names come from the cached pricing matrix),
+- one reservation of invoice numbers from the tenant's sequence,
+- one bulk insert of invoices and one of line items, in one transaction.
+
+Jobs that already appear on an invoice line are never billed again, and
+runs for the same tenant are serialized on the invoice sequence row, so
+repeating a run (or racing two) cannot double bill.
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from billing.models import Invoice, InvoiceLineItem, TaxConfiguration
+from core.rollups import day_start
+from core.sequences import lock_sequence, reserve_range
+from services import pricing
+
+PAYMENT_TERMS_DAYS = 30
+
+
+def billable_items(tenant_id, period_start, period_end, customer_ids=None):
+    """
+    JobItems of COMPLETED, not yet invoiced jobs created between
+    ``period_start`` and ``period_end`` (dates, inclusive), optionally for
+    some customers only.
+    """
+    from operations.models import JobItem
+
+    items = JobItem.objects.filter(
+        tenant_id=tenant_id,
+        job__status='COMPLETED',
+        job__created_at__gte=day_start(period_start),
+        job__created_at__lt=day_start(period_end + timedelta(days=1)),
+    ).exclude(
+        Exists(InvoiceLineItem.objects.filter(job_id=OuterRef('job_id')))
+    )
+    if customer_ids is not None:
+        items = items.filter(job__customer_id__in=customer_ids)
+    return items
+
+
+def generate_invoices(tenant, period_start, period_end, customer_ids=None):
+    """
+    Create one DRAFT invoice per customer with billable items in the period.
+
+    Args:
+        tenant: Tenant to bill
+        period_start, period_end: Billing period dates (inclusive)
+        customer_ids: Customers to bill; defaults to all CORPORATE customers
+
+    Returns the created invoices, in customer id order, each with a
+    ``line_item_count`` attribute.
+    """
+    if customer_ids is None:
+        from customers.models import Customer
+        customer_ids = Customer.objects.filter(tenant=tenant, customer_type='CORPORATE').values('id')
+
+    tax_config = TaxConfiguration.objects.filter(tenant=tenant, is_active=True).first()
+    tax_rate = tax_config.rate if tax_config else Decimal('0')
+    due_date = timezone.localdate() + timedelta(days=PAYMENT_TERMS_DAYS)
+
+    with transaction.atomic():
+        # Wait for any other run on this tenant before deciding what is unbilled
+        lock_sequence(tenant.id, 'invoice')
+        lines = list(
+            billable_items(tenant.id, period_start, period_end, customer_ids)
+            .order_by('job__customer_id', 'job_id', 'id')
+            .values_list('job__customer_id', 'job_id', 'service_id', 'price')
+        )
+        if not lines:
+            return []
+
+        # Subtotals come from the same rows as the line items, so the two always agree
+        subtotals = {}
+        line_counts = {}
+        for customer_id, _, _, price in lines:
+            subtotals[customer_id] = subtotals.get(customer_id, Decimal('0')) + price
+            line_counts[customer_id] = line_counts.get(customer_id, 0) + 1
+
+        numbers = reserve_range(tenant.id, 'invoice', len(subtotals))
+        invoices = []
+        for number, customer_id in zip(numbers, sorted(subtotals)):
+            subtotal = subtotals[customer_id]
+            tax_amount = subtotal * tax_rate
+            invoices.append(Invoice(
+                tenant=tenant,
+                customer_id=customer_id,
+                invoice_number=Invoice.format_number(number),
+                billing_period_start=period_start,
+                billing_period_end=period_end,
+                subtotal=subtotal,
+                tax_amount=tax_amount,
+                total=subtotal + tax_amount,
+                due_date=due_date,
+                status='DRAFT',
+            ))
+            invoices[-1].line_item_count = line_counts[customer_id]
+        Invoice.objects.bulk_create(invoices)
+
+        names = pricing.service_names(tenant.id, {service_id for _, _, service_id, _ in lines})
+        invoice_for = {invoice.customer_id: invoice for invoice in invoices}
+        InvoiceLineItem.objects.bulk_create([
+            InvoiceLineItem(
+                tenant=tenant,
+                invoice=invoice_for[customer_id],
+                job_id=job_id,
+                description=f"Job #{job_id} - {names.get(service_id, '')}",
+                amount=price,
+            )
+            for customer_id, job_id, service_id, price in lines
+        ], batch_size=1000)
+    return invoices
+
+
+def generate_invoice(tenant, customer_id, period_start, period_end):
+    """Invoice a single customer for the period; returns None when nothing is billable"""
+    invoices = generate_invoices(tenant, period_start, period_end, customer_ids=[customer_id])
+    return invoices[0] if invoices else None
+
+
+def bill_tenant(tenant_id, period_start, period_end, chunk_size=500):
+    """
+    Invoice every CORPORATE customer of one tenant for the period, ``chunk_size``
+    customers per transaction. Safe to re-run: already invoiced jobs are skipped.
+
+    Returns ``{'tenant': name, 'customers', 'invoices', 'line_items', 'seconds'}``.
+    """
+    from customers.models import Customer
+    from tenants.models import Tenant
+
+    started = time.perf_counter()
+    tenant = Tenant.objects.get(pk=tenant_id)
+    customer_ids = list(
+        Customer.objects.filter(tenant=tenant, customer_type='CORPORATE').order_by('id').values_list('id', flat=True)
+    )
+    invoices = line_items = 0
+    for offset in range(0, len(customer_ids), chunk_size):
+        chunk = generate_invoices(tenant, period_start, period_end, customer_ids[offset:offset + chunk_size])
+        invoices += len(chunk)
+        line_items += sum(invoice.line_item_count for invoice in chunk)
+    return {
+        'tenant': tenant.name,
+        'customers': len(customer_ids),
+        'invoices': invoices,
+        'line_items': line_items,
+        'seconds': time.perf_counter() - started,
+    }
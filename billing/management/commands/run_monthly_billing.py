@@ -0,0 +1,98 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from billing.invoicing import bill_tenant
+from core.parallel import run_per_tenant
+
+
+def _previous_month():
+    first_of_this_month = date.today().replace(day=1)
+    last_month_end = first_of_this_month - timedelta(days=1)
+    return last_month_end.replace(day=1), last_month_end
+
+
+def _month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        start = date(year, month, 1)
+    except ValueError:
+        raise ValueError(f'{value!r} is not a YYYY-MM month')
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+
+class Command(BaseCommand):
+    help = (
+        'Invoices every corporate customer of every tenant for a month. Tenants run in parallel '
+        'worker processes; jobs that are already on an invoice are skipped, so re-runs are safe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=_month,
+            help='Month to bill, YYYY-MM (default: previous month)',
+        )
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only bill this tenant (default: all tenants)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Worker processes; 1 runs in-process (default: 4)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Customers invoiced per transaction (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        period_start, period_end = options['month'] or _previous_month()
+        chunk_size = max(options['chunk_size'], 1)
+
+        tenants = Tenant.objects.all()
+        if options['subdomain']:
+            tenants = tenants.filter(subdomain=options['subdomain'])
+            if not tenants.exists():
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+        tenant_ids = list(tenants.values_list('id', flat=True))
+
+        self.stdout.write(f'Billing {len(tenant_ids)} tenant(s) for {period_start} to {period_end}')
+        started = time.perf_counter()
+        results = []
+        failures = 0
+
+        for tenant_id, result, error in run_per_tenant(
+            bill_tenant, tenant_ids, (period_start, period_end, chunk_size), workers=options['workers']
+        ):
+            if error is not None:
+                failures += 1
+                self.stderr.write(self.style.ERROR(f'Tenant {tenant_id} failed: {error}'))
+            else:
+                results.append(self.report(result))
+
+        elapsed = time.perf_counter() - started
+        invoices = sum(result['invoices'] for result in results)
+        line_items = sum(result['line_items'] for result in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'{invoices} invoices, {line_items} line items in {elapsed:.1f}s '
+            f'({invoices / elapsed if elapsed else 0:.1f} invoices/s, '
+            f'{line_items / elapsed if elapsed else 0:.1f} line items/s)'
+        ))
+        if failures:
+            raise CommandError(f'{failures} tenant(s) failed; re-run to retry them')
+
+    def report(self, result):
+        self.stdout.write(
+            f"  {result['tenant']}: {result['invoices']} invoices, {result['line_items']} line items "
+            f"for {result['customers']} corporate customers in {result['seconds']:.1f}s"
+        )
+        return result
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+def _trailing_number(value):
+    number = value.rsplit('-', 1)[-1]
+    return int(number) if number.isdigit() else 0
+
+
+def seed_billing_sequences(apps, schema_editor):
+    """Start receipt and invoice sequences after the highest existing number per tenant"""
+    Receipt = apps.get_model('billing', 'Receipt')
+    Invoice = apps.get_model('billing', 'Invoice')
+    TenantSequence = apps.get_model('core', 'TenantSequence')
+    for model, field, name in ((Receipt, 'receipt_number', 'receipt'), (Invoice, 'invoice_number', 'invoice')):
+        last_numbers = {}
+        for tenant_id, number in model.objects.values_list('tenant_id', field).iterator():
+            last_numbers[tenant_id] = max(last_numbers.get(tenant_id, 0), _trailing_number(number))
+        for tenant_id, last_value in last_numbers.items():
+            TenantSequence.objects.update_or_create(
+                tenant_id=tenant_id, name=name, defaults={'last_value': last_value}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_tenantsequence'),
+        ('billing', '0001_initial'),
+        ('customers', '0002_alter_car_options_alter_customer_options_and_more'),
+        ('operations', '0003_qcchecklistitem_service_visit_visitservice_and_more'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discount',
+            name='code',
+            field=models.CharField(blank=True, help_text='Unique code for coupons', max_length=20, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='discount',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='discount',
+            name='max_redemptions',
+            field=models.PositiveIntegerField(blank=True, help_text='Max total uses. Leave blank for unlimited.', null=True),
+        ),
+        migrations.AddField(
+            model_name='discount',
+            name='min_purchase_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='discount',
+            name='times_redeemed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='invoice_number',
+            field=models.CharField(blank=True, help_text='Auto-generated, unique per tenant', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='receipt',
+            name='receipt_number',
+            field=models.CharField(blank=True, help_text='Auto-generated, unique per tenant', max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('tenant', 'invoice_number'), name='unique_invoice_number_per_tenant'),
+        ),
+        migrations.AddConstraint(
+            model_name='receipt',
+            constraint=models.UniqueConstraint(fields=('tenant', 'receipt_number'), name='unique_receipt_number_per_tenant'),
+        ),
+        migrations.RunPython(seed_billing_sequences, migrations.RunPython.noop),
+    ]
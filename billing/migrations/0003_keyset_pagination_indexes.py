@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_discount_fields_and_per_tenant_numbers'),
+        ('operations', '0004_visit_ticket_per_tenant'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['tenant', 'payment_date', 'id'], name='payment_tenant_date_idx'),
+        ),
+    ]
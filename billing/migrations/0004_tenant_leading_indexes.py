@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:10
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built and dropped without locking out writes to the tables
+    atomic = False
+
+    dependencies = [
+        ('billing', '0003_keyset_pagination_indexes'),
+        ('operations', '0005_keyset_pagination_indexes'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(fields=['tenant', 'payment_method', 'payment_date'], name='payment_tenant_method_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='receipt',
+            index=models.Index(fields=['tenant', 'issued_date', 'id'], name='receipt_tenant_issued_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from core.models import TenantAwareModel
+from core.sequences import next_value
 from customers.models import Customer
 from operations.models import Job
 
@@ -42,7 +43,7 @@ class Discount(TenantAwareModel):
 
 class Receipt(TenantAwareModel):
     job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='receipt')
-    receipt_number = models.CharField(max_length=50, unique=True)
+    receipt_number = models.CharField(max_length=50, blank=True, help_text="Auto-generated, unique per tenant")
     
     # Financial breakdown
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
@@ -52,9 +53,22 @@ class Receipt(TenantAwareModel):
     
     issued_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'receipt_number'], name='unique_receipt_number_per_tenant'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'issued_date', 'id'], name='receipt_tenant_issued_idx'),
+        ]
+
     def __str__(self):
         return f"Receipt #{self.receipt_number} - ${self.total}"
 
+    def save(self, *args, **kwargs):
+        if not self.receipt_number:
+            self.receipt_number = f"RCP-{next_value(self.tenant_id, 'receipt'):06d}"
+        super().save(*args, **kwargs)
+
 class Invoice(TenantAwareModel):
     STATUS_CHOICES = (
         ('DRAFT', 'Draft'),
@@ -65,7 +79,7 @@ class Invoice(TenantAwareModel):
     )
     
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='invoices')
-    invoice_number = models.CharField(max_length=50, unique=True)
+    invoice_number = models.CharField(max_length=50, blank=True, help_text="Auto-generated, unique per tenant")
     
     # Billing period
     billing_period_start = models.DateField()
@@ -82,9 +96,23 @@ class Invoice(TenantAwareModel):
     due_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'invoice_number'], name='unique_invoice_number_per_tenant'),
+        ]
+
     def __str__(self):
         return f"Invoice #{self.invoice_number} - {self.customer} (${self.total})"
 
+    @staticmethod
+    def format_number(value):
+        return f"INV-{timezone.now().strftime('%Y%m')}-{value:03d}"
+
+    def save(self, *args, **kwargs):
+        if not self.invoice_number:
+            self.invoice_number = self.format_number(next_value(self.tenant_id, 'invoice'))
+        super().save(*args, **kwargs)
+
 class InvoiceLineItem(TenantAwareModel):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='line_items')
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='invoice_line_items')
@@ -113,6 +141,13 @@ class Payment(TenantAwareModel):
     transaction_reference = models.CharField(max_length=100, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pages of the payment list (core.pagination)
+            models.Index(fields=['tenant', 'payment_date', 'id'], name='payment_tenant_date_idx'),
+            models.Index(fields=['tenant', 'payment_method', 'payment_date'], name='payment_tenant_method_idx'),
+        ]
+
     def __str__(self):
         if self.job:
             return f"Payment for Job #{self.job.id} - ${self.amount}"
@@ -1,15 +1,16 @@
 from rest_framework import serializers
 from billing.models import Receipt, Invoice, InvoiceLineItem, Payment, TaxConfiguration, Discount
+from core.serializers import TenantModelSerializer
 
 
-class TaxConfigurationSerializer(serializers.ModelSerializer):
+class TaxConfigurationSerializer(TenantModelSerializer):
     class Meta:
         model = TaxConfiguration
         fields = ['id', 'name', 'rate', 'is_active', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class DiscountSerializer(serializers.ModelSerializer):
+class DiscountSerializer(TenantModelSerializer):
     class Meta:
         model = Discount
         fields = [
@@ -20,7 +21,7 @@ class DiscountSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ReceiptSerializer(serializers.ModelSerializer):
+class ReceiptSerializer(TenantModelSerializer):
     customer_name = serializers.SerializerMethodField()
     job_id = serializers.IntegerField(source='job.id', read_only=True)
     
@@ -38,14 +39,14 @@ class ReceiptSerializer(serializers.ModelSerializer):
         return f"{customer.first_name} {customer.last_name}"
 
 
-class InvoiceLineItemSerializer(serializers.ModelSerializer):
+class InvoiceLineItemSerializer(TenantModelSerializer):
     class Meta:
         model = InvoiceLineItem
         fields = ['id', 'job', 'description', 'amount']
         read_only_fields = ['id']
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(TenantModelSerializer):
     customer_name = serializers.SerializerMethodField()
     company_name = serializers.SerializerMethodField()
     line_items = InvoiceLineItemSerializer(many=True, read_only=True)
@@ -70,7 +71,7 @@ class InvoiceSerializer(serializers.ModelSerializer):
         return None
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(TenantModelSerializer):
     customer_name = serializers.SerializerMethodField()
     reference_type = serializers.SerializerMethodField()
     reference_id = serializers.SerializerMethodField()
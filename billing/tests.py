@@ -1,3 +1,184 @@
-from django.test import TestCase
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from billing.invoicing import bill_tenant, generate_invoices
+from billing.management.commands.run_monthly_billing import _month
+from billing.models import Invoice, InvoiceLineItem, TaxConfiguration
+from core.parallel import run_per_tenant
+from core.sequences import reset_blocks
+from customers.models import Car, Customer
+from operations.models import Job, JobItem
+from services import pricing
+from services.models import Category, Service
+from tenants.models import Tenant
+from users.models import User
+
+
+def make_billable_tenant(subdomain, jobs=1):
+    """A tenant with one corporate customer and ``jobs`` COMPLETED jobs of 100.00 this month"""
+    tenant = Tenant.objects.create(name=f'{subdomain.title()} Car Spa', subdomain=subdomain)
+    category = Category.objects.create(tenant=tenant, name='Wash')
+    service = Service.objects.create(
+        tenant=tenant, category=category, name='Fleet wash', price=Decimal('100.00'), duration_minutes=30
+    )
+    customer = Customer.objects.create(
+        tenant=tenant, customer_type='CORPORATE', company_name='Fleet PLC', phone_number='+251900000001'
+    )
+    car = Car.objects.create(tenant=tenant, customer=customer, plate_number=f'{subdomain}-1')
+    for _ in range(jobs):
+        job = Job.objects.create(tenant=tenant, customer=customer, car=car, status='COMPLETED')
+        JobItem.objects.create(tenant=tenant, job=job, service=service, price=Decimal('100.00'))
+    return tenant, customer
+
+
+def this_month():
+    return _month(timezone.localdate().strftime('%Y-%m'))
+
+
+class InvoicingTests(TestCase):
+    """Corporate customers are invoiced once per job, with gapless numbers and taxed totals"""
+
+    def setUp(self):
+        cache.clear()
+        reset_blocks()
+        self.tenant, self.first = make_billable_tenant('test')
+        TaxConfiguration.objects.create(tenant=self.tenant, name='VAT', rate=Decimal('0.15'))
+        self.period = this_month()
+
+        self.service = Service.objects.get(tenant=self.tenant)
+        self.second = self.customer('CORPORATE', '+251911000002')
+        self.job(self.second, Decimal('100.00'), Decimal('250.00'))
+        # Not billed: an individual customer, an unfinished job and last month's job
+        self.job(self.customer('INDIVIDUAL', '+251911000003'), Decimal('80.00'))
+        self.job(self.second, Decimal('60.00'), status='IN_PROGRESS')
+        earlier = self.job(self.second, Decimal('40.00'))
+        Job.objects.filter(pk=earlier.pk).update(created_at=timezone.now() - timedelta(days=40))
+
+    def customer(self, customer_type, phone_number):
+        return Customer.objects.create(
+            tenant=self.tenant, customer_type=customer_type, company_name='Fleet PLC', phone_number=phone_number
+        )
+
+    def job(self, customer, *prices, status='COMPLETED'):
+        car = Car.objects.create(tenant=self.tenant, customer=customer, plate_number=f'AB-{Car.objects.count()}')
+        job = Job.objects.create(tenant=self.tenant, customer=customer, car=car, status=status)
+        for price in prices:
+            JobItem.objects.create(tenant=self.tenant, job=job, service=self.service, price=price)
+        return job
+
+    def test_totals_and_line_items(self):
+        invoices = generate_invoices(self.tenant, *self.period)
+        self.assertEqual(
+            [(invoice.customer_id, invoice.subtotal, invoice.tax_amount, invoice.total, invoice.line_item_count)
+             for invoice in invoices],
+            [
+                (self.first.id, Decimal('100.00'), Decimal('15.00'), Decimal('115.00'), 1),
+                (self.second.id, Decimal('350.00'), Decimal('52.50'), Decimal('402.50'), 2),
+            ],
+        )
+        for invoice in Invoice.objects.filter(tenant=self.tenant):
+            self.assertEqual(sum(line.amount for line in invoice.line_items.all()), invoice.subtotal)
+
+    def test_services_missing_from_the_cached_matrix_are_named(self):
+        pricing.get_matrix(self.tenant.id)
+        # bulk_create skips the signals that retire the matrix, as a write
+        # whose invalidation has not reached this worker would
+        self.service = Service.objects.bulk_create([Service(
+            tenant=self.tenant, category=self.service.category, name='Engine bay', price=Decimal('70.00'),
+            duration_minutes=30,
+        )])[0]
+        job = self.job(self.first, Decimal('70.00'))
+
+        generate_invoices(self.tenant, *self.period)
+
+        self.assertEqual(InvoiceLineItem.objects.get(job=job).description, f'Job #{job.id} - Engine bay')
+
+    def test_reruns_skip_jobs_already_invoiced(self):
+        generate_invoices(self.tenant, *self.period)
+        self.assertEqual(generate_invoices(self.tenant, *self.period), [])
+
+        # Only the job completed since is billed
+        job = self.job(self.second, Decimal('70.00'))
+        [invoice] = generate_invoices(self.tenant, *self.period)
+        self.assertEqual(invoice.subtotal, Decimal('70.00'))
+        self.assertEqual(list(InvoiceLineItem.objects.filter(invoice=invoice).values_list('job_id', flat=True)), [job.id])
+
+    def test_numbers_are_gapless(self):
+        class Abort(Exception):
+            pass
+
+        # A rolled back run gives its reserved numbers back
+        with self.assertRaises(Abort), transaction.atomic():
+            generate_invoices(self.tenant, *self.period)
+            raise Abort
+        generate_invoices(self.tenant, *self.period, customer_ids=[self.first.id])
+        generate_invoices(self.tenant, *self.period)
+        single = Invoice.objects.create(
+            tenant=self.tenant, customer=self.first, billing_period_start=self.period[0],
+            billing_period_end=self.period[1], subtotal=0, total=0, due_date=self.period[1],
+        )
+        prefix = Invoice.format_number(0)[:-3]
+        self.assertEqual(
+            list(Invoice.objects.filter(tenant=self.tenant).order_by('invoice_number').values_list('invoice_number', flat=True)),
+            [f'{prefix}001', f'{prefix}002', f'{prefix}003'],
+        )
+        self.assertEqual(single.invoice_number, f'{prefix}003')
+
+    def test_generate_batch_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create_user(username='owner', password='testpass123', tenant=self.tenant, role='OWNER')
+        )
+        start, end = (day.isoformat() for day in self.period)
+        response = client.post('/api/v1/invoices/generate-batch/', {'period_start': start, 'period_end': end})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([invoice['total'] for invoice in response.data['invoices']], ['115.00', '402.50'])
+        self.assertEqual(len(response.data['invoices'][1]['line_items']), 2)
+
+        response = client.post('/api/v1/invoices/generate-batch/', {'period_start': start, 'period_end': end})
+        self.assertEqual(response.data['count'], 0)
+        response = client.post('/api/v1/invoices/generate-batch/', {'period_start': start})
+        self.assertEqual(response.status_code, 400)
+
+
+class MonthlyBillingFanOutTests(TransactionTestCase):
+    """Tenants are billed in-process or in spawned workers, and one failure spares the rest"""
+
+    def setUp(self):
+        cache.clear()
+        self.first, _ = make_billable_tenant('first')
+        self.second, _ = make_billable_tenant('second', jobs=2)
+
+    def test_in_process_run_reports_failing_tenants_and_continues(self):
+        period = this_month()
+        missing = uuid.uuid4()
+        outcomes = {
+            tenant_id: (result, error)
+            for tenant_id, result, error in run_per_tenant(
+                bill_tenant, [missing, self.first.id, self.second.id], period
+            )
+        }
+        self.assertIsInstance(outcomes[missing][1], Tenant.DoesNotExist)
+        self.assertEqual(outcomes[self.first.id][0]['line_items'], 1)
+        self.assertEqual(outcomes[self.second.id][0]['line_items'], 2)
+
+    @skipUnless(connection.vendor == 'postgresql', "Spawned workers cannot open SQLite's in-memory test database")
+    def test_spawned_workers_bill_every_tenant(self):
+        out = StringIO()
+        call_command('run_monthly_billing', f'--month={timezone.localdate():%Y-%m}', '--workers=2', stdout=out)
+        self.assertIn('2 invoices, 3 line items', out.getvalue())
+        self.assertEqual(
+            sorted(Invoice.objects.values_list('tenant__subdomain', 'total')),
+            [('first', Decimal('100.00')), ('second', Decimal('200.00'))],
+        )
@@ -2,10 +2,9 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.utils import timezone
-from datetime import timedelta
-from decimal import Decimal
-from billing.models import Receipt, Invoice, InvoiceLineItem, Payment, TaxConfiguration, Discount
+from datetime import date
+from billing.models import Receipt, Invoice, Payment, TaxConfiguration, Discount
+from billing import invoicing
 from billing.serializers import (
     ReceiptSerializer, InvoiceSerializer, PaymentSerializer,
     TaxConfigurationSerializer, DiscountSerializer
@@ -27,9 +26,7 @@ class ReceiptViewSet(viewsets.ModelViewSet):
     ordering = ['-issued_date']
     
     def get_queryset(self):
-        return Receipt.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('job__customer')
+        return Receipt.objects.select_related('job__customer')
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -56,12 +53,10 @@ class ReceiptViewSet(viewsets.ModelViewSet):
             message=message,
             receipt=receipt
         )
-        
-        # Send notification (placeholder - actual sending would happen here)
-        notification.send()
+        # Created PENDING; run_notification_worker delivers it
         
         return Response({
-            'message': f'Receipt sent via {channel}',
+            'message': f'Receipt queued for sending via {channel}',
             'notification_id': notification.id
         })
 
@@ -72,6 +67,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     
     Custom actions:
     - generate: Generate monthly invoice for corporate customer
+    - generate-batch: Generate invoices for all corporate customers for a period
     - send: Send invoice via notification
     """
     serializer_class = InvoiceSerializer
@@ -82,90 +78,70 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     ordering = ['-issued_date']
     
     def get_queryset(self):
-        return Invoice.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('customer').prefetch_related('line_items')
+        return Invoice.objects.select_related('customer').prefetch_related('line_items')
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
     
+    def _billing_period(self, request):
+        """Parse period_start/period_end (YYYY-MM-DD) from the request, or return an error Response"""
+        period_start = request.data.get('period_start')
+        period_end = request.data.get('period_end')
+        if not all([period_start, period_end]):
+            return None, None, Response(
+                {'error': 'period_start and period_end are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            period_start = date.fromisoformat(str(period_start))
+            period_end = date.fromisoformat(str(period_end))
+        except ValueError:
+            return None, None, Response(
+                {'error': 'period_start and period_end must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return period_start, period_end, None
+    
     @action(detail=False, methods=['post'])
     def generate(self, request):
         """Generate monthly invoice for a corporate customer"""
-        from operations.models import Job, JobItem
-        
         customer_id = request.data.get('customer_id')
-        period_start = request.data.get('period_start')
-        period_end = request.data.get('period_end')
-        
-        if not all([customer_id, period_start, period_end]):
+        if not customer_id:
             return Response(
                 {'error': 'customer_id, period_start, and period_end are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        period_start, period_end, error = self._billing_period(request)
+        if error:
+            return error
         
-        # Get completed jobs for this customer in the period
-        jobs = Job.objects.filter(
-            tenant=request.user.tenant,
-            customer_id=customer_id,
-            status='COMPLETED',
-            created_at__gte=period_start,
-            created_at__lte=period_end
-        ).prefetch_related('items')
-        
-        if not jobs.exists():
+        invoice = invoicing.generate_invoice(request.user.tenant, customer_id, period_start, period_end)
+        if invoice is None:
             return Response(
                 {'error': 'No completed jobs found for this period'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Calculate totals
-        subtotal = Decimal('0')
-        for job in jobs:
-            for item in job.items.all():
-                subtotal += item.price
-        
-        # Get active tax
-        tax_config = TaxConfiguration.objects.filter(
-            tenant=request.user.tenant,
-            is_active=True
-        ).first()
-        
-        tax_amount = subtotal * tax_config.rate if tax_config else Decimal('0')
-        total = subtotal + tax_amount
-        
-        # Generate invoice number
-        invoice_count = Invoice.objects.filter(tenant=request.user.tenant).count()
-        invoice_number = f"INV-{timezone.now().strftime('%Y%m')}-{invoice_count + 1:03d}"
-        
-        # Create invoice
-        invoice = Invoice.objects.create(
-            tenant=request.user.tenant,
-            customer_id=customer_id,
-            invoice_number=invoice_number,
-            billing_period_start=period_start,
-            billing_period_end=period_end,
-            subtotal=subtotal,
-            tax_amount=tax_amount,
-            total=total,
-            due_date=timezone.now().date() + timedelta(days=30),
-            status='DRAFT'
-        )
-        
-        # Create line items
-        for job in jobs:
-            for item in job.items.all():
-                InvoiceLineItem.objects.create(
-                    tenant=request.user.tenant,
-                    invoice=invoice,
-                    job=job,
-                    description=f"Job #{job.id} - {item.service.name}",
-                    amount=item.price
-                )
-        
         serializer = self.get_serializer(invoice)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'], url_path='generate-batch')
+    def generate_batch(self, request):
+        """Generate invoices for all corporate customers with completed jobs in the period"""
+        period_start, period_end, error = self._billing_period(request)
+        if error:
+            return error
+        
+        invoices = invoicing.generate_invoices(request.user.tenant, period_start, period_end)
+        invoices = Invoice.objects.filter(
+            id__in=[invoice.id for invoice in invoices]
+        ).select_related('customer').prefetch_related('line_items').order_by('id')
+        serializer = self.get_serializer(invoices, many=True)
+        return Response({
+            'count': len(serializer.data),
+            'invoices': serializer.data
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def send(self, request, pk=None):
         """Send invoice via notification"""
@@ -192,12 +168,10 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             message=message,
             invoice=invoice
         )
-        
-        # Send notification
-        notification.send()
+        # Created PENDING; run_notification_worker delivers it
         
         return Response({
-            'message': f'Invoice sent via {channel}',
+            'message': f'Invoice queued for sending via {channel}',
             'notification_id': notification.id
         })
 
@@ -269,9 +243,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
     ordering = ['-payment_date']
     
     def get_queryset(self):
-        return Payment.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('job__customer', 'invoice__customer')
+        return Payment.objects.select_related('job__customer', 'invoice__customer')
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -282,7 +254,7 @@ class TaxConfigurationViewSet(viewsets.ModelViewSet):
     serializer_class = TaxConfigurationSerializer
     
     def get_queryset(self):
-        return TaxConfiguration.objects.filter(tenant=self.request.user.tenant)
+        return TaxConfiguration.objects.all()
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -295,7 +267,7 @@ class DiscountViewSet(viewsets.ModelViewSet):
     filterset_fields = ['is_active', 'discount_type']
     
     def get_queryset(self):
-        return Discount.objects.filter(tenant=self.request.user.tenant)
+        return Discount.objects.all()
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -12,10 +12,14 @@ from billing.views import (
     TaxConfigurationViewSet, DiscountViewSet
 )
 from loyalty.views import CustomerLoyaltyViewSet, RedemptionOptionViewSet, LoyaltyTierViewSet
-from notifications.views import NotificationViewSet, NotificationChannelViewSet, SystemNotificationViewSet, RoleNotificationPreferenceViewSet
+from notifications.views import (
+    NotificationViewSet, NotificationChannelViewSet, NotificationRetentionPolicyViewSet,
+    SystemNotificationViewSet, RoleNotificationPreferenceViewSet
+)
 from tenants.views import ShopViewSet, TenantViewSet
 from car_references.views import CarMakeViewSet, CarModelViewSet
 from core.views import DashboardStatsView
+from notifications.streams import notification_stream
 
 # Create router and register viewsets
 router = DefaultRouter()
@@ -47,10 +51,13 @@ router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'notification-channels', NotificationChannelViewSet, basename='notificationchannel')
 router.register(r'system-notifications', SystemNotificationViewSet, basename='system-notification')
 router.register(r'role-notification-preferences', RoleNotificationPreferenceViewSet, basename='role-notification-preferences')
+router.register(r'notification-retention', NotificationRetentionPolicyViewSet, basename='notification-retention')
 router.register(r'shops', ShopViewSet, basename='shop')
 router.register(r'tenants', TenantViewSet, basename='tenant')
 
 urlpatterns = [
+    # Before the router, whose detail routes would otherwise match 'stream'
+    path('system-notifications/stream/', notification_stream, name='system-notification-stream'),
     path('', include(router.urls)),
     path('dashboard/stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
 ]
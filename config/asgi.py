@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve through an ASGI server (e.g. ``uvicorn config.asgi:application``) so
+the system notification stream (notifications.streams) holds no worker
+thread per connected user.
 """
 
 import os
@@ -69,6 +69,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.TenantContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -112,6 +113,29 @@ DATABASES = {
 }
 
 
+# Cache
+# The pricing matrix, notification preferences, loyalty tiers and tenants are
+# cached and invalidated through the default cache, so every worker process
+# must share it: set REDIS_URL wherever more than one process serves requests
+# (production.py requires it). Without it each process gets its own LocMemCache.
+
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -160,7 +184,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.TenantJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -173,7 +197,8 @@ REST_FRAMEWORK = {
         'anon': '100/day',
         'user': '1000/day'
     },
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page numbers, or keyset pages with ?pagination=cursor
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.SelectablePagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -189,8 +214,13 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Adds tenant_id and role claims (read by core.middleware.TenantContextMiddleware)
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.TenantTokenObtainPairSerializer',
 }
 
+# Seconds Tenant rows used for authentication stay cached (core.tenancy)
+TENANT_CACHE_TIMEOUT = 300
+
 # drf-spectacular Settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Car Spa CRM API',
@@ -200,6 +230,35 @@ SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
 
+# Per-tenant number sequences (core.sequences)
+# Numbers reserved per worker process for each sequence; 1 keeps numbering gapless
+SEQUENCE_BLOCK_SIZES = {
+    'visit': 1,
+    'receipt': 1,
+    'invoice': 1,
+}
+
+# Customer notification delivery (notifications.dispatch)
+# Adapter class per channel; channels not listed use notifications.adapters.FakeAdapter
+NOTIFICATION_ADAPTERS = {}
+# Deliveries in flight per channel in each worker process
+NOTIFICATION_CONCURRENCY = {
+    'WHATSAPP': 10,
+    'TELEGRAM': 10,
+    'EMAIL': 20,
+    'SMS': 5,
+}
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BASE_SECONDS = 30
+
+# Real-time system notification streams (notifications.realtime)
+# InMemoryBroker serves a single ASGI node; multi-node deployments need a shared broker
+NOTIFICATION_BROKER = 'notifications.realtime.InMemoryBroker'
+
+# Notification retention (notifications.retention); purged rows of tenants
+# whose policy archives to files are written here
+NOTIFICATION_ARCHIVE_DIR = BASE_DIR / 'archive' / 'notifications'
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
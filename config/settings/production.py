@@ -1,4 +1,11 @@
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 
 DEBUG = False
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
+
+# Cached data is invalidated through the default cache; a per-process
+# LocMemCache would leave every other worker serving stale entries
+if not REDIS_URL:
+    raise ImproperlyConfigured('REDIS_URL must point at a Redis server shared by all worker processes')
@@ -0,0 +1,35 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core import tenancy
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that attaches the user's tenant from the cache
+    instead of joining it on every request, and rejects tokens whose
+    ``tenant_id`` claim no longer matches the user's tenant.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = tenancy.get_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        claimed = validated_token.get('tenant_id')
+        if claimed is not None and tenancy.parse_tenant_id(claimed) != user.tenant_id:
+            raise AuthenticationFailed(_('Token tenant does not match the user'), code='tenant_mismatch')
+        return user
@@ -0,0 +1,233 @@
+"""
+API benchmark harness used by the benchmark_api command.
+
+Every viewset registered on config.api_urls.router is exercised through
+the test client: list, retrieve and every GET extra action. For each route
+the harness records the query count, p50/p95 latency and response size.
+
+The committed baseline holds what does not depend on the machine: the
+status and query count of each route. Latencies only mean something
+against a run on the same machine, so they are saved (``--latency``) and
+compared only with a local baseline file. A route that answers with an
+unexpected non-2xx status fails the run whatever the baseline says.
+
+Mutating actions (POST/PUT/PATCH/DELETE) are not benchmarked.
+"""
+import gc
+import json
+import logging
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+API_PREFIX = '/api/v1/'
+
+# Routes outside the router
+EXTRA_ROUTES = [
+    ('dashboard-stats', f'{API_PREFIX}dashboard/stats/', {}),
+] + [
+    # Keyset pagination (core.pagination) of the high-volume lists
+    (f'{basename}-list-cursor', f'{API_PREFIX}{prefix}/', {'pagination': 'cursor'})
+    for prefix, basename in [
+        ('jobs', 'job'), ('visits', 'visit'), ('notifications', 'notification'),
+        ('stock-logs', 'stocklog'), ('payments', 'payment'),
+    ]
+]
+
+# Query params needed by GET actions that reject a bare request
+ACTION_PARAMS = {
+    ('customer', 'search'): {'q': 'john'},
+    ('visit', 'search'): {'q': 'john'},
+}
+
+# GET actions that write (e.g. create default rows), never benchmarked
+SKIPPED_ACTIONS = {
+    ('role-notification-preferences', 'initialize_defaults'),
+}
+
+# Routes whose seeded data makes a client error the correct answer
+EXPECTED_STATUSES = {
+    'job-qc_checklist': 400,  # the first job has not started QC
+    'loyalty-me': 404,  # the benchmark user is staff, not a loyalty customer
+}
+
+# Fields of a result that are stable across machines
+BASELINE_FIELDS = ('status', 'queries')
+LATENCY_FIELDS = ('p50_ms', 'p95_ms')
+
+
+def seed_scale(tenant, customers, rng):
+    """
+    Add ``customers`` extra customers on top of seed_all_data, each with a car,
+    a job with two items and a visit, so list endpoints have real volume.
+    """
+    from customers.models import Car, Customer
+    from operations.models import Job, JobItem, Visit
+    from services.models import Service
+
+    services = list(Service.objects.filter(tenant=tenant))
+    statuses = ['PENDING', 'IN_PROGRESS', 'QC', 'COMPLETED', 'PAID']
+    for number in range(customers):
+        customer = Customer.objects.create(
+            tenant=tenant,
+            first_name=rng.choice(['John', 'Jane', 'Abebe', 'Hana', 'Samuel']),
+            last_name=f'Bench{number}',
+            phone_number=f'+251-922-{number:06d}',
+        )
+        car = Car.objects.create(
+            tenant=tenant, customer=customer, plate_number=f'BEN-{number:06d}',
+            make_text='Toyota', model_text='Corolla', car_type='SEDAN'
+        )
+        job = Job.objects.create(tenant=tenant, customer=customer, car=car, status=rng.choice(statuses))
+        for service in rng.sample(services, min(2, len(services))):
+            JobItem.objects.create(tenant=tenant, job=job, service=service, price=service.price)
+        Visit.objects.create(
+            tenant=tenant, customer=customer, customer_name=customer.full_name,
+            car=car, car_info='Toyota Corolla', car_plate=car.plate_number,
+            phone_number=customer.phone_number
+        )
+
+
+def discover_routes(client):
+    """
+    Build ``[(name, url, params)]`` for every GET route in the router.
+    Detail routes use the first object returned by the list endpoint.
+    """
+    from config.api_urls import router
+
+    routes = []
+    skipped = []
+    for prefix, viewset, basename in router.registry:
+        list_url = f'{API_PREFIX}{prefix}/'
+        if 'get' not in viewset.http_method_names:
+            continue
+
+        routes.append((f'{basename}-list', list_url, {}))
+        pk = _first_pk(client, list_url, viewset.lookup_field)
+        if pk is not None:
+            routes.append((f'{basename}-detail', f'{list_url}{pk}/', {}))
+
+        for action in viewset.get_extra_actions():
+            name = f'{basename}-{action.url_path}'
+            if 'get' not in action.mapping or (basename, action.url_path) in SKIPPED_ACTIONS:
+                skipped.append(name)
+                continue
+            params = ACTION_PARAMS.get((basename, action.url_path), {})
+            if action.detail:
+                if pk is None:
+                    skipped.append(name)
+                    continue
+                routes.append((name, f'{list_url}{pk}/{action.url_path}/', params))
+            else:
+                routes.append((name, f'{list_url}{action.url_path}/', params))
+
+    routes.extend(EXTRA_ROUTES)
+    return routes, skipped
+
+
+def _first_pk(client, list_url, lookup_field):
+    cache.clear()
+    response = client.get(list_url)
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    items = data.get('results', []) if isinstance(data, dict) else data
+    if not items or not isinstance(items[0], dict):
+        return None
+    return items[0].get('id' if lookup_field == 'pk' else lookup_field)
+
+
+def measure_route(client, url, params, iterations):
+    """Query count, latency percentiles and size for one route"""
+    # Throttle counters live in the cache
+    cache.clear()
+    client.get(url, params)  # warm caches
+
+    timings = []
+    # Collector pauses are the main source of outliers at these sample sizes
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+
+    return {
+        'status': response.status_code,
+        'queries': len(queries.captured_queries),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'bytes': len(response.content),
+    }
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_benchmark(user, iterations=20):
+    from users.serializers import TenantTokenObtainPairSerializer
+
+    client = APIClient(raise_request_exception=False)
+    # A real bearer token, so authentication and tenant resolution are measured too
+    token = TenantTokenObtainPairSerializer.get_token(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    # 5xx responses are recorded in the results, not logged per request
+    request_logger = logging.getLogger('django.request')
+    previous_level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+    try:
+        routes, skipped = discover_routes(client)
+        results = {name: measure_route(client, url, params, iterations) for name, url, params in routes}
+    finally:
+        request_logger.setLevel(previous_level)
+    return results, skipped
+
+
+def compare(results, baseline, latency_tolerance=1.0, latency_floor_ms=10.0):
+    """
+    Return a list of regression messages. A route regresses when it answers
+    with a non-2xx status other than its EXPECTED_STATUSES entry, when it
+    issues more queries than the baseline, or, for baselines saved with
+    latencies on this machine, when its p95 grows by more than
+    ``latency_tolerance`` (fraction) and ``latency_floor_ms``.
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        if not 200 <= current['status'] < 300 and current['status'] != EXPECTED_STATUSES.get(name):
+            regressions.append(f"{name}: status {current['status']}")
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {previous['queries']} -> {current['queries']} queries")
+        if 'p95_ms' in previous:
+            allowed = max(previous['p95_ms'] * (1 + latency_tolerance), previous['p95_ms'] + latency_floor_ms)
+            if current['p95_ms'] > allowed:
+                regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_baseline(path, results, latency=False):
+    """Write the machine-independent fields of ``results``, and the latencies with ``latency``"""
+    fields = BASELINE_FIELDS + (LATENCY_FIELDS if latency else ())
+    baseline = {name: {field: result[field] for field in fields} for name, result in results.items()}
+    with open(path, 'w') as handle:
+        json.dump(baseline, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+
@@ -0,0 +1,246 @@
+"""
+Index audit of the tenant-scoped list endpoints, used by the audit_indexes
+command and the EXPLAIN tests.
+
+Every query a viewset issues starts with ``tenant = X``, then narrows by a
+filterset field and sorts by the view's ordering. For each viewset on
+config.api_urls.router the audit builds the list queryset as a tenant user
+would get it and derives the indexes that serve it:
+
+- the bare list: (tenant, ordering field),
+- each filterset field on the model itself: (tenant, field, ordering field).
+
+Boolean constants the queryset always applies (``is_deleted=False``) make
+the candidate a partial index instead of another column. Foreign key
+filters are left to the foreign key's own index, and boolean filters are too
+unselective to lead an index. A candidate is covered when an existing index
+starts with its columns.
+"""
+import json
+from dataclasses import dataclass, field as dataclass_field
+
+from django.db import connection, models
+from django.db.models.expressions import Col
+from django.db.models.lookups import Exact
+from django.db.models.sql.where import AND, WhereNode
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from core import tenancy
+
+TENANT_FIELD = 'tenant'
+
+
+@dataclass
+class Candidate:
+    """An index a viewset's list queries would use"""
+    model: type
+    fields: list
+    reason: str
+    condition: models.Q = None
+    covered_by: str = None
+
+    @property
+    def columns(self):
+        return [self.model._meta.get_field(name).column for name in self.fields]
+
+    def as_index(self):
+        """The ``models.Index`` to add to the model's Meta"""
+        name = '_'.join([self.model._meta.model_name] + self.fields) + '_idx'
+        if len(name) > models.Index.max_name_length:
+            # Fall back to Django's hashed name for long field lists
+            unnamed = models.Index(fields=self.fields, name='')
+            unnamed.set_name_with_model(self.model)
+            name = unnamed.name
+        return models.Index(fields=self.fields, condition=self.condition, name=name)
+
+
+@dataclass
+class ViewSetAudit:
+    basename: str
+    viewset: type
+    model: type = None
+    candidates: list = dataclass_field(default_factory=list)
+    skipped: str = None
+
+    @property
+    def missing(self):
+        return [candidate for candidate in self.candidates if candidate.covered_by is None]
+
+
+def audit_router(router, user):
+    """``ViewSetAudit`` of every viewset registered on ``router``, as seen by ``user``"""
+    index_cache = {}
+    # The tenant context a request by ``user`` would run in (core.tenancy)
+    with tenancy.tenant_context(user.tenant_id):
+        return [
+            audit_viewset(viewset, user, basename=basename, index_cache=index_cache)
+            for _, viewset, basename in router.registry
+        ]
+
+
+def audit_viewset(viewset, user, basename=None, index_cache=None):
+    audit = ViewSetAudit(basename=basename or viewset.__name__, viewset=viewset)
+    view = list_view(viewset, user)
+    try:
+        queryset = view.get_queryset()
+    except Exception as exc:
+        audit.skipped = f'get_queryset() failed: {exc}'
+        return audit
+
+    model = queryset.model
+    audit.model = model
+    if TENANT_FIELD not in {field.name for field in model._meta.concrete_fields}:
+        audit.skipped = 'not tenant-scoped'
+        return audit
+
+    leading, condition = base_filters(queryset)
+    if TENANT_FIELD not in leading:
+        audit.skipped = 'queryset is not filtered by tenant'
+        return audit
+    order_field = ordering_field(view, queryset)
+    order = [order_field] if order_field and order_field not in leading else []
+
+    candidates = [Candidate(model, leading + order, 'list', condition)]
+    for name in getattr(view, 'filterset_fields', None) or []:
+        filter_field = local_field(model, name)
+        if filter_field is None or filter_field.is_relation or isinstance(filter_field, models.BooleanField):
+            continue
+        if filter_field.name in leading:
+            continue
+        candidates.append(Candidate(model, leading + [filter_field.name] + order, f'filter {name}', condition))
+
+    if index_cache is None:
+        index_cache = {}
+    if model not in index_cache:
+        index_cache[model] = existing_indexes(model)
+    seen = set()
+    for candidate in candidates:
+        key = tuple(candidate.fields)
+        if key in seen:
+            continue
+        seen.add(key)
+        candidate.covered_by = covering_index(candidate.columns, index_cache[model], candidate.condition)
+        audit.candidates.append(candidate)
+    return audit
+
+
+def list_view(viewset, user):
+    """A viewset instance set up for the ``list`` action of a bare GET by ``user``"""
+    request = Request(RequestFactory().get('/'))
+    request.user = user
+    return viewset(request=request, action='list', format_kwarg=None, args=(), kwargs={})
+
+
+def base_filters(queryset):
+    """
+    ``(leading fields, condition)`` of the equality filters ``queryset``
+    always applies on its own table: the tenant first, other equalities
+    after it, and boolean constants folded into a partial-index condition.
+    """
+    model = queryset.model
+    leading = []
+    condition = None
+    for lookup in _equalities(queryset.query.where, model._meta.db_table):
+        target = lookup.lhs.target
+        if isinstance(target, models.BooleanField) and isinstance(lookup.rhs, bool):
+            term = models.Q(**{target.name: lookup.rhs})
+            condition = term if condition is None else condition & term
+        elif target.name not in leading:
+            leading.append(target.name)
+    if TENANT_FIELD in leading:
+        leading.remove(TENANT_FIELD)
+        leading.insert(0, TENANT_FIELD)
+    return leading, condition
+
+
+def _equalities(where, table):
+    if where.connector != AND or where.negated:
+        return
+    for child in where.children:
+        if isinstance(child, WhereNode):
+            yield from _equalities(child, table)
+        elif isinstance(child, Exact) and isinstance(child.lhs, Col) and child.lhs.alias == table:
+            yield child
+
+
+def ordering_field(view, queryset):
+    """Name of the local field the list is sorted by first, if any"""
+    ordering = getattr(view, 'ordering', None) or queryset.query.order_by or queryset.model._meta.ordering
+    if isinstance(ordering, str):
+        ordering = [ordering]
+    if not ordering or not isinstance(ordering[0], str):
+        return None
+    field = local_field(queryset.model, ordering[0].lstrip('-'))
+    return field.name if field is not None else None
+
+
+def local_field(model, name):
+    """The concrete field ``name`` of ``model`` itself, or None for lookups through relations"""
+    if '__' in name:
+        return None
+    try:
+        field = model._meta.get_field(name)
+    except Exception:
+        return None
+    return field if field.concrete else None
+
+
+def existing_indexes(model):
+    """
+    ``{name: (columns, condition)}`` of the indexes on ``model``'s table, from
+    the database; conditions of partial indexes come from the model's Meta.
+    """
+    conditions = {index.name: index.condition for index in model._meta.indexes}
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {
+        name: (info['columns'], conditions.get(name))
+        for name, info in constraints.items()
+        if (info['index'] or info['unique'] or info['primary_key']) and info['columns']
+    }
+
+
+def covering_index(columns, indexes, condition=None):
+    """
+    Name of an index whose leading columns are ``columns``, or None. A
+    partial index only covers queries with the same condition.
+    """
+    for name, (index_columns, index_condition) in sorted(indexes.items()):
+        if index_condition is not None and index_condition != condition:
+            continue
+        if index_columns[:len(columns)] == columns:
+            return name
+    return None
+
+
+def index_scans(queryset, seqscan=True):
+    """
+    Names of the indexes in ``queryset``'s PostgreSQL plan. With
+    ``seqscan=False`` sequential and bitmap scans are disabled for the
+    EXPLAIN, so a near-empty table shows the index the planner would walk at
+    volume rather than whichever is cheapest to read whole.
+    """
+    if connection.vendor != 'postgresql':
+        return set()
+    settings = [] if seqscan else ['enable_seqscan', 'enable_bitmapscan']
+    with connection.cursor() as cursor:
+        for setting in settings:
+            cursor.execute(f'SET {setting} = off')
+        try:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        finally:
+            for setting in settings:
+                cursor.execute(f'RESET {setting}')
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return set(_index_names(plan[0]['Plan']))
+
+
+def _index_names(node):
+    if 'Index Name' in node:
+        yield node['Index Name']
+    for child in node.get('Plans', []):
+        yield from _index_names(child)
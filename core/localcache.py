@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Cache backends whose entries live in one process and are not shared
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def shared_timeout(timeout, ttl):
+    """
+    Django cache timeout for values also held in a LocalCache of ``ttl``.
+    Invalidation only reaches other processes through a shared cache; with
+    a per-process backend the Django cache entry is as stale as the local
+    one, so it is capped at ``ttl`` to keep that the bound on staleness.
+    """
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_BACKENDS:
+        return min(timeout, ttl)
+    return timeout
+
+
+class LocalCache:
+    """
+    In-process LRU of per-tenant values whose entries expire after ``ttl``
+    seconds, so a write made through another process is picked up within
+    that time. Sits in front of the Django cache for data read on every
+    request (notification preferences, loyalty tiers); see shared_timeout
+    for how long the Django cache may keep them.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
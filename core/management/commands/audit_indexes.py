@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from users.models import User
+from core.indexes import audit_router, index_scans, list_view
+from core.tenancy import tenant_context
+
+
+class Command(BaseCommand):
+    help = (
+        'Audits the indexes behind every tenant-scoped list endpoint of the API router: '
+        'derives the (tenant, ...) composite or partial indexes its filters and ordering need '
+        'and reports the ones no existing index covers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Build the querysets for this tenant (default: a placeholder tenant)',
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only list viewsets with uncovered candidates',
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help="Also show the indexes in the PostgreSQL plan of each list query",
+        )
+        parser.add_argument(
+            '--fail-on-missing',
+            action='store_true',
+            help='Exit with an error when a candidate is not covered (for CI)',
+        )
+
+    def handle(self, *args, **options):
+        from config.api_urls import router
+
+        if options['subdomain']:
+            tenant = Tenant.objects.filter(subdomain=options['subdomain']).first()
+            if tenant is None:
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+        else:
+            tenant = Tenant(name='Index audit', subdomain='index-audit')
+        # Never saved: the querysets are only built and explained, not evaluated
+        user = User(pk=0, username='index-audit', tenant=tenant, role='OWNER', is_staff=True)
+
+        audits = audit_router(router, user)
+        missing = 0
+        for audit in audits:
+            if audit.skipped:
+                if not options['missing_only']:
+                    self.stdout.write(f'{audit.basename}: skipped ({audit.skipped})')
+                continue
+            missing += len(audit.missing)
+            if options['missing_only'] and not audit.missing:
+                continue
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{audit.basename} ({audit.model._meta.label})'
+            ))
+            for candidate in audit.candidates:
+                columns = ', '.join(candidate.fields)
+                if candidate.condition is not None:
+                    columns += f' WHERE {self.q_source(candidate.condition)}'
+                if candidate.covered_by:
+                    self.stdout.write(f'  ok       {candidate.reason}: ({columns}) -> {candidate.covered_by}')
+                else:
+                    index = candidate.as_index()
+                    self.stdout.write(self.style.WARNING(f'  missing  {candidate.reason}: ({columns})'))
+                    self.stdout.write(f'           {self.index_source(index)}')
+            if options['explain']:
+                view = list_view(audit.viewset, user)
+                with tenant_context(tenant.id):
+                    queryset = view.filter_queryset(view.get_queryset())
+                used = index_scans(queryset[:20], seqscan=False)
+                self.stdout.write(f"  plan uses: {', '.join(sorted(used)) or 'no index'}")
+
+        if missing:
+            message = f'{missing} index candidate(s) not covered'
+            if options['fail_on_missing']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every list endpoint is covered by a tenant-leading index'))
+
+    def index_source(self, index):
+        arguments = [f'fields={index.fields!r}']
+        if index.condition is not None:
+            arguments.append(f'condition=models.{self.q_source(index.condition)}')
+        arguments.append(f'name={index.name!r}')
+        return f"models.Index({', '.join(arguments)}),"
+
+    def q_source(self, q):
+        terms = ', '.join(f'{name}={value!r}' for name, value in q.children)
+        return f'Q({terms})'
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from tenants.models import Tenant
+from billing.models import Receipt
+from customers.models import Customer
+from operations.models import Job
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily dashboard rollup tables from receipts, jobs, job items and customers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only backfill this tenant (default: all tenants)',
+        )
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=date.fromisoformat,
+            help='First day to rebuild, YYYY-MM-DD (default: earliest data for the tenant)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=date.fromisoformat,
+            help='Last day to rebuild, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Number of days rebuilt per transaction (default: 31)',
+        )
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['subdomain']:
+            tenants = tenants.filter(subdomain=options['subdomain'])
+            if not tenants.exists():
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+
+        date_to = options['date_to'] or timezone.localdate()
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+
+        for tenant in tenants:
+            date_from = options['date_from'] or self.earliest_day(tenant)
+            if date_from is None:
+                self.stdout.write(f'{tenant.name}: no data, skipped')
+                continue
+
+            days_written = 0
+            chunk_start = date_from
+            while chunk_start <= date_to:
+                chunk_end = min(chunk_start + chunk - timedelta(days=1), date_to)
+                days_written += rebuild_rollups(tenant.id, chunk_start, chunk_end)
+                chunk_start = chunk_end + timedelta(days=1)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.name}: rebuilt {date_from} to {date_to} ({days_written} days with activity)'
+            ))
+
+    def earliest_day(self, tenant):
+        candidates = [
+            Receipt.objects.filter(tenant=tenant).aggregate(first=Min('issued_date'))['first'],
+            Job.objects.filter(tenant=tenant).aggregate(first=Min('created_at'))['first'],
+            Customer.objects.filter(tenant=tenant).aggregate(first=Min('created_at'))['first'],
+        ]
+        candidates = [value for value in candidates if value]
+        if not candidates:
+            return None
+        return timezone.localdate(min(candidates))
@@ -0,0 +1,109 @@
+import io
+import random
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tenants.models import Tenant
+from core import benchmarks
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'core' / 'api_benchmark_baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks every GET route of the API router on a seeded test database '
+        '(query count, p50/p95 latency, response size) and fails on error responses and on '
+        'regressions against a baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=100,
+            help='Extra customers (each with a car, job and visit) seeded on top of seed_all_data (default: 100)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Timed requests per route (default: 20)',
+        )
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            default=DEFAULT_BASELINE,
+            help=f'Baseline JSON file (default: {DEFAULT_BASELINE.name} in core/)',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Write the results as the new baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--latency',
+            action='store_true',
+            help=(
+                'Also save p50/p95 latencies with --save-baseline. Only for a local --baseline file '
+                'compared on the same machine; the committed baseline holds statuses and query counts'
+            ),
+        )
+        parser.add_argument(
+            '--latency-tolerance',
+            type=float,
+            default=1.0,
+            help='Allowed p95 growth as a fraction of a latency baseline (default: 1.0, i.e. double)',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Keep the benchmark test database between runs',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the scaled data')
+
+    def handle(self, *args, **options):
+        # Never benchmark against the real database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            results, skipped = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        for name, result in sorted(results.items()):
+            self.stdout.write(
+                f"{name:<48} {result['status']:>3} {result['queries']:>4}q "
+                f"p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms {result['bytes']:>8}B"
+            )
+        if skipped:
+            self.stdout.write(f'Skipped (mutating or no object to address): {", ".join(sorted(skipped))}')
+
+        baseline_path = options['baseline']
+        if options['save_baseline']:
+            benchmarks.save_baseline(baseline_path, results, latency=options['latency'])
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+        if not baseline_path.exists():
+            raise CommandError(f'No baseline at {baseline_path}; run with --save-baseline first')
+
+        regressions = benchmarks.compare(
+            results, benchmarks.load_baseline(baseline_path), latency_tolerance=options['latency_tolerance']
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(regression))
+            raise CommandError(f'{len(regressions)} route regression(s) against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'{len(results)} routes within baseline'))
+
+    def run(self, options):
+        subdomain = 'benchmark'
+        call_command('seed_all_data', subdomain=subdomain, stdout=io.StringIO())
+        tenant = Tenant.objects.get(subdomain=subdomain)
+        benchmarks.seed_scale(tenant, options['scale'], random.Random(options['seed']))
+        user = get_user_model().objects.get(username='testuser')
+        return benchmarks.run_benchmark(user, iterations=max(options['iterations'], 1))
@@ -0,0 +1,47 @@
+from django.utils.functional import SimpleLazyObject
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import tenancy
+
+
+class TenantContextMiddleware:
+    """
+    Opens the tenant context (core.tenancy) of each request.
+
+    The tenant id comes from the ``tenant_id`` claim of a valid bearer token
+    (users.serializers.TenantTokenObtainPairSerializer issues it), without
+    touching the database; requests without the claim fall back to the user
+    DRF authenticates. ``request.tenant`` is the Tenant itself, loaded from
+    the cache on first use.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = tenancy.TenantState(request, self.claimed_tenant_id(request))
+        request.tenant = SimpleLazyObject(lambda: self.resolve_tenant(state))
+        token = tenancy.activate(state)
+        try:
+            return self.get_response(request)
+        finally:
+            tenancy.deactivate(token)
+
+    def claimed_tenant_id(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        scheme, _, raw = header.partition(' ')
+        if scheme != 'Bearer' or not raw:
+            return None
+        try:
+            # Invalid or expired tokens are rejected by DRF authentication later
+            claims = AccessToken(raw.strip())
+        except TokenError:
+            return None
+        return tenancy.parse_tenant_id(claims.get('tenant_id'))
+
+    def resolve_tenant(self, state):
+        tenant_id = state.tenant_id
+        if tenant_id is tenancy.NO_TENANT:
+            return None
+        return tenancy.get_tenant(tenant_id)
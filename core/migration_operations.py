@@ -0,0 +1,72 @@
+"""
+Index operations for migrations on tables that stay in use while they run.
+
+On PostgreSQL ``AddIndexConcurrently`` and ``RemoveIndexConcurrently``
+build and drop the index with ``CREATE/DROP INDEX CONCURRENTLY``, so writes
+to the table carry on meanwhile; the migration must set ``atomic = False``,
+as PostgreSQL refuses concurrent index changes inside a transaction. Other
+backends have no concurrent variant and get a plain ``AddIndex`` /
+``RemoveIndex``, so migrations and test databases still build there.
+
+Unlike the operations of django.contrib.postgres these import nothing from
+the PostgreSQL backend.
+"""
+from django.db import NotSupportedError, migrations
+
+
+def _concurrently(schema_editor, operation):
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f'The {operation.__class__.__name__} operation cannot be executed inside a transaction '
+            '(set atomic = False on the migration).'
+        )
+    return True
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """AddIndex that builds the index concurrently on PostgreSQL"""
+
+    def describe(self):
+        fields = ', '.join(self.index.fields)
+        return f'Concurrently create index {self.index.name} on field(s) {fields} of model {self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor, self):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor, self):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class RemoveIndexConcurrently(migrations.RemoveIndex):
+    """RemoveIndex that drops the index concurrently on PostgreSQL"""
+
+    def describe(self):
+        return f'Concurrently remove index {self.name} from {self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor, self):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            from_model_state = from_state.models[app_label, self.model_name_lower]
+            index = from_model_state.get_index_by_name(self.name)
+            schema_editor.remove_index(model, index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor, self):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            to_model_state = to_state.models[app_label, self.model_name_lower]
+            index = to_model_state.get_index_by_name(self.name)
+            schema_editor.add_index(model, index, concurrently=True)
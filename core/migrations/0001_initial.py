@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('services', '0002_service_image_alter_service_duration_minutes_and_more'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyServiceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='services.service')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily service stats',
+                'ordering': ['date'],
+                'unique_together': {('tenant', 'date', 'service')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTenantStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('job_count', models.IntegerField(default=0)),
+                ('new_customers', models.IntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily tenant stats',
+                'ordering': ['date'],
+                'unique_together': {('tenant', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=50)),
+                ('last_value', models.BigIntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'unique_together': {('tenant', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:17
+
+import django.db.models.manager
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_tenantsequence'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='dailyservicestats',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='dailytenantstats',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='tenantsequence',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Fill DailyTenantStats and DailyServiceStats from each tenant's full
+    history, as ``backfill_dashboard_rollups`` does. A frozen copy of
+    core.rollups.rebuild_rollups, so later changes to it do not alter this
+    migration. Existing rows, bumped by core.signals since 0001, are
+    replaced.
+    """
+    Tenant = apps.get_model('tenants', 'Tenant')
+    Receipt = apps.get_model('billing', 'Receipt')
+    Customer = apps.get_model('customers', 'Customer')
+    Job = apps.get_model('operations', 'Job')
+    JobItem = apps.get_model('operations', 'JobItem')
+    DailyTenantStats = apps.get_model('core', 'DailyTenantStats')
+    DailyServiceStats = apps.get_model('core', 'DailyServiceStats')
+
+    for tenant_id in Tenant._default_manager.values_list('id', flat=True).iterator():
+        days = {}
+        revenue = (
+            Receipt._default_manager.filter(tenant_id=tenant_id)
+            .annotate(day=TruncDate('issued_date')).values('day').annotate(total=Sum('total'))
+        )
+        for row in revenue:
+            days.setdefault(row['day'], {})['revenue'] = row['total'] or Decimal('0')
+        for model, field in ((Job, 'job_count'), (Customer, 'new_customers')):
+            counts = (
+                model._default_manager.filter(tenant_id=tenant_id)
+                .annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
+            )
+            for row in counts:
+                days.setdefault(row['day'], {})[field] = row['count']
+        services = (
+            JobItem._default_manager.filter(tenant_id=tenant_id)
+            .annotate(day=TruncDate('job__created_at')).values('day', 'service_id').annotate(count=Count('id'))
+        )
+
+        DailyTenantStats._default_manager.filter(tenant_id=tenant_id).delete()
+        DailyServiceStats._default_manager.filter(tenant_id=tenant_id).delete()
+        DailyTenantStats._default_manager.bulk_create([
+            DailyTenantStats(tenant_id=tenant_id, date=day, **values) for day, values in days.items()
+        ], batch_size=1000)
+        DailyServiceStats._default_manager.bulk_create([
+            DailyServiceStats(tenant_id=tenant_id, date=row['day'], service_id=row['service_id'], count=row['count'])
+            for row in services
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_tenant_aware_managers'),
+        ('billing', '0005_tenant_aware_managers'),
+        ('customers', '0005_tenant_aware_managers'),
+        ('operations', '0007_tenant_aware_managers'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,183 @@
+import copy
+
 from django.db import models
+from django.utils import timezone
 from tenants.models import Tenant
+from core import tenancy
+
+
+class DirtyFieldsMixin:
+    """
+    Tracks field changes on model instances without re-reading the row.
+
+    Values are snapshotted when an instance is loaded (or saved), so
+    ``has_changed()`` / ``get_dirty_fields()`` can compare against them, and
+    ``save()`` on an existing row writes only the changed fields.
+
+    Models may declare ``status_timestamps`` (status value -> datetime field)
+    to have the timestamp set the first time the row moves into that status.
+    """
+    status_timestamps = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def _snapshot_fields(self, fields=None):
+        if fields is None or '_loaded_values' not in self.__dict__:
+            self._loaded_values = {}
+            fields = None
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.name not in fields and field.attname not in fields:
+                continue
+            if field.attname not in self.__dict__:
+                # Deferred field, nothing loaded to compare against
+                continue
+            value = self.__dict__[field.attname]
+            if isinstance(value, (dict, list)):
+                value = copy.deepcopy(value)
+            self._loaded_values[field.attname] = value
+
+    def get_dirty_fields(self):
+        """
+        Return ``{field_name: previous_value}`` for fields changed since the
+        instance was loaded or last saved. Unsaved instances report every field.
+        """
+        snapshot = self.__dict__.get('_loaded_values')
+        dirty = {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key:
+                continue
+            if snapshot is None:
+                dirty[field.name] = None
+            elif field.attname in snapshot:
+                if self.__dict__.get(field.attname) != snapshot[field.attname]:
+                    dirty[field.name] = snapshot[field.attname]
+            elif field.attname in self.__dict__:
+                # Deferred on load but assigned since
+                dirty[field.name] = None
+        return dirty
+
+    def has_changed(self, field_name):
+        return field_name in self.get_dirty_fields()
+
+    def previous_value(self, field_name):
+        """Value of ``field_name`` as loaded from the database"""
+        field = self._meta.get_field(field_name)
+        return self.__dict__.get('_loaded_values', {}).get(field.attname)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        is_update = not self._state.adding and '_loaded_values' in self.__dict__
+        dirty = self.get_dirty_fields() if is_update else {}
+
+        stamp_field = self.status_timestamps.get(getattr(self, 'status', None))
+        if (
+            stamp_field and not self._state.adding and 'status' in dirty
+            and getattr(self, stamp_field) is None
+            and (update_fields is None or 'status' in update_fields)
+        ):
+            setattr(self, stamp_field, timezone.now())
+            dirty[stamp_field] = None
+            if update_fields is not None:
+                update_fields = kwargs['update_fields'] = {*update_fields, stamp_field}
+
+        if is_update and update_fields is None and not args and not kwargs.get('force_insert'):
+            auto_now = {
+                field.name for field in self._meta.concrete_fields
+                if getattr(field, 'auto_now', False)
+            }
+            update_fields = kwargs['update_fields'] = set(dirty) | auto_now
+
+        super().save(*args, **kwargs)
+        self._snapshot_fields(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_fields(fields)
+
+
+class TenantAwareQuerySet(models.QuerySet):
+    def for_current_tenant(self):
+        """Filter to the tenant of the active context (core.tenancy), if any"""
+        tenant_id = tenancy.current_tenant_id()
+        if tenant_id is None:
+            return self
+        if tenant_id is tenancy.NO_TENANT:
+            return self.none()
+        return self.filter(tenant_id=tenant_id)
+
+
+class TenantAwareManager(models.Manager.from_queryset(TenantAwareQuerySet)):
+    """
+    ``objects`` of every TenantAwareModel: querysets are scoped to the tenant
+    of the current request (see core.tenancy) and unscoped outside one.
+    """
 
-class TenantAwareModel(models.Model):
+    def get_queryset(self):
+        return super().get_queryset().for_current_tenant()
+
+
+class TenantAwareModel(DirtyFieldsMixin, models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Declared first, so it stays the default manager Django uses internally
+    # (admin, validators, related managers); ``objects`` is the scoped one
+    all_objects = models.Manager()
+    objects = TenantAwareManager()
+
     class Meta:
         abstract = True
+
+
+class DailyTenantStats(TenantAwareModel):
+    """
+    Per-tenant, per-day dashboard rollup.
+    Maintained incrementally by core.signals and rebuilt by backfill_dashboard_rollups.
+    """
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    job_count = models.IntegerField(default=0)
+    new_customers = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ('tenant', 'date')
+        verbose_name_plural = 'Daily tenant stats'
+
+    def __str__(self):
+        return f"{self.tenant_id} {self.date}: {self.job_count} jobs, {self.revenue} revenue"
+
+
+class DailyServiceStats(TenantAwareModel):
+    """Per-tenant, per-day count of job items for each service (top services chart)."""
+    date = models.DateField()
+    service = models.ForeignKey('services.Service', on_delete=models.CASCADE, related_name='daily_stats')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ('tenant', 'date', 'service')
+        verbose_name_plural = 'Daily service stats'
+
+    def __str__(self):
+        return f"{self.tenant_id} {self.date}: service {self.service_id} x{self.count}"
+
+
+class TenantSequence(TenantAwareModel):
+    """
+    Per-tenant named counter used by core.sequences to hand out ticket,
+    receipt and invoice numbers.
+    """
+    name = models.CharField(max_length=50)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('tenant', 'name')
+
+    def __str__(self):
+        return f"{self.tenant_id} {self.name}: {self.last_value}"
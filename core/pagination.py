@@ -0,0 +1,177 @@
+"""
+API pagination.
+
+List endpoints paginate by page number by default (``?page=N``), which
+costs a COUNT(*) per page and an OFFSET scan that grows with the page.
+Infinite-scroll clients can instead ask for keyset pagination, with
+``?pagination=cursor`` on the first request and the returned ``next`` URL
+(which carries ``cursor``) afterwards. Each keyset page is one indexed range
+scan, whatever its depth.
+
+Keyset pages follow the list's ordering (the view's default or
+``?ordering=``) on one non-null field, with the primary key as tiebreaker;
+the (tenant, field, id) indexes of the busy tables serve them.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """``{"next": url or null, "results": [...]}`` pages keyed on (ordering field, pk)"""
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field_name, descending = self.get_ordering(queryset)
+        self.field_name = field_name
+        self.ordering_key = f"{'-' if descending else ''}{field_name}"
+
+        sign = '-' if descending else ''
+        queryset = queryset.order_by(f'{sign}{field_name}', f'{sign}pk')
+
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            value, pk = cursor
+            if descending:
+                queryset = queryset.filter(Q(**{f'{field_name}__lt': value}) | Q(**{field_name: value, 'pk__lt': pk}))
+            else:
+                queryset = queryset.filter(Q(**{f'{field_name}__gt': value}) | Q(**{field_name: value, 'pk__gt': pk}))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """``(field name, descending)`` of the queryset's first ordering term"""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        term = ordering[0] if ordering else '-pk'
+        if not isinstance(term, str):
+            raise ValidationError({'pagination': 'Cursor pagination is not available for this ordering.'})
+        descending = term.startswith('-')
+        field_name = term.lstrip('-')
+        if field_name == 'pk':
+            return 'pk', descending
+        try:
+            field = queryset.model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not field.concrete or field.null:
+            raise ValidationError({'pagination': f'Cursor pagination cannot order by {field_name}.'})
+        return field.attname, descending
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.field_name)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif not isinstance(value, (int, str)):
+            value = str(value)
+        payload = json.dumps([self.ordering_key, value, str(instance.pk)], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            ordering_key, value, pk = json.loads(payload)
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if ordering_key != self.ordering_key:
+            # The cursor belongs to a different ordering of the list
+            raise NotFound(self.invalid_cursor_message)
+        meta = model._meta
+        field = meta.pk if self.field_name == 'pk' else meta.get_field(self.field_name)
+        try:
+            return field.to_python(value), meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SelectablePagination(PageNumberPagination):
+    """
+    Page numbers by default; keyset pages (KeysetPagination) when the request
+    has ``pagination=cursor`` or a ``cursor`` parameter.
+    """
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.keyset = None
+
+    def wants_keyset(self, request):
+        params = request.query_params
+        return params.get(self.mode_query_param) == 'cursor' or KeysetPagination.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_keyset(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': "'cursor' for keyset pages ({next, results}) instead of page numbers",
+                'schema': {'type': 'string', 'enum': ['page', 'cursor']},
+            },
+            {
+                'name': KeysetPagination.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset position, from the previous page\'s next link',
+                'schema': {'type': 'string'},
+            },
+        ]
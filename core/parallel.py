@@ -0,0 +1,103 @@
+"""
+Worker processes for management commands.
+
+``run_per_tenant`` calls a function once per tenant, either in-process or
+in a pool of worker processes; ``run_in_processes`` runs copies of a
+long-lived worker loop side by side. Workers are always started with the spawn
+method, the only one available on Windows and the default on macOS, so
+they behave the same everywhere: each one sets up Django from scratch,
+shares no connections, locks or in-memory sequence blocks with the parent,
+and talks to the same databases the parent does (the test database under
+the test runner). Tenants share no rows, so they can run side by side.
+
+A failing tenant does not stop the others on either path; its exception is
+handed back with its id. A failing worker loop shows in its exit code.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+
+def _spawn_context():
+    return multiprocessing.get_context('spawn')
+
+
+def _worker_initargs():
+    """Arguments of ``_init_worker`` that point a worker at the parent's settings and databases"""
+    database_names = {alias: connections[alias].settings_dict['NAME'] for alias in connections}
+    return settings.SETTINGS_MODULE, database_names
+
+
+def _init_worker(settings_module, database_names):
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+
+    import django
+    django.setup()
+
+    for alias, name in database_names.items():
+        connections.databases[alias]['NAME'] = name
+
+
+def run_per_tenant(function, tenant_ids, args=(), workers=1):
+    """
+    Call ``function(tenant_id, *args)`` for every tenant, in ``workers``
+    processes (1 runs in-process). ``function`` must be importable by
+    dotted path, e.g. a module-level function.
+
+    Yields ``(tenant_id, result, exception)`` as tenants finish; exactly one
+    of ``result`` and ``exception`` is None.
+    """
+    tenant_ids = list(tenant_ids)
+    if workers <= 1 or len(tenant_ids) <= 1:
+        for tenant_id in tenant_ids:
+            try:
+                result = function(tenant_id, *args)
+            except Exception as exc:
+                yield tenant_id, None, exc
+            else:
+                yield tenant_id, result, None
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tenant_ids)),
+        mp_context=_spawn_context(),
+        initializer=_init_worker,
+        initargs=_worker_initargs(),
+    ) as pool:
+        futures = {pool.submit(function, tenant_id, *args): tenant_id for tenant_id in tenant_ids}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                yield futures[future], None, exc
+            else:
+                yield futures[future], result, None
+
+
+def _run_worker(initargs, function_path, args):
+    _init_worker(*initargs)
+    # Imported only now: its module may load models, which needs django.setup()
+    import_string(function_path)(*args)
+
+
+def run_in_processes(function, processes, args=()):
+    """
+    Call ``function(*args)`` in ``processes`` worker processes and wait for
+    all of them. ``function`` must be importable by dotted path. Returns the
+    workers' exit codes; a worker that raised exits with 1.
+    """
+    context = _spawn_context()
+    function_path = f'{function.__module__}.{function.__qualname__}'
+    workers = [
+        context.Process(target=_run_worker, args=(_worker_initargs(), function_path, args))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [worker.exitcode for worker in workers]
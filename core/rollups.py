@@ -0,0 +1,147 @@
+"""
+Daily dashboard rollups.
+
+DailyTenantStats and DailyServiceStats keep one row per tenant and day so the
+dashboard can answer long periods from a handful of pre-aggregated rows.
+Rows are bumped incrementally from core.signals; rebuild_rollups() recomputes
+a date range from the raw tables (backfill, or repair after an edit that
+cannot be expressed as a delta).
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import DailyTenantStats, DailyServiceStats
+
+
+def day_start(day):
+    """Aware datetime for midnight at the start of ``day`` in the current timezone"""
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def _bump(model, lookup, **deltas):
+    """Add ``deltas`` to the rollup row identified by ``lookup``, creating it if needed"""
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_revenue(tenant_id, day, amount):
+    if amount:
+        _bump(DailyTenantStats, {'tenant_id': tenant_id, 'date': day}, revenue=amount)
+
+
+def record_jobs(tenant_id, day, delta):
+    _bump(DailyTenantStats, {'tenant_id': tenant_id, 'date': day}, job_count=delta)
+
+
+def record_new_customers(tenant_id, day, delta):
+    _bump(DailyTenantStats, {'tenant_id': tenant_id, 'date': day}, new_customers=delta)
+
+
+def record_service(tenant_id, day, service_id, delta):
+    _bump(DailyServiceStats, {'tenant_id': tenant_id, 'date': day, 'service_id': service_id}, count=delta)
+
+
+def rebuild_rollups(tenant_id, date_from, date_to):
+    """
+    Recompute rollup rows for ``date_from``..``date_to`` (inclusive) from the raw tables.
+    Returns the number of DailyTenantStats rows written.
+
+    The range's rollup rows are locked before the raw tables are read: a
+    transaction that has bumped one of them commits first and is counted,
+    one that bumps later waits for the rebuild and adds its delta to the
+    new rows. A bump that creates a day's first row while the rebuild
+    writes one for the same day makes the rebuild fail instead of drift.
+    """
+    from billing.models import Receipt
+    from customers.models import Customer
+    from operations.models import Job, JobItem
+
+    range_start = day_start(date_from)
+    range_end = day_start(date_to + timedelta(days=1))
+
+    with transaction.atomic():
+        tenant_rows = DailyTenantStats.objects.filter(tenant_id=tenant_id, date__gte=date_from, date__lte=date_to)
+        service_rows = DailyServiceStats.objects.filter(tenant_id=tenant_id, date__gte=date_from, date__lte=date_to)
+        for rows in (tenant_rows, service_rows):
+            list(rows.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+        revenue = Receipt.objects.filter(
+            tenant_id=tenant_id, issued_date__gte=range_start, issued_date__lt=range_end
+        ).annotate(day=TruncDate('issued_date')).values('day').annotate(total=Sum('total'))
+
+        jobs = Job.objects.filter(
+            tenant_id=tenant_id, created_at__gte=range_start, created_at__lt=range_end
+        ).annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
+
+        customers = Customer.objects.filter(
+            tenant_id=tenant_id, created_at__gte=range_start, created_at__lt=range_end
+        ).annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
+
+        services = JobItem.objects.filter(
+            tenant_id=tenant_id, job__created_at__gte=range_start, job__created_at__lt=range_end
+        ).annotate(day=TruncDate('job__created_at')).values('day', 'service_id').annotate(count=Count('id'))
+
+        days = {}
+        for row in revenue:
+            days.setdefault(row['day'], {})['revenue'] = row['total'] or Decimal('0')
+        for row in jobs:
+            days.setdefault(row['day'], {})['job_count'] = row['count']
+        for row in customers:
+            days.setdefault(row['day'], {})['new_customers'] = row['count']
+
+        tenant_rows.delete()
+        service_rows.delete()
+        DailyTenantStats.objects.bulk_create([
+            DailyTenantStats(tenant_id=tenant_id, date=day, **values)
+            for day, values in days.items()
+        ])
+        DailyServiceStats.objects.bulk_create([
+            DailyServiceStats(tenant_id=tenant_id, date=row['day'], service_id=row['service_id'], count=row['count'])
+            for row in services
+        ])
+    return len(days)
+
+
+def split_period(start, end):
+    """
+    Split the dashboard period ``start``..``end`` into closed days served from rollups
+    and the remaining live windows (partial first day, today and anything after it).
+
+    Returns ``(first_day, last_day, live_windows)``; ``first_day``/``last_day`` are None
+    when no complete closed day falls inside the period. ``live_windows`` is a list of
+    inclusive ``(from, to)`` datetime pairs.
+    """
+    today = timezone.localdate()
+    one_tick = timedelta(microseconds=1)
+
+    first_day = timezone.localdate(start)
+    if start > day_start(first_day):
+        first_day += timedelta(days=1)
+
+    last_day = timezone.localdate(end)
+    if end < day_start(last_day + timedelta(days=1)) - one_tick:
+        last_day -= timedelta(days=1)
+    last_day = min(last_day, today - timedelta(days=1))
+
+    if first_day > last_day:
+        return None, None, [(start, end)]
+
+    live_windows = []
+    if start < day_start(first_day):
+        live_windows.append((start, day_start(first_day) - one_tick))
+    tail_start = day_start(last_day + timedelta(days=1))
+    if end >= tail_start:
+        live_windows.append((tail_start, end))
+    return first_day, last_day, live_windows
@@ -0,0 +1,83 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from core import tenancy
+from core.models import TenantAwareModel
+
+
+def count_subquery(queryset, field):
+    """
+    Correlated ``COUNT(*)`` of the ``queryset`` rows whose ``field`` points at
+    the outer row. Unlike ``Count()`` over a join it does not multiply with
+    other annotations and needs no GROUP BY on the outer query.
+    """
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def latest_subquery(queryset, field, value_field):
+    """Correlated newest ``value_field`` of the ``queryset`` rows whose ``field`` points at the outer row"""
+    latest = queryset.filter(**{field: OuterRef('pk')}).order_by(f'-{value_field}').values(value_field)[:1]
+    return Subquery(latest)
+
+
+class AnnotatedFieldsMixin:
+    """
+    Serializer mixin for read-only values computed by the database.
+
+    Declare the expressions in ``Meta.annotated_fields`` (name -> expression,
+    or a callable returning one so models from other apps can be imported
+    lazily) and the matching read-only serializer fields. Views pass their
+    queryset through ``annotate_queryset()`` so each page is one query
+    instead of one query per row and field. Rendering an instance without
+    the annotations raises ImproperlyConfigured; DRF would otherwise drop
+    the read-only fields from the output without a word.
+    """
+
+    @classmethod
+    def annotate_queryset(cls, queryset):
+        annotations = {
+            name: expression() if callable(expression) else expression
+            for name, expression in getattr(cls.Meta, 'annotated_fields', {}).items()
+        }
+        return queryset.annotate(**annotations)
+
+    def to_representation(self, instance):
+        missing = [name for name in getattr(self.Meta, 'annotated_fields', {}) if not hasattr(instance, name)]
+        if missing:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__} renders {", ".join(missing)} from annotations; '
+                f'pass the queryset through {type(self).__name__}.annotate_queryset()'
+            )
+        return super().to_representation(instance)
+
+
+class TenantScopedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field whose choices are limited to the tenant of the current
+    context (core.tenancy), whatever manager its queryset came from.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not issubclass(queryset.model, TenantAwareModel):
+            return queryset
+        tenant_id = tenancy.current_tenant_id()
+        if tenant_id is None:
+            return queryset
+        if tenant_id is tenancy.NO_TENANT:
+            return queryset.none()
+        return queryset.filter(tenant_id=tenant_id)
+
+
+class TenantModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer whose generated related fields only accept rows of the
+    current tenant. ModelSerializer builds them from the related model's
+    default manager, the unscoped ``all_objects``.
+    """
+    serializer_related_field = TenantScopedPrimaryKeyRelatedField
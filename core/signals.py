@@ -0,0 +1,111 @@
+"""
+Signal receivers that keep the dashboard rollups (core.rollups) in step with
+Receipt, Job, JobItem and Customer writes, and drop cached Tenant rows
+(core.tenancy) when they change.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from billing.models import Receipt
+from customers.models import Customer
+from operations.models import Job, JobItem
+from tenants.models import Tenant
+from core import rollups, tenancy
+
+
+def _tenant_deleted(origin):
+    """Rollup rows cascade with the tenant, so there is nothing to adjust"""
+    return isinstance(origin, Tenant) or getattr(origin, 'model', None) is Tenant
+
+
+def _rebuild_days(tenant_id, *days):
+    for day in set(days):
+        rollups.rebuild_rollups(tenant_id, day, day)
+
+
+def _job_day(job_id):
+    """Day the job was created, without loading it"""
+    created_at = Job.all_objects.filter(pk=job_id).values_list('created_at', flat=True).first()
+    return timezone.localdate(created_at) if created_at else None
+
+
+@receiver(post_save, sender=Receipt)
+def receipt_saved(sender, instance, created, update_fields=None, **kwargs):
+    day = timezone.localdate(instance.issued_date)
+    if created:
+        rollups.record_revenue(instance.tenant_id, day, instance.total)
+    elif update_fields is None or {'total', 'issued_date'} & set(update_fields):
+        # Recompute the day, and the day the receipt moved from; the snapshot
+        # (core.models.DirtyFieldsMixin) is only refreshed after post_save
+        days = [day]
+        previous = instance.previous_value('issued_date')
+        if previous is not None:
+            days.append(timezone.localdate(previous))
+        _rebuild_days(instance.tenant_id, *days)
+
+
+@receiver(post_delete, sender=Receipt)
+def receipt_deleted(sender, instance, origin=None, **kwargs):
+    if _tenant_deleted(origin):
+        return
+    rollups.record_revenue(instance.tenant_id, timezone.localdate(instance.issued_date), -instance.total)
+
+
+@receiver(post_save, sender=Job)
+def job_saved(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_jobs(instance.tenant_id, timezone.localdate(instance.created_at), 1)
+
+
+@receiver(post_delete, sender=Job)
+def job_deleted(sender, instance, origin=None, **kwargs):
+    if _tenant_deleted(origin):
+        return
+    rollups.record_jobs(instance.tenant_id, timezone.localdate(instance.created_at), -1)
+
+
+@receiver(post_save, sender=JobItem)
+def job_item_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not {'service', 'job'} & set(update_fields):
+        return
+    day = _job_day(instance.job_id)
+    if created:
+        rollups.record_service(instance.tenant_id, day, instance.service_id, 1)
+    else:
+        days = [day]
+        previous_job_id = instance.previous_value('job')
+        if previous_job_id is not None and previous_job_id != instance.job_id:
+            days.append(_job_day(previous_job_id))
+        _rebuild_days(instance.tenant_id, *(day for day in days if day is not None))
+
+
+@receiver(post_delete, sender=JobItem)
+def job_item_deleted(sender, instance, origin=None, **kwargs):
+    if _tenant_deleted(origin):
+        return
+    day = _job_day(instance.job_id)
+    if day is None:
+        # The job row is already gone, so the day is unknown
+        return
+    rollups.record_service(instance.tenant_id, day, instance.service_id, -1)
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_new_customers(instance.tenant_id, timezone.localdate(instance.created_at), 1)
+
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted(sender, instance, origin=None, **kwargs):
+    if _tenant_deleted(origin):
+        return
+    rollups.record_new_customers(instance.tenant_id, timezone.localdate(instance.created_at), -1)
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def tenant_changed(sender, instance, **kwargs):
+    tenancy.forget_tenant(instance.pk)
+
@@ -0,0 +1,147 @@
+"""
+Request-scoped tenant context.
+
+TenantContextMiddleware opens a context for every request. The tenant is
+resolved once: from the ``tenant_id`` claim of the bearer token when there
+is one (no query at all), otherwise from the authenticated user. Querysets
+from ``TenantAwareModel.objects`` (core.models.TenantAwareManager) are
+filtered to that tenant, and so are the related-field choices of
+serializers built on core.serializers.TenantModelSerializer. An
+authenticated user without a tenant, or an anonymous request, sees no
+tenant-scoped rows at all.
+
+The default manager, ``all_objects``, stays unscoped, and with it
+everything Django and DRF reach through ``_default_manager``: the admin,
+``get_object_or_404(Model, ...)``, model and unique validators, and
+related fields declared with an explicit ``all_objects`` queryset. Code
+on those paths still filters by tenant itself.
+
+Outside a request (management commands, the notification worker, the shell)
+there is no context and querysets are unscoped, unless code opts in with
+``tenant_context(tenant_id)``.
+
+Tenant rows are cached (``get_tenant``) and dropped from the shared cache
+by core.signals when they change. Users are read on every request
+(``get_user``).
+"""
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Stands for "a request without a tenant": scoped querysets are empty
+NO_TENANT = object()
+
+_current = ContextVar('current_tenant', default=None)
+
+
+class TenantState:
+    """
+    The tenant of one request. ``tenant_id`` comes from the token claim when
+    the middleware found one, else from the user DRF authenticated (DRF sets
+    it on the underlying HttpRequest), read when first needed.
+    """
+
+    def __init__(self, request=None, tenant_id=None):
+        self.request = request
+        self.claim_tenant_id = tenant_id
+
+    @property
+    def tenant_id(self):
+        if self.claim_tenant_id is not None:
+            return self.claim_tenant_id
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated or user.tenant_id is None:
+            return NO_TENANT
+        return user.tenant_id
+
+
+def current_tenant_id():
+    """
+    The tenant id of the current context, ``NO_TENANT`` for a request
+    without one, or None when no context is active (unscoped).
+    """
+    state = _current.get()
+    return state.tenant_id if state is not None else None
+
+
+def activate(state):
+    """Make ``state`` current; returns the token for ``deactivate``"""
+    return _current.set(state)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def tenant_context(tenant_id):
+    """Scope ``TenantAwareModel.objects`` to ``tenant_id`` inside the block"""
+    token = activate(TenantState(tenant_id=tenant_id if tenant_id is not None else NO_TENANT))
+    try:
+        yield
+    finally:
+        deactivate(token)
+
+
+@contextmanager
+def unscoped():
+    """Suspend the current tenant context, e.g. for cross-tenant lookups in a request"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def parse_tenant_id(value):
+    """The UUID in a ``tenant_id`` token claim, or None when it is missing or malformed"""
+    if not value:
+        return None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _tenant_key(tenant_id):
+    return f'tenancy:tenant:{tenant_id}'
+
+
+def get_tenant(tenant_id):
+    """The Tenant with ``tenant_id`` from the cache, loading it on a miss; None if it does not exist"""
+    from tenants.models import Tenant
+
+    key = _tenant_key(tenant_id)
+    tenant = cache.get(key)
+    if tenant is None:
+        tenant = Tenant.objects.filter(pk=tenant_id).first()
+        if tenant is None:
+            return None
+        cache.set(key, tenant, getattr(settings, 'TENANT_CACHE_TIMEOUT', 300))
+    return tenant
+
+
+def get_user(user_id):
+    """
+    The User with ``user_id``, with its tenant attached from get_tenant();
+    None if it does not exist. The user is read on every call: its
+    ``is_active``, role and password decide authentication and must not be
+    served stale.
+    """
+    from django.contrib.auth import get_user_model
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None:
+        return None
+    if user.tenant_id is not None:
+        tenant = get_tenant(user.tenant_id)
+        if tenant is not None:
+            user.tenant = tenant
+    return user
+
+
+def forget_tenant(tenant_id):
+    cache.delete(_tenant_key(tenant_id))
@@ -1,3 +1,585 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, reset_queries, transaction
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from billing.models import Payment, Receipt
+from config.api_urls import router
+from core.indexes import audit_router, index_scans
+from core import rollups
+from core.localcache import shared_timeout
+from core.models import DailyServiceStats, DailyTenantStats
+from core.serializers import TenantModelSerializer
+from core.tenancy import NO_TENANT, TenantState, activate, deactivate, tenant_context
+from customers.models import Car, Customer
+from inventory.models import StockLog
+from notifications.models import NotificationChannel
+from operations.models import Job, JobItem, JobTask, Visit
+from services.models import Category, Service
+from tenants.models import Tenant
+from users.models import User
+from users.serializers import TenantTokenObtainPairSerializer
+
+
+class SharedTimeoutTests(SimpleTestCase):
+    """Values behind a LocalCache stay in a per-process Django cache no longer than the local TTL"""
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_capped_at_the_local_ttl(self):
+        self.assertEqual(shared_timeout(3600, 30), 30)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}})
+    def test_shared_cache_keeps_the_full_timeout(self):
+        self.assertEqual(shared_timeout(3600, 30), 3600)
+
+
+class DirtyFieldsTests(TestCase):
+    """Saves of loaded rows write only what changed, compared against the snapshot taken on load"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.customer = Customer.objects.create(
+            tenant=self.tenant, first_name='Abebe', last_name='Kebede', phone_number='+251911000001'
+        )
+        self.other_customer = Customer.objects.create(
+            tenant=self.tenant, first_name='Sara', last_name='Tesfaye', phone_number='+251911000002'
+        )
+        self.car = Car.objects.create(tenant=self.tenant, customer=self.customer, plate_number='AA-1234')
+
+    def save_and_capture(self, instance, **kwargs):
+        """SQL of the UPDATEs of ``instance``'s table; signal receivers may query other tables"""
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            instance.save(**kwargs)
+        prefix = f'UPDATE "{instance._meta.db_table}"'
+        return [query['sql'] for query in queries.captured_queries if query['sql'].startswith(prefix)]
+
+    def test_save_updates_only_changed_fields(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        self.assertEqual(customer.get_dirty_fields(), {})
+        customer.first_name = 'Abel'
+        self.assertEqual(customer.get_dirty_fields(), {'first_name': 'Abebe'})
+
+        [sql] = self.save_and_capture(customer)
+        self.assertIn('"first_name"', sql)
+        self.assertIn('"updated_at"', sql)
+        self.assertNotIn('"last_name"', sql)
+        self.assertNotIn('"phone_number"', sql)
+        # The save re-snapshots, so nothing is dirty afterwards
+        self.assertEqual(customer.get_dirty_fields(), {})
+        self.assertEqual(Customer.objects.get(pk=customer.pk).first_name, 'Abel')
+
+    def test_explicit_update_fields_are_respected(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        customer.first_name = 'Abel'
+        customer.last_name = 'Girma'
+        [sql] = self.save_and_capture(customer, update_fields=['last_name'])
+        self.assertNotIn('"first_name"', sql)
+        # Only the saved field is re-snapshotted
+        self.assertEqual(customer.get_dirty_fields(), {'first_name': 'Abebe'})
+
+    def test_foreign_keys_are_tracked_by_attname(self):
+        car = Car.objects.get(pk=self.car.pk)
+        car.customer = self.other_customer
+        self.assertTrue(car.has_changed('customer'))
+        self.assertEqual(car.previous_value('customer'), self.customer.pk)
+        [sql] = self.save_and_capture(car)
+        self.assertIn('"customer_id"', sql)
+        self.assertNotIn('"plate_number"', sql)
+
+        car.customer_id = self.customer.pk
+        self.assertEqual(car.get_dirty_fields(), {'customer': self.other_customer.pk})
+        car.save()
+        self.assertEqual(Car.objects.get(pk=car.pk).customer_id, self.customer.pk)
+
+    def test_deferred_fields_are_written_only_when_assigned(self):
+        customer = Customer.objects.only('first_name').get(pk=self.customer.pk)
+        self.assertEqual(customer.get_dirty_fields(), {})
+        [sql] = self.save_and_capture(customer)
+        self.assertNotIn('"last_name"', sql)
+
+        customer.last_name = 'Girma'
+        self.assertEqual(customer.get_dirty_fields(), {'last_name': None})
+        [sql] = self.save_and_capture(customer)
+        self.assertIn('"last_name"', sql)
+        self.assertNotIn('"first_name"', sql)
+        self.assertEqual(Customer.objects.get(pk=customer.pk).last_name, 'Girma')
+
+    def test_in_place_changes_to_json_fields_are_detected(self):
+        NotificationChannel.objects.create(tenant=self.tenant, channel_type='SMS', api_credentials={'token': 'a'})
+        channel = NotificationChannel.objects.get(tenant=self.tenant)
+        channel.api_credentials['token'] = 'b'
+        self.assertEqual(channel.get_dirty_fields(), {'api_credentials': {'token': 'a'}})
+        channel.save()
+        self.assertEqual(NotificationChannel.objects.get(pk=channel.pk).api_credentials, {'token': 'b'})
+
+    def test_status_timestamps_are_set_on_the_first_transition_only(self):
+        job = Job.objects.create(tenant=self.tenant, customer=self.customer, car=self.car)
+        job = Job.objects.get(pk=job.pk)
+        job.payment_method = 'CASH'
+        job.save()
+        self.assertIsNone(job.completed_at)
+
+        job.status = 'COMPLETED'
+        [sql] = self.save_and_capture(job, update_fields=['status'])
+        self.assertIn('"completed_at"', sql)
+        completed_at = Job.objects.get(pk=job.pk).completed_at
+        self.assertIsNotNone(completed_at)
+
+        # Leaving and re-entering the status keeps the first timestamp
+        job.status = 'QC'
+        job.save()
+        job.status = 'COMPLETED'
+        job.save()
+        self.assertEqual(Job.objects.get(pk=job.pk).completed_at, completed_at)
+
+        # Rows created in the status are not stamped
+        created = Job.objects.create(tenant=self.tenant, customer=self.customer, car=self.car, status='COMPLETED')
+        self.assertIsNone(created.completed_at)
+
+    def test_job_task_start_and_end_times_follow_its_status(self):
+        category = Category.objects.create(tenant=self.tenant, name='Wash')
+        service = Service.objects.create(
+            tenant=self.tenant, category=category, name='Full wash', price='100.00', duration_minutes=30
+        )
+        job = Job.objects.create(tenant=self.tenant, customer=self.customer, car=self.car)
+        item = JobItem.objects.create(tenant=self.tenant, job=job, service=service, price='100.00')
+        task = JobTask.objects.create(tenant=self.tenant, job_item=item, task_name='Wash')
+
+        task.status = 'IN_PROGRESS'
+        task.save()
+        self.assertIsNotNone(task.start_time)
+        self.assertIsNone(task.end_time)
+
+        # update_fields without status does not stamp
+        task.status = 'DONE'
+        task.task_name = 'Rinse'
+        task.save(update_fields=['task_name'])
+        self.assertIsNone(task.end_time)
+        task.save()
+        self.assertIsNotNone(task.end_time)
+        self.assertEqual(JobTask.objects.get(pk=task.pk).end_time, task.end_time)
+
+    def test_refresh_from_db_takes_a_new_snapshot(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        Customer.objects.filter(pk=customer.pk).update(first_name='Abel', last_name='Girma')
+        customer.refresh_from_db()
+        self.assertEqual(customer.get_dirty_fields(), {})
+        self.assertEqual(customer.previous_value('first_name'), 'Abel')
+
+        # Refreshing some fields keeps the others' changes
+        customer.first_name = 'Dawit'
+        customer.last_name = 'Alemu'
+        customer.refresh_from_db(fields=['last_name'])
+        self.assertEqual(customer.get_dirty_fields(), {'first_name': 'Abel'})
+
+
+class RollupFixture:
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        category = Category.objects.create(tenant=self.tenant, name='Wash')
+        self.wash = Service.objects.create(
+            tenant=self.tenant, category=category, name='Full wash', price='100.00', duration_minutes=30
+        )
+        self.polish = Service.objects.create(
+            tenant=self.tenant, category=category, name='Polish', price='250.00', duration_minutes=60
+        )
+        self.today = timezone.localdate()
+
+    def visit(self, service, total, phone):
+        """A customer, car, job with one item and its receipt"""
+        customer = Customer.objects.create(
+            tenant=self.tenant, first_name='Abebe', last_name='Kebede', phone_number=phone
+        )
+        car = Car.objects.create(tenant=self.tenant, customer=customer, plate_number=f'AA-{phone[-4:]}')
+        job = Job.objects.create(tenant=self.tenant, customer=customer, car=car)
+        item = JobItem.objects.create(tenant=self.tenant, job=job, service=service, price=total)
+        receipt = Receipt.objects.create(tenant=self.tenant, job=job, subtotal=total, total=total)
+        return customer, job, item, receipt
+
+    def stats(self, day):
+        return DailyTenantStats.objects.filter(tenant=self.tenant, date=day).values_list(
+            'revenue', 'job_count', 'new_customers'
+        ).first()
+
+    def service_counts(self, day):
+        return dict(
+            DailyServiceStats.objects.filter(tenant=self.tenant, date=day, count__gt=0)
+            .values_list('service_id', 'count')
+        )
+
+
+class RollupSignalTests(RollupFixture, TestCase):
+    """Writes to receipts, jobs, job items and customers keep the day's rollup rows in step"""
+
+    def test_creates_and_deletes_adjust_the_day(self):
+        self.visit(self.wash, Decimal('100.00'), '+251911000001')
+        _, job, item, receipt = self.visit(self.polish, Decimal('250.00'), '+251911000002')
+        self.assertEqual(self.stats(self.today), (Decimal('350.00'), 2, 2))
+        self.assertEqual(self.service_counts(self.today), {self.wash.id: 1, self.polish.id: 1})
+
+        receipt.delete()
+        item.delete()
+        self.assertEqual(self.stats(self.today), (Decimal('100.00'), 2, 2))
+        self.assertEqual(self.service_counts(self.today), {self.wash.id: 1})
+        job.delete()
+        self.assertEqual(self.stats(self.today), (Decimal('100.00'), 1, 2))
+
+    def test_receipt_edits_rebuild_both_days(self):
+        _, _, _, receipt = self.visit(self.wash, Decimal('100.00'), '+251911000001')
+        receipt.total = Decimal('120.00')
+        receipt.save()
+        self.assertEqual(self.stats(self.today)[0], Decimal('120.00'))
+
+        earlier = self.today - timedelta(days=2)
+        receipt.issued_date = rollups.day_start(earlier) + timedelta(hours=10)
+        receipt.save()
+        self.assertEqual(self.stats(earlier)[0], Decimal('120.00'))
+        self.assertEqual(self.stats(self.today)[0], Decimal('0'))
+
+    def test_job_item_edits_only_touch_rollups_when_the_service_changes(self):
+        _, _, item, _ = self.visit(self.wash, Decimal('100.00'), '+251911000001')
+        item = JobItem.objects.get(pk=item.pk)
+        item.price = Decimal('90.00')
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            item.save()
+        self.assertFalse([query for query in queries.captured_queries if 'operations_job"' in query['sql']])
+        self.assertFalse([query for query in queries.captured_queries if 'core_daily' in query['sql']])
+
+        item.service = self.polish
+        item.save()
+        self.assertEqual(self.service_counts(self.today), {self.polish.id: 1})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite serialises writers with table locks, not row locks')
+class RollupRebuildConcurrencyTests(RollupFixture, TransactionTestCase):
+    """A rebuild waits for transactions that have bumped its rows, so their deltas are not lost"""
+
+    def test_rebuild_counts_a_bump_committed_while_it_waits(self):
+        customer, job, _, _ = self.visit(self.wash, Decimal('100.00'), '+251911000001')
+        job = Job.objects.create(tenant=self.tenant, customer=customer, car=job.car)
+        bumped, release, errors = threading.Event(), threading.Event(), []
+
+        def pay():
+            try:
+                with transaction.atomic():
+                    Receipt.objects.create(tenant=self.tenant, job=job, subtotal=50, total=50)
+                    bumped.set()
+                    release.wait(5)
+            except Exception as exc:
+                errors.append(exc)
+                bumped.set()
+            finally:
+                connection.close()
+
+        def rebuild():
+            try:
+                rollups.rebuild_rollups(self.tenant.id, self.today, self.today)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        payer = threading.Thread(target=pay)
+        payer.start()
+        bumped.wait(5)
+        rebuilder = threading.Thread(target=rebuild)
+        rebuilder.start()
+        rebuilder.join(0.5)
+        self.assertTrue(rebuilder.is_alive())
+        release.set()
+        payer.join()
+        rebuilder.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.stats(self.today)[0], Decimal('150.00'))
+
+
+class DashboardStatsViewTests(RollupFixture, TestCase):
+    """Closed days are read from the rollups and today from the raw tables"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123', tenant=self.tenant, role='OWNER'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        # Three days ago, rolled up
+        self.earlier = self.today - timedelta(days=3)
+        customer, job, _, receipt = self.visit(self.polish, Decimal('250.00'), '+251911000001')
+        moved = rollups.day_start(self.earlier) + timedelta(hours=10)
+        Customer.objects.filter(pk=customer.pk).update(created_at=moved)
+        Job.objects.filter(pk=job.pk).update(created_at=moved)
+        Receipt.objects.filter(pk=receipt.pk).update(issued_date=moved)
+        rollups.rebuild_rollups(self.tenant.id, self.earlier, self.today)
+        # Today, live
+        self.visit(self.wash, Decimal('100.00'), '+251911000002')
+
+    def stats(self, **params):
+        response = self.client.get('/api/v1/dashboard/stats/', {
+            'period': 'custom', 'date_from': self.earlier.isoformat(), 'date_to': self.today.isoformat(), **params
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_combines_rollups_and_live_rows(self):
+        data = self.stats()
+        self.assertEqual(data['kpis'], {
+            'revenue': '350.00', 'services': 2, 'cars_in_queue': 2, 'new_customers': 2,
+        })
+        self.assertEqual(data['charts']['services_this_week'], [
+            {'date': self.earlier.strftime('%Y-%m-%d'), 'count': 1},
+            {'date': self.today.strftime('%Y-%m-%d'), 'count': 1},
+        ])
+        self.assertEqual(
+            {(row['service_name'], row['count']) for row in data['charts']['top_services']},
+            {('Polish', 1), ('Full wash', 1)},
+        )
+
+    def test_closed_days_come_from_the_rollups(self):
+        DailyTenantStats.objects.filter(tenant=self.tenant, date=self.earlier).update(revenue=Decimal('1000.00'))
+        self.assertEqual(self.stats()['kpis']['revenue'], '1100.00')
+
+    def test_rejects_an_unknown_period(self):
+        response = self.client.get('/api/v1/dashboard/stats/', {'period': 'fortnight'})
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    """?pagination=cursor walks a list by (ordering field, id) without COUNT or OFFSET"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123', tenant=self.tenant, role='OWNER'
+        )
+        customer = Customer.objects.create(tenant=self.tenant, first_name='Abebe', last_name='Kebede', phone_number='+251911000002')
+        car = Car.objects.create(tenant=self.tenant, customer=customer, plate_number='AA-1234')
+        jobs = [Job.objects.create(tenant=self.tenant, customer=customer, car=car) for _ in range(7)]
+        # Ties on created_at are broken by id
+        Job.objects.filter(id__in=[job.id for job in jobs[2:5]]).update(created_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, params):
+        ids = []
+        response = self.client.get('/api/v1/jobs/', params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(job['id'] for job in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(response.data['next'])
+            sql = ' '.join(query['sql'] for query in queries.captured_queries)
+            self.assertNotIn('COUNT(', sql)
+            self.assertNotIn('OFFSET', sql)
+
+    def test_cursor_pages_follow_the_list_ordering(self):
+        expected = list(Job.objects.filter(tenant=self.tenant).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk({'pagination': 'cursor', 'page_size': 2}), expected)
+
+        expected.reverse()
+        self.assertEqual(self.walk({'pagination': 'cursor', 'page_size': 3, 'ordering': 'created_at'}), expected)
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get('/api/v1/jobs/')
+        self.assertEqual(response.data['count'], 7)
+
+    def test_invalid_cursors_are_rejected(self):
+        self.assertEqual(self.client.get('/api/v1/jobs/', {'cursor': 'garbage'}).status_code, 404)
+        first = self.client.get('/api/v1/jobs/', {'pagination': 'cursor', 'page_size': 2}).data['next']
+        # A cursor only works with the ordering it was issued for
+        self.assertEqual(self.client.get(f'{first}&ordering=updated_at').status_code, 404)
+        response = self.client.get('/api/v1/notifications/', {'pagination': 'cursor', 'ordering': 'sent_at'})
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Reads PostgreSQL plans and index catalogs')
+class TenantIndexTests(TestCase):
+    """The tenant-scoped list queries are served by (tenant, ...) indexes"""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123', tenant=self.tenant, role='OWNER'
+        )
+
+    def assertUsesIndex(self, queryset, index):
+        # Sequential scans are off so the near-empty tables plan as they would at volume
+        self.assertIn(index, index_scans(queryset, seqscan=False))
+
+    def test_list_queries_use_tenant_leading_indexes(self):
+        tenant = self.tenant
+        cases = [
+            (Job.objects.filter(tenant=tenant, status='PENDING').order_by('-created_at'), 'job_tenant_status_idx'),
+            (Job.objects.filter(tenant=tenant, payment_method='CASH').order_by('-created_at'), 'job_tenant_method_idx'),
+            (JobItem.objects.filter(tenant=tenant).values('job_id', 'price'), 'jobitem_tenant_job_idx'),
+            (JobTask.objects.filter(tenant=tenant).order_by('-created_at', '-id'), 'jobtask_tenant_created_idx'),
+            (JobTask.objects.filter(tenant=tenant, status='DONE').order_by('-created_at'), 'jobtask_tenant_status_idx'),
+            (Visit.objects.filter(tenant=tenant, status='WAITING').order_by('-checked_in_at'), 'visit_tenant_status_idx'),
+            (Visit.objects.filter(tenant=tenant, customer_type='WALK_IN').order_by('-checked_in_at'), 'visit_tenant_type_idx'),
+            (Receipt.objects.filter(tenant=tenant).order_by('-issued_date'), 'receipt_tenant_issued_idx'),
+            (Payment.objects.filter(tenant=tenant, payment_method='CASH').order_by('-payment_date'), 'payment_tenant_method_idx'),
+            (Customer.objects.filter(tenant=tenant).order_by('-created_at'), 'customer_tenant_created_idx'),
+            (Customer.objects.filter(tenant=tenant, customer_type='CORPORATE').order_by('-created_at'), 'customer_tenant_type_idx'),
+            (Car.objects.filter(tenant=tenant, is_deleted=False).order_by('-created_at'), 'car_tenant_active_idx'),
+            (Car.objects.filter(tenant=tenant, is_deleted=False, car_type='SUV').order_by('-created_at'), 'car_tenant_type_idx'),
+            (StockLog.objects.filter(tenant=tenant, product_id=1).order_by('-created_at'), 'stocklog_tenant_product_idx'),
+        ]
+        for queryset, index in cases:
+            with self.subTest(index=index):
+                self.assertUsesIndex(queryset[:20], index)
+
+    def test_phone_lookups_use_tenant_phone_indexes(self):
+        # Equality lookups only beat the other tenant-leading indexes once
+        # the planner knows the table has volume
+        Customer.objects.bulk_create([
+            Customer(
+                tenant=self.tenant, first_name='Guest', last_name=str(number), phone_number=f'+2519110{number:05d}',
+                qr_code=f'QR-{number}'
+            )
+            for number in range(300)
+        ])
+        Visit.objects.bulk_create([
+            Visit(
+                tenant=self.tenant, ticket_id=f'T-{number}', customer_name='Guest', car_info='Toyota',
+                phone_number=f'+2519110{number:05d}'
+            )
+            for number in range(300)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Customer._meta.db_table}, {Visit._meta.db_table}')
+
+        self.assertUsesIndex(
+            Customer.objects.filter(tenant=self.tenant, phone_number='+251911000002'), 'customer_tenant_phone_idx'
+        )
+        self.assertUsesIndex(
+            Visit.objects.filter(tenant=self.tenant, phone_number='+251911000002'), 'visit_tenant_phone_idx'
+        )
+
+    def test_audit_finds_the_indexes_covered(self):
+        audits = {audit.basename: audit for audit in audit_router(router, self.user)}
+        for basename in ['job', 'visit', 'task', 'receipt', 'payment', 'car', 'stocklog']:
+            with self.subTest(basename=basename):
+                self.assertEqual(audits[basename].missing, [])
+        # Exact visit counts are rare enough to go without an index
+        self.assertEqual([candidate.fields for candidate in audits['customer'].missing], [['tenant', 'visit_count', 'created_at']])
+
+    def test_audit_proposes_partial_indexes_for_constant_filters(self):
+        audit = {audit.basename: audit for audit in audit_router(router, self.user)}['car']
+        listing = audit.candidates[0]
+        self.assertEqual(listing.fields, ['tenant', 'created_at'])
+        self.assertEqual(listing.condition, Q(is_deleted=False))
+        self.assertEqual(listing.covered_by, 'car_tenant_active_idx')
+
+
+class TenantContextTests(TestCase):
+    """TenantAwareModel.objects is scoped to the tenant of the request"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.other = Tenant.objects.create(name='Other Car Spa', subdomain='other')
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123', tenant=self.tenant, role='OWNER'
+        )
+        self.customer = Customer.objects.create(
+            tenant=self.tenant, first_name='Abebe', last_name='Kebede', phone_number='+251911000002'
+        )
+        Customer.objects.create(tenant=self.other, first_name='Hana', last_name='Tesfaye', phone_number='+251911000003')
+        self.client = APIClient()
+
+    def authorize(self, user):
+        token = TenantTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_querysets_follow_the_tenant_context(self):
+        self.assertEqual(Customer.objects.count(), 2)
+        with tenant_context(self.tenant.id):
+            self.assertEqual(list(Customer.objects.all()), [self.customer])
+            self.assertFalse(Customer.objects.filter(tenant=self.other).exists())
+            # Django internals use the unscoped default manager
+            self.assertEqual(Customer._default_manager.count(), 2)
+        with tenant_context(None):
+            self.assertEqual(Customer.objects.count(), 0)
+
+        token = activate(TenantState(request=None))
+        try:
+            # A request without an authenticated user sees nothing
+            self.assertEqual(Customer.objects.count(), 0)
+        finally:
+            deactivate(token)
+
+    def test_issued_tokens_carry_the_tenant(self):
+        response = self.client.post('/api/v1/auth/jwt/create/', {'username': 'owner', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        response = self.client.get('/api/v1/customers/')
+        self.assertEqual([customer['id'] for customer in response.data['results']], [self.customer.id])
+
+    def test_authentication_reads_the_user_and_caches_the_tenant(self):
+        self.authorize(self.user)
+        self.client.get('/api/v1/customers/')
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/customers/')
+        self.assertEqual(response.status_code, 200)
+        tables = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(len([sql for sql in tables if 'FROM "users_user"' in sql]), 1)
+        self.assertFalse([sql for sql in tables if 'FROM "tenants_tenant"' in sql])
+
+    def test_user_changes_take_effect_immediately(self):
+        self.authorize(self.user)
+        self.assertEqual(self.client.get('/api/v1/customers/').status_code, 200)
+
+        # The token still names the old tenant
+        self.user.tenant = self.other
+        self.user.save()
+        self.assertEqual(self.client.get('/api/v1/customers/').status_code, 401)
+
+        self.user.tenant = self.tenant
+        self.user.save()
+        self.assertEqual(self.client.get('/api/v1/customers/').status_code, 200)
+
+        # Writes that send no signals are seen as well
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/v1/customers/').status_code, 401)
+
+    def test_serializer_related_fields_only_accept_rows_of_the_tenant(self):
+        other_customer = Customer.objects.get(tenant=self.other)
+
+        class CarCustomerSerializer(TenantModelSerializer):
+            class Meta:
+                model = Car
+                fields = ['customer', 'plate_number']
+
+        with tenant_context(self.tenant.id):
+            serializer = CarCustomerSerializer(data={'customer': other_customer.id, 'plate_number': 'AA-1'})
+            self.assertFalse(serializer.is_valid())
+            self.assertIn('customer', serializer.errors)
+            serializer = CarCustomerSerializer(data={'customer': self.customer.id, 'plate_number': 'AA-1'})
+            self.assertTrue(serializer.is_valid())
+
+    def test_users_without_a_tenant_see_no_rows(self):
+        admin = User.objects.create_user(username='admin', password='testpass123', role='OWNER')
+        self.authorize(admin)
+        response = self.client.get('/api/v1/customers/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        self.assertIs(TenantState(request=None).tenant_id, NO_TENANT)
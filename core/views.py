@@ -12,6 +12,8 @@ from billing.models import Receipt
 from operations.models import Job, JobItem
 from customers.models import Customer
 from services.models import Service
+from core.models import DailyTenantStats, DailyServiceStats
+from core.rollups import split_period
 
 
 class DashboardStatsView(APIView):
@@ -19,6 +21,7 @@ class DashboardStatsView(APIView):
     Dashboard statistics endpoint that aggregates KPI data, chart data, and recent services.
     Accepts period parameter: 'today', 'this_week', 'this_month', or 'custom'
     For custom period, requires date_from and date_to query parameters.
+    Closed days are read from the daily rollup tables (core.rollups); only today is queried live.
     """
     permission_classes = [IsAuthenticated]
 
@@ -70,19 +73,37 @@ class DashboardStatsView(APIView):
         except ValueError as e:
             return Response({'error': str(e)}, status=400)
         
+        # Closed days come from the daily rollups; only the partial first day,
+        # today and anything later are aggregated live from the raw tables.
+        first_day, last_day, live_windows = split_period(start_date, end_date)
+        
+        def live_filter(field):
+            if not live_windows:
+                return Q(pk__in=[])
+            condition = Q()
+            for window_start, window_end in live_windows:
+                condition |= Q(**{f'{field}__gte': window_start, f'{field}__lte': window_end})
+            return condition
+        
+        daily_stats = DailyTenantStats.objects.none()
+        service_stats = DailyServiceStats.objects.none()
+        if first_day:
+            daily_stats = DailyTenantStats.objects.filter(tenant=tenant, date__gte=first_day, date__lte=last_day)
+            service_stats = DailyServiceStats.objects.filter(tenant=tenant, date__gte=first_day, date__lte=last_day)
+        
+        rolled_up = daily_stats.aggregate(
+            revenue=Sum('revenue'), services=Sum('job_count'), new_customers=Sum('new_customers')
+        )
+        
         # Revenue: Sum of receipts issued in the selected time period
-        revenue = Receipt.objects.filter(
-            tenant=tenant,
-            issued_date__gte=start_date,
-            issued_date__lte=end_date
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0')
+        revenue = (rolled_up['revenue'] or Decimal('0')) + (Receipt.objects.filter(
+            live_filter('issued_date'),
+            tenant=tenant
+        ).aggregate(total=Sum('total'))['total'] or Decimal('0'))
         
         # Services: Count of jobs created in the selected time period
-        services_count = Job.objects.filter(
-            tenant=tenant,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        ).count()
+        live_jobs = Job.objects.filter(live_filter('created_at'), tenant=tenant)
+        services_count = (rolled_up['services'] or 0) + live_jobs.count()
         
         # Cars in Queue: Count of jobs with status IN_PROGRESS or PENDING (current state, not time-bound)
         cars_in_queue = Job.objects.filter(
@@ -91,49 +112,55 @@ class DashboardStatsView(APIView):
         ).count()
         
         # New Customers: Count of customers created in the selected time period
-        new_customers = Customer.objects.filter(
-            tenant=tenant,
-            created_at__gte=start_date,
-            created_at__lte=end_date
+        new_customers = (rolled_up['new_customers'] or 0) + Customer.objects.filter(
+            live_filter('created_at'),
+            tenant=tenant
         ).count()
         
         # Services This Week: Daily breakdown of services for the selected time period
-        # Group jobs by date
-        daily_services = Job.objects.filter(
-            tenant=tenant,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        ).annotate(
+        daily_counts = {
+            row['date']: row['job_count']
+            for row in daily_stats.filter(job_count__gt=0).values('date', 'job_count')
+        }
+        live_daily = live_jobs.annotate(
             date=TruncDate('created_at')
         ).values('date').annotate(
             count=Count('id')
         ).order_by('date')
+        for item in live_daily:
+            daily_counts[item['date']] = daily_counts.get(item['date'], 0) + item['count']
         
         services_this_week = [
             {
-                'date': item['date'].strftime('%Y-%m-%d') if item['date'] else None,
-                'count': item['count']
+                'date': date.strftime('%Y-%m-%d') if date else None,
+                'count': count
             }
-            for item in daily_services
+            for date, count in sorted(daily_counts.items())
         ]
         
         # Top Services: Most popular services by count in the selected time period
-        # Get service counts from JobItems
-        top_services_data = JobItem.objects.filter(
-            tenant=tenant,
-            job__created_at__gte=start_date,
-            job__created_at__lte=end_date
+        service_counts = {}
+        rolled_up_services = service_stats.values('service__id', 'service__name').annotate(count=Sum('count'))
+        live_services = JobItem.objects.filter(
+            live_filter('job__created_at'),
+            tenant=tenant
         ).values('service__id', 'service__name').annotate(
             count=Count('id')
-        ).order_by('-count')[:10]
+        )
+        for item in list(rolled_up_services) + list(live_services):
+            key = (item['service__id'], item['service__name'])
+            service_counts[key] = service_counts.get(key, 0) + item['count']
         
         top_services = [
             {
-                'service_id': item['service__id'],
-                'service_name': item['service__name'],
-                'count': item['count']
+                'service_id': service_id,
+                'service_name': service_name,
+                'count': count
             }
-            for item in top_services_data
+            for (service_id, service_name), count in sorted(
+                service_counts.items(), key=lambda entry: entry[1], reverse=True
+            )[:10]
+            if count > 0
         ]
         
         # Recent Services: Latest 10 jobs with customer, car, service, staff, status info
@@ -167,7 +194,7 @@ class DashboardStatsView(APIView):
         
         return Response({
             'kpis': {
-                'revenue': str(revenue),
+                'revenue': str(revenue.quantize(Decimal('0.01'))),
                 'services': services_count,
                 'cars_in_queue': cars_in_queue,
                 'new_customers': new_customers
@@ -0,0 +1,119 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from tenants.models import Tenant
+from customers.models import Car, Customer, CustomerSearchDocument
+from customers.search import rebuild_search_documents, search_customers, trigram_available
+
+FIRST_NAMES = ['Abebe', 'Almaz', 'Dawit', 'Hana', 'Kebede', 'Meron', 'Samuel', 'Selam', 'Tigist', 'Yonas']
+LAST_NAMES = ['Alemu', 'Bekele', 'Desta', 'Girma', 'Haile', 'Mengistu', 'Negash', 'Tadesse', 'Tesfaye', 'Wolde']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway tenant with N customers and cars and compares check-in search '
+        'latency of the search document against the legacy icontains/join query'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000000, help='Customers to seed (default: 1000000)')
+        parser.add_argument('--queries', type=int, default=200, help='Searches per query kind (default: 200)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert (default: 5000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for data and queries')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark tenant instead of deleting it')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        tenant = Tenant.objects.create(name='Search benchmark', subdomain=f'search-bench-{uuid.uuid4().hex[:8]}')
+        try:
+            self.seed(tenant, options['customers'], options['batch_size'], rng)
+            backend = 'trigram' if trigram_available() else 'fallback (no pg_trgm)'
+            self.stdout.write(f'Search backend: {backend} on {connection.vendor}')
+
+            customers = Customer.objects.filter(tenant=tenant)
+            for kind, queries in self.sample_queries(tenant, options['queries'], rng).items():
+                legacy = self.measure(lambda q: list(self.legacy_search(customers, q)[:10]), queries)
+                indexed = self.measure(lambda q: list(search_customers(customers, q)[:10]), queries)
+                self.stdout.write(
+                    f'{kind:<14} legacy p50={legacy[0]:8.2f}ms p95={legacy[1]:8.2f}ms | '
+                    f'search document p50={indexed[0]:8.2f}ms p95={indexed[1]:8.2f}ms'
+                )
+        finally:
+            if options['keep']:
+                self.stdout.write(f'Kept tenant {tenant.subdomain}')
+            else:
+                self.cleanup(tenant)
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def seed(self, tenant, count, batch_size, rng):
+        started = time.perf_counter()
+        prefix = tenant.id.hex[:8]
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            customers = Customer.objects.bulk_create([
+                Customer(
+                    tenant=tenant,
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    phone_number=f'+2519{rng.randrange(10 ** 8):08d}',
+                    qr_code=f'{prefix}-{offset + i}',
+                )
+                for i in range(size)
+            ])
+            Car.objects.bulk_create([
+                Car(tenant=tenant, customer=customer, plate_number=f'{prefix[:4].upper()}{offset + i:08d}')
+                for i, customer in enumerate(customers)
+            ])
+        rebuild_search_documents(tenant.id, batch_size=batch_size)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {CustomerSearchDocument._meta.db_table}')
+        self.stdout.write(f'Seeded {count} customers in {time.perf_counter() - started:.1f}s')
+
+    def sample_queries(self, tenant, count, rng):
+        rows = list(
+            Customer.objects.filter(tenant=tenant).order_by('?')
+            .values_list('first_name', 'phone_number', 'cars__plate_number')[:count]
+        )
+        return {
+            'name prefix': [first_name[:3] for first_name, _, _ in rows],
+            'phone digits': [phone[-6:] for _, phone, _ in rows],
+            'plate': [plate[-6:] for _, _, plate in rows if plate],
+            'no match': [f'zz{rng.randrange(10 ** 6)}' for _ in rows],
+        }
+
+    def legacy_search(self, customers, query):
+        """The pre-search-document 'all' query from CustomerViewSet.search"""
+        return customers.filter(
+            Q(phone_number__icontains=query) |
+            Q(first_name__icontains=query) |
+            Q(last_name__icontains=query) |
+            Q(company_name__icontains=query) |
+            Q(qr_code=query) |
+            Q(cars__plate_number__icontains=query, cars__is_deleted=False)
+        ).distinct()
+
+    def measure(self, run, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        if len(timings) < 2:
+            return (timings[0], timings[0]) if timings else (0.0, 0.0)
+        return statistics.median(timings), statistics.quantiles(timings, n=20)[-1]
+
+    def cleanup(self, tenant):
+        # Raw deletes: collecting a million rows for signals is slower than the benchmark
+        with transaction.atomic():
+            using = connection.alias
+            CustomerSearchDocument.objects.filter(tenant=tenant)._raw_delete(using)
+            Car.objects.filter(tenant=tenant)._raw_delete(using)
+            Customer.objects.filter(tenant=tenant)._raw_delete(using)
+            tenant.delete()
+        self.stdout.write(f'Removed tenant {tenant.subdomain}')
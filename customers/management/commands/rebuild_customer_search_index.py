@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from customers.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the customer search documents (names, phone digits, plates) from customers and cars'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only rebuild this tenant (default: all tenants)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Documents written per statement (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['subdomain']:
+            tenants = tenants.filter(subdomain=options['subdomain'])
+            if not tenants.exists():
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+
+        for tenant in tenants:
+            written = rebuild_search_documents(tenant.id, batch_size=max(options['batch_size'], 1))
+            self.stdout.write(self.style.SUCCESS(f'{tenant.name}: {written} search documents rebuilt'))
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:30
+
+import re
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+SEARCH_COLUMNS = ('document', 'names', 'phone_digits', 'plates')
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_NON_DIGIT = re.compile(r'\D+')
+
+
+def build_document_fields(first_name, last_name, company_name, phone_number, plate_numbers):
+    """Frozen copy of customers.search.build_document_fields as of this migration"""
+    names = ' '.join(_NON_ALNUM.sub(' ', f"{first_name} {last_name} {company_name}".lower()).split())
+    phone_digits = _NON_DIGIT.sub('', phone_number or '')
+    plates = ' '.join(
+        plate for plate in (_NON_ALNUM.sub('', (p or '').lower()) for p in plate_numbers) if plate
+    )
+    tokens = ' '.join(part for part in (names, phone_digits, plates) if part)
+    return {
+        'names': names,
+        'phone_digits': phone_digits,
+        'plates': plates,
+        'document': f' {tokens} ',
+    }
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    GIN trigram indexes so the ``contains`` lookups in customers.search are
+    index scans. Skipped on other databases or when pg_trgm is unavailable.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in SEARCH_COLUMNS:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS customers_search_{column}_trgm '
+                f'ON customers_customersearchdocument USING gin ({column} gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for column in SEARCH_COLUMNS:
+            cursor.execute(f'DROP INDEX IF EXISTS customers_search_{column}_trgm')
+
+
+def populate_search_documents(apps, schema_editor):
+    Customer = apps.get_model('customers', 'Customer')
+    Car = apps.get_model('customers', 'Car')
+    CustomerSearchDocument = apps.get_model('customers', 'CustomerSearchDocument')
+
+    plates = {}
+    for customer_id, plate_number in Car.objects.filter(is_deleted=False).values_list('customer_id', 'plate_number').iterator():
+        plates.setdefault(customer_id, []).append(plate_number)
+
+    batch = []
+    customers = Customer.objects.values_list(
+        'id', 'tenant_id', 'first_name', 'last_name', 'company_name', 'phone_number'
+    ).iterator()
+    for customer_id, tenant_id, first_name, last_name, company_name, phone_number in customers:
+        fields = build_document_fields(first_name, last_name, company_name, phone_number, plates.get(customer_id, []))
+        batch.append(CustomerSearchDocument(customer_id=customer_id, tenant_id=tenant_id, **fields))
+        if len(batch) >= 1000:
+            CustomerSearchDocument.objects.bulk_create(batch)
+            batch = []
+    CustomerSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_alter_car_options_alter_customer_options_and_more'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('names', models.CharField(blank=True, help_text='Normalized first/last/company names', max_length=500)),
+                ('phone_digits', models.CharField(blank=True, max_length=30)),
+                ('plates', models.CharField(blank=True, help_text='Normalized plates of active cars', max_length=500)),
+                ('document', models.TextField(blank=True, help_text='Space-delimited tokens of all the above')),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='customers.customer')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=(core.models.DirtyFieldsMixin, models.Model),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:10
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built and dropped without locking out writes to the tables
+    atomic = False
+
+    dependencies = [
+        ('car_references', '0001_initial'),
+        ('customers', '0003_customer_search_document'),
+        ('loyalty', '0002_alter_customerloyalty_current_tier_and_more'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='car',
+            name='customers_c_plate_n_84d99a_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='car',
+            name='customers_c_is_dele_8415e3_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='customer',
+            name='customers_c_phone_n_cabfe1_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='customer',
+            name='customers_c_qr_code_21c71e_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='customer',
+            name='customers_c_custome_47da94_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['tenant', 'created_at'], name='car_tenant_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['tenant', 'car_type', 'created_at'], name='car_tenant_type_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='customer',
+            index=models.Index(fields=['tenant', 'phone_number'], name='customer_tenant_phone_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='customer',
+            index=models.Index(fields=['tenant', 'created_at', 'id'], name='customer_tenant_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='customer',
+            index=models.Index(fields=['tenant', 'customer_type', 'created_at'], name='customer_tenant_type_idx'),
+        ),
+    ]
@@ -54,9 +54,10 @@ class Customer(TenantAwareModel):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['phone_number']),
-            models.Index(fields=['qr_code']),
-            models.Index(fields=['customer_type']),
+            # Every lookup is tenant-scoped; qr_code is unique, so already indexed
+            models.Index(fields=['tenant', 'phone_number'], name='customer_tenant_phone_idx'),
+            models.Index(fields=['tenant', 'created_at', 'id'], name='customer_tenant_created_idx'),
+            models.Index(fields=['tenant', 'customer_type', 'created_at'], name='customer_tenant_type_idx'),
         ]
     
     def __str__(self):
@@ -86,42 +87,22 @@ class Customer(TenantAwareModel):
     
     def update_loyalty_tier(self):
         """Update customer's tier based on total lifetime points"""
-        from loyalty.models import LoyaltyTier
-        tier = LoyaltyTier.objects.filter(
-            tenant=self.tenant,
-            min_points_required__lte=self.total_lifetime_points
-        ).order_by('-min_points_required').first()
-        
-        if tier and tier != self.current_tier:
-            self.current_tier = tier
+        from loyalty.tiers import tier_table
+
+        tier_id = tier_table(self.tenant_id).resolve(self.total_lifetime_points)
+        if tier_id is not None and tier_id != self.current_tier_id:
+            self.current_tier_id = tier_id
             self.tier_achieved_date = timezone.now().date()
             self.save(update_fields=['current_tier', 'tier_achieved_date'])
     
     def adjust_loyalty_points(self, points, reason, adjusted_by=None, transaction_type='ADJUSTMENT'):
         """
         Adjust loyalty points (can be positive or negative)
-        Creates a LoyaltyTransaction record
+        Creates a LoyaltyTransaction record; see loyalty.ledger
         """
-        from loyalty.models import LoyaltyTransaction
-        
-        # Update points
-        self.loyalty_points += points
-        if points > 0:
-            self.total_lifetime_points += points
-        self.save(update_fields=['loyalty_points', 'total_lifetime_points'])
-        
-        # Create transaction record
-        LoyaltyTransaction.objects.create(
-            tenant=self.tenant,
-            customer=self,
-            points=points,
-            reason=reason,
-            transaction_type=transaction_type,
-            adjusted_by=adjusted_by
-        )
-        
-        # Update tier if needed
-        self.update_loyalty_tier()
+        from loyalty.ledger import adjust
+
+        adjust(self, points, reason, adjusted_by=adjusted_by, transaction_type=transaction_type)
 
 
 class CorporateProfile(TenantAwareModel):
@@ -192,8 +173,14 @@ class Car(TenantAwareModel):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['plate_number']),
-            models.Index(fields=['is_deleted']),
+            # The car list hides soft-deleted cars (plate_number is unique, so already indexed)
+            models.Index(
+                fields=['tenant', 'created_at'], condition=models.Q(is_deleted=False), name='car_tenant_active_idx'
+            ),
+            models.Index(
+                fields=['tenant', 'car_type', 'created_at'], condition=models.Q(is_deleted=False),
+                name='car_tenant_type_idx'
+            ),
         ]
         verbose_name = 'Car'
         verbose_name_plural = 'Cars'
@@ -214,3 +201,18 @@ class Car(TenantAwareModel):
         self.is_deleted = False
         self.deleted_at = None
         self.save(update_fields=['is_deleted', 'deleted_at'])
+
+
+class CustomerSearchDocument(TenantAwareModel):
+    """
+    Denormalized search row per customer (names, phone digits, active plates).
+    Kept in sync by customers.signals and queried through customers.search.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, related_name='search_document')
+    names = models.CharField(max_length=500, blank=True, help_text="Normalized first/last/company names")
+    phone_digits = models.CharField(max_length=30, blank=True)
+    plates = models.CharField(max_length=500, blank=True, help_text="Normalized plates of active cars")
+    document = models.TextField(blank=True, help_text="Space-delimited tokens of all the above")
+
+    def __str__(self):
+        return f"Search document for customer {self.customer_id}"
@@ -0,0 +1,183 @@
+"""
+Customer search backed by CustomerSearchDocument.
+
+Every customer has one denormalized row holding normalized names, phone
+digits and active plates, plus a ``document`` column with all of them as
+space-delimited tokens. Searches are substring matches on that single
+table (no join into cars, no DISTINCT); on PostgreSQL with pg_trgm the
+``document`` column carries a GIN trigram index so the LIKE predicates are
+index scans, and results are additionally ordered by trigram similarity.
+Other databases (SQLite in tests) use the same predicates without the index.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from customers.models import CustomerSearchDocument
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_NON_DIGIT = re.compile(r'\D+')
+
+
+def normalize_text(value):
+    """Lowercase and reduce to space-separated alphanumeric tokens"""
+    return ' '.join(_NON_ALNUM.sub(' ', (value or '').lower()).split())
+
+
+def normalize_phone(value):
+    return _NON_DIGIT.sub('', value or '')
+
+
+def normalize_plate(value):
+    return _NON_ALNUM.sub('', (value or '').lower())
+
+
+def build_document_fields(first_name, last_name, company_name, phone_number, plate_numbers):
+    """Field values of a CustomerSearchDocument for the given customer data"""
+    names = normalize_text(f"{first_name} {last_name} {company_name}")
+    phone_digits = normalize_phone(phone_number)
+    plates = ' '.join(plate for plate in (normalize_plate(p) for p in plate_numbers) if plate)
+    tokens = ' '.join(part for part in (names, phone_digits, plates) if part)
+    return {
+        'names': names,
+        'phone_digits': phone_digits,
+        'plates': plates,
+        'document': f' {tokens} ',
+    }
+
+
+def update_search_document(customer):
+    """Rebuild the search document for one customer"""
+    plate_numbers = customer.cars.filter(is_deleted=False).values_list('plate_number', flat=True)
+    fields = build_document_fields(
+        customer.first_name, customer.last_name, customer.company_name,
+        customer.phone_number, plate_numbers
+    )
+    CustomerSearchDocument.objects.update_or_create(
+        customer=customer, defaults={'tenant_id': customer.tenant_id, **fields}
+    )
+
+
+def rebuild_search_documents(tenant_id, batch_size=1000):
+    """
+    Recreate the search documents of every customer of a tenant from the
+    Customer and Car tables. Returns the number of documents written.
+    """
+    from customers.models import Car, Customer
+
+    plates = {}
+    active_cars = Car.objects.filter(tenant_id=tenant_id, is_deleted=False)
+    for customer_id, plate_number in active_cars.values_list('customer_id', 'plate_number').iterator():
+        plates.setdefault(customer_id, []).append(plate_number)
+
+    customers = Customer.objects.filter(tenant_id=tenant_id).values_list(
+        'id', 'first_name', 'last_name', 'company_name', 'phone_number'
+    )
+    written = 0
+    batch = []
+    for customer_id, first_name, last_name, company_name, phone_number in customers.iterator():
+        fields = build_document_fields(first_name, last_name, company_name, phone_number, plates.get(customer_id, []))
+        batch.append(CustomerSearchDocument(customer_id=customer_id, tenant_id=tenant_id, **fields))
+        if len(batch) >= batch_size:
+            written += _upsert_documents(batch)
+            batch = []
+    written += _upsert_documents(batch)
+    return written
+
+
+def _upsert_documents(documents):
+    CustomerSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=['names', 'phone_digits', 'plates', 'document', 'updated_at'],
+    )
+    return len(documents)
+
+
+_trigram_available = {}
+
+
+def trigram_available():
+    """Whether pg_trgm is installed on the default database (checked once per process)"""
+    if connection.vendor != 'postgresql':
+        return False
+    if connection.alias not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[connection.alias] = cursor.fetchone() is not None
+    return _trigram_available[connection.alias]
+
+
+def search_customers(queryset, query, search_type='all'):
+    """
+    Filter a Customer queryset by ``query`` and order it by relevance.
+
+    Args:
+        queryset: Customer queryset, already scoped to a tenant
+        query: Raw search text (name, phone fragment, plate or QR code)
+        search_type: 'all', 'name', 'phone' or 'plate'
+
+    Exact matches rank first, then prefix matches (phone starting with the
+    digits, a plate or name token starting with the query), then substrings.
+    """
+    query = (query or '').strip()
+    tokens = normalize_text(query).split()
+    digits = normalize_phone(query)
+    plate = normalize_plate(query)
+    # Only treat the query as a phone number when it has nothing but digits and punctuation
+    is_phone_like = bool(digits) and digits == plate
+    prefix = 'search_document__'
+
+    name_match = None
+    if tokens:
+        name_match = Q()
+        for token in tokens:
+            name_match &= Q(**{f'{prefix}names__contains': token})
+    phone_match = Q(**{f'{prefix}phone_digits__contains': digits}) if digits else None
+    plate_match = Q(**{f'{prefix}plates__contains': plate}) if plate else None
+
+    if search_type == 'name':
+        condition = name_match
+    elif search_type == 'phone':
+        condition = phone_match
+    elif search_type == 'plate':
+        condition = plate_match
+    else:
+        condition = Q(qr_code=query)
+        if tokens:
+            document_match = Q()
+            for token in tokens:
+                document_match &= Q(**{f'{prefix}document__contains': token})
+            condition |= document_match
+        if len(tokens) > 1:
+            # "AA 1234" / "0911-234" typed with separators; the document holds them joined
+            condition |= Q(**{f'{prefix}document__contains': plate})
+
+    if condition is None:
+        return queryset.none()
+
+    exact, starts = [], []
+    if search_type == 'all':
+        exact.append(When(qr_code=query, then=Value(4)))
+    if is_phone_like and search_type in ('all', 'phone'):
+        exact.append(When(**{f'{prefix}phone_digits': digits, 'then': Value(4)}))
+        starts.append(When(**{f'{prefix}phone_digits__startswith': digits, 'then': Value(3)}))
+    if plate and search_type in ('all', 'plate'):
+        exact.append(When(**{f'{prefix}document__contains': f' {plate} ', 'then': Value(4)}))
+        starts.append(When(**{f'{prefix}document__contains': f' {plate}', 'then': Value(3)}))
+    if tokens and search_type in ('all', 'name'):
+        starts.append(When(**{f'{prefix}document__contains': f' {tokens[0]}', 'then': Value(2)}))
+
+    queryset = queryset.filter(condition).annotate(
+        search_rank=Case(*exact, *starts, default=Value(1), output_field=IntegerField())
+    )
+    ordering = ['-search_rank']
+    if trigram_available():
+        from django.contrib.postgres.search import TrigramSimilarity
+        queryset = queryset.annotate(
+            search_similarity=TrigramSimilarity(f'{prefix}document', ' '.join(tokens) or plate or query)
+        )
+        ordering.append('-search_similarity')
+    return queryset.order_by(*ordering, 'pk')
@@ -2,9 +2,10 @@ from rest_framework import serializers
 from customers.models import Customer, Car, CorporateProfile, Driver
 from car_references.serializers import CarMakeSerializer, CarModelSerializer
 from loyalty.serializers import LoyaltyTierSerializer
+from core.serializers import AnnotatedFieldsMixin, count_subquery, latest_subquery, TenantModelSerializer
 
 
-class CarSerializer(serializers.ModelSerializer):
+class CarSerializer(TenantModelSerializer):
     """Serializer for Car model with car reference support"""
     make_details = CarMakeSerializer(source='make', read_only=True)
     model_details = CarModelSerializer(source='model', read_only=True)
@@ -23,7 +24,7 @@ class CarSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'customer', 'is_deleted', 'deleted_at', 'created_at', 'updated_at']
 
 
-class CarCreateSerializer(serializers.ModelSerializer):
+class CarCreateSerializer(TenantModelSerializer):
     """Serializer for creating cars"""
     class Meta:
         model = Car
@@ -41,14 +42,14 @@ class CarCreateSerializer(serializers.ModelSerializer):
         return data
 
 
-class DriverSerializer(serializers.ModelSerializer):
+class DriverSerializer(TenantModelSerializer):
     class Meta:
         model = Driver
         fields = ['id', 'first_name', 'last_name', 'phone_number', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CorporateProfileSerializer(serializers.ModelSerializer):
+class CorporateProfileSerializer(TenantModelSerializer):
     drivers = DriverSerializer(many=True, read_only=True)
     
     class Meta:
@@ -57,26 +58,47 @@ class CorporateProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CustomerListSerializer(serializers.ModelSerializer):
-    """Lightweight serializer for list views with loyalty info"""
+def _active_car_count():
+    return count_subquery(Car.objects.filter(is_deleted=False), 'customer')
+
+
+def _latest_visit_at():
+    from operations.models import Visit
+    return latest_subquery(Visit.objects.all(), 'customer', 'checked_in_at')
+
+
+def _open_visit_count():
+    from operations.models import Visit
+    return count_subquery(Visit.objects.exclude(status='PAID'), 'customer')
+
+
+class CustomerListSerializer(AnnotatedFieldsMixin, serializers.ModelSerializer):
+    """
+    Lightweight serializer for list views with loyalty info.
+    Render querysets passed through annotate_queryset().
+    """
     full_name = serializers.CharField(read_only=True)
     current_tier_name = serializers.CharField(source='current_tier.name', read_only=True)
-    car_count = serializers.SerializerMethodField()
+    car_count = serializers.IntegerField(read_only=True)
+    last_visit = serializers.DateTimeField(source='latest_visit_at', read_only=True)
+    open_visits = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Customer
         fields = [
             'id', 'customer_type', 'full_name', 'phone_number', 'email',
             'loyalty_points', 'current_tier_name', 'car_count',
-            'visit_count', 'last_visit', 'created_at'
+            'visit_count', 'last_visit', 'open_visits', 'created_at'
         ]
-        read_only_fields = ['id', 'visit_count', 'last_visit', 'created_at']
-    
-    def get_car_count(self, obj):
-        return obj.cars.filter(is_deleted=False).count()
+        read_only_fields = ['id', 'visit_count', 'created_at']
+        annotated_fields = {
+            'car_count': _active_car_count,
+            'latest_visit_at': _latest_visit_at,
+            'open_visits': _open_visit_count,
+        }
 
 
-class CustomerDetailSerializer(serializers.ModelSerializer):
+class CustomerDetailSerializer(TenantModelSerializer):
     """Detailed serializer with nested relationships and loyalty info"""
     cars = CarSerializer(many=True, read_only=True)
     corporate_profile = CorporateProfileSerializer(read_only=True)
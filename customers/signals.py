@@ -0,0 +1,54 @@
+"""
+Signal receivers that keep CustomerSearchDocument (customers.search) in step
+with Customer and Car writes.
+"""
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from customers.models import Car, Customer
+from customers.search import update_search_document
+from tenants.models import Tenant
+
+# Customer fields that make up the search document
+SEARCH_FIELDS = {'first_name', 'last_name', 'company_name', 'phone_number'}
+# Car fields that make up the search document
+CAR_SEARCH_FIELDS = {'plate_number', 'is_deleted', 'customer'}
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if not created and update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    update_search_document(instance)
+
+
+@receiver(pre_save, sender=Car)
+def car_pre_save(sender, instance, raw=False, **kwargs):
+    # Remember the previous owner so a reassigned car leaves their document too
+    instance._previous_customer_id = None if instance._state.adding else instance.previous_value('customer')
+
+
+@receiver(post_save, sender=Car)
+def car_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if not created and update_fields is not None and not CAR_SEARCH_FIELDS.intersection(update_fields):
+        return
+    update_search_document(instance.customer)
+    previous_customer_id = getattr(instance, '_previous_customer_id', None)
+    if previous_customer_id and previous_customer_id != instance.customer_id:
+        previous = Customer.objects.filter(pk=previous_customer_id).first()
+        if previous is not None:
+            update_search_document(previous)
+
+
+@receiver(post_delete, sender=Car)
+def car_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (Customer, Tenant)) or getattr(origin, 'model', None) in (Customer, Tenant):
+        # The owner's document goes away with the customer/tenant delete
+        return
+    customer = Customer.objects.filter(pk=instance.customer_id).first()
+    if customer is not None:
+        update_search_document(customer)
@@ -1,3 +1,190 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, reset_queries
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Car, Customer, CustomerSearchDocument
+from customers.search import search_customers
+from customers.serializers import CustomerListSerializer
+from operations.models import Visit
+from tenants.models import Tenant
+from users.models import User
+
+
+class CustomerSearchFixture:
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+
+    def customer(self, first_name='Abebe', last_name='Kebede', phone_number='0911000000', plates=()):
+        customer = Customer.objects.create(
+            tenant=self.tenant, first_name=first_name, last_name=last_name, phone_number=phone_number
+        )
+        for plate in plates:
+            Car.objects.create(tenant=self.tenant, customer=customer, plate_number=plate)
+        return customer
+
+    def document(self, customer):
+        return CustomerSearchDocument.objects.get(customer=customer)
+
+
+class CustomerSearchRankingTests(CustomerSearchFixture, TestCase):
+    """Exact matches rank first, then prefixes, then substrings"""
+
+    def search(self, query, search_type='all'):
+        customers = Customer.objects.filter(tenant=self.tenant)
+        return list(search_customers(customers, query, search_type).values_list('pk', flat=True))
+
+    def test_phone_numbers(self):
+        substring = self.customer(phone_number='02 0911 223344')
+        exact = self.customer(phone_number='0911223344')
+        prefix = self.customer(phone_number='09112233445')
+        self.customer(phone_number='0922000000')
+        self.assertEqual(self.search('0911-223-344'), [exact.pk, prefix.pk, substring.pk])
+        self.assertEqual(self.search('0911223344', 'plate'), [])
+
+    def test_plates(self):
+        substring = self.customer(plates=['BAA1234'])
+        prefix = self.customer(plates=['AA12345'])
+        exact = self.customer(plates=['AA-1234'])
+        self.assertEqual(self.search('aa 1234'), [exact.pk, prefix.pk, substring.pk])
+        self.assertEqual(self.search('AA1234', 'plate'), [exact.pk, prefix.pk, substring.pk])
+
+    def test_names(self):
+        substring = self.customer(first_name='Tsion', last_name='Abakebede')
+        prefix = self.customer(first_name='Kebedech', last_name='Alemu')
+        self.customer(first_name='Sara', last_name='Tesfaye')
+        self.assertEqual(self.search('kebede'), [prefix.pk, substring.pk])
+        # Every token must match
+        self.assertEqual(self.search('tsion abakebede', 'name'), [substring.pk])
+
+    def test_qr_codes_match_exactly(self):
+        customer = self.customer()
+        self.customer(first_name='Sara', phone_number='0911000001')
+        self.assertEqual(self.search(customer.qr_code), [customer.pk])
+
+    def test_other_tenants_are_not_searched(self):
+        other = Tenant.objects.create(name='Other Car Spa', subdomain='other')
+        Customer.objects.create(tenant=other, first_name='Abebe', phone_number='0911000000')
+        customer = self.customer()
+        self.assertEqual(self.search('abebe'), [customer.pk])
+
+
+class CustomerSearchDocumentSyncTests(CustomerSearchFixture, TestCase):
+    """Customer and car writes keep the owners' search documents in step"""
+
+    def test_customer_edits(self):
+        customer = self.customer(plates=['AA-1234'])
+        self.assertEqual(self.document(customer).document, ' abebe kebede 0911000000 aa1234 ')
+
+        customer.first_name = 'Abel'
+        customer.phone_number = '+251 922 000 000'
+        customer.save()
+        document = self.document(customer)
+        self.assertEqual((document.names, document.phone_digits), ('abel kebede', '251922000000'))
+
+        # Saves that touch no searched field leave the document alone
+        CustomerSearchDocument.objects.filter(customer=customer).update(names='stale')
+        customer.email = 'abel@example.com'
+        customer.save()
+        self.assertEqual(self.document(customer).names, 'stale')
+
+    def test_car_edits(self):
+        owner = self.customer(plates=['AA-1234'])
+        buyer = self.customer(first_name='Sara', phone_number='0911000001')
+        car = Car.objects.get(plate_number='AA-1234')
+
+        car.plate_number = 'AB-9999'
+        car.save()
+        self.assertEqual(self.document(owner).plates, 'ab9999')
+
+        # A reassigned car leaves the previous owner's document
+        car.customer = buyer
+        car.save()
+        self.assertEqual(self.document(owner).plates, '')
+        self.assertEqual(self.document(buyer).plates, 'ab9999')
+
+        car.soft_delete()
+        self.assertEqual(self.document(buyer).plates, '')
+
+        Car.objects.create(tenant=self.tenant, customer=buyer, plate_number='AC-1000')
+        self.assertEqual(self.document(buyer).plates, 'ac1000')
+        Car.objects.get(plate_number='AC-1000').delete()
+        self.assertEqual(self.document(buyer).plates, '')
+
+    def test_documents_go_with_their_customer(self):
+        customer = self.customer(plates=['AA-1234'])
+        customer.delete()
+        self.assertFalse(CustomerSearchDocument.objects.exists())
+
+
+class CustomerListSerializerTests(CustomerSearchFixture, TestCase):
+    """Counts and latest values of the customer list come from annotations, in one query per page"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username='owner', password='testpass123', tenant=self.tenant, role='OWNER')
+        )
+
+    def add_customer(self, number):
+        customer = self.customer(last_name=f'Kebede{number}', phone_number=f'09110000{number:02d}')
+        cars = [
+            Car.objects.create(tenant=self.tenant, customer=customer, plate_number=f'AA{number:02d}{car:02d}')
+            for car in range(3)
+        ]
+        cars[0].soft_delete()
+        for days_ago, status in [(3, 'PAID'), (1, 'PAID'), (2, 'IN_PROGRESS')]:
+            visit = Visit.objects.create(
+                tenant=self.tenant, customer=customer, customer_type='REGISTERED', car=cars[1],
+                customer_name=customer.full_name, car_info='Toyota Corolla', status=status,
+            )
+            Visit.objects.filter(pk=visit.pk).update(checked_in_at=timezone.now() - timedelta(days=days_ago))
+        return customer
+
+    def list(self):
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/customers/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'], len(queries.captured_queries)
+
+    def test_annotated_fields(self):
+        customer = self.add_customer(0)
+        [row], _ = self.list()
+        latest = Visit.objects.filter(customer=customer).order_by('-checked_in_at').first().checked_in_at
+        self.assertEqual(row['car_count'], 2)
+        self.assertEqual(row['open_visits'], 1)
+        self.assertEqual(row['last_visit'], CustomerListSerializer().fields['last_visit'].to_representation(latest))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_customer(0)
+        _, few = self.list()
+        for number in range(1, 6):
+            self.add_customer(number)
+        rows, many = self.list()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(few, many)
+
+    def test_ordering_by_last_visit_follows_the_annotation(self):
+        customers = [self.add_customer(number) for number in range(3)]
+        Visit.objects.filter(customer=customers[1]).update(checked_in_at=timezone.now())
+        # The stored column disagrees with the visits
+        Customer.objects.filter(pk=customers[2].pk).update(last_visit=timezone.now() + timedelta(days=1))
+
+        response = self.client.get('/api/v1/customers/?ordering=-last_visit')
+        self.assertEqual(response.data['results'][0]['id'], customers[1].pk)
+        # Details have no annotation to sort by
+        response = self.client.get(f'/api/v1/customers/{customers[0].pk}/?ordering=last_visit')
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+    def test_unannotated_instances_are_rejected(self):
+        customer = self.add_customer(0)
+        with self.assertRaises(ImproperlyConfigured):
+            CustomerListSerializer(customer).data
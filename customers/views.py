@@ -3,10 +3,10 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
 from django.db import transaction
 
 from customers.models import Customer, Car
+from customers.search import search_customers
 from customers.serializers import (
     CustomerListSerializer, CustomerDetailSerializer,
     CarSerializer, CarCreateSerializer,
@@ -17,6 +17,24 @@ from customers.serializers import (
 from car_references.models import CarMake, CarModel
 
 
+class CustomerOrderingFilter(filters.OrderingFilter):
+    """
+    Sorts ``last_visit`` by the ``latest_visit_at`` annotation the list
+    shows it from (CustomerListSerializer), not the unmaintained column.
+    The term is dropped for querysets without the annotation.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = []
+        for term in super().get_ordering(request, queryset, view) or []:
+            if term.lstrip('-') == 'last_visit':
+                if 'latest_visit_at' not in queryset.query.annotations:
+                    continue
+                term = term.replace('last_visit', 'latest_visit_at')
+            ordering.append(term)
+        return ordering
+
+
 class CustomerViewSet(viewsets.ModelViewSet):
     """
     ViewSet for Customer CRUD operations with enhanced search and onboarding.
@@ -28,7 +46,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
     - Loyalty points adjustment
     - QR code generation
     """
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, CustomerOrderingFilter]
     filterset_fields = ['customer_type', 'is_corporate', 'visit_count', 'current_tier']
     search_fields = ['first_name', 'last_name', 'company_name', 'phone_number', 'email', 'qr_code']
     ordering_fields = ['created_at', 'last_visit', 'visit_count', 'loyalty_points']
@@ -37,13 +55,11 @@ class CustomerViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Automatic tenant filtering with optimized queries"""
-        return Customer.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related(
-            'current_tier'
-        ).prefetch_related(
-            'cars', 'corporate_profile'
-        )
+        queryset = Customer.objects.select_related('current_tier')
+        if self.action in ('list', 'search'):
+            # Car count and visit aggregates come from annotations, not per-row queries
+            return CustomerListSerializer.annotate_queryset(queryset)
+        return queryset.prefetch_related('cars', 'corporate_profile')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -74,27 +90,10 @@ class CustomerViewSet(viewsets.ModelViewSet):
         
         queryset = self.get_queryset()
         
-        if search_type == 'phone':
-            queryset = queryset.filter(phone_number__icontains=query)
-        elif search_type == 'plate':
-            queryset = queryset.filter(cars__plate_number__icontains=query, cars__is_deleted=False).distinct()
-        elif search_type == 'name':
-            queryset = queryset.filter(
-                Q(first_name__icontains=query) |
-                Q(last_name__icontains=query) |
-                Q(company_name__icontains=query)
-            )
-        elif search_type == 'qr':
+        if search_type == 'qr':
             queryset = queryset.filter(qr_code=query)
-        else:  # 'all'
-            queryset = queryset.filter(
-                Q(phone_number__icontains=query) |
-                Q(first_name__icontains=query) |
-                Q(last_name__icontains=query) |
-                Q(company_name__icontains=query) |
-                Q(qr_code=query) |
-                Q(cars__plate_number__icontains=query, cars__is_deleted=False)
-            ).distinct()
+        else:
+            queryset = search_customers(queryset, query, search_type)
         
         serializer = CustomerListSerializer(queryset, many=True)
         return Response(serializer.data)
@@ -278,9 +277,7 @@ class CarViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return only active (non-deleted) cars by default"""
-        queryset = Car.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('customer', 'make', 'model')
+        queryset = Car.objects.select_related('customer', 'make', 'model')
         
         # Allow filtering deleted cars with ?include_deleted=true
         if not self.request.query_params.get('include_deleted'):
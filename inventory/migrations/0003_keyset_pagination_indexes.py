@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_product_category_product_description_product_price_and_more'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stocklog',
+            index=models.Index(fields=['tenant', 'created_at', 'id'], name='stocklog_tenant_created_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:10
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built and dropped without locking out writes to the tables
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0003_keyset_pagination_indexes'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='stocklog',
+            index=models.Index(fields=['tenant', 'product', 'created_at'], name='stocklog_tenant_product_idx'),
+        ),
+    ]
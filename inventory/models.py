@@ -41,5 +41,13 @@ class StockLog(TenantAwareModel):
     reason = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pages of the stock log list (core.pagination)
+            models.Index(fields=['tenant', 'created_at', 'id'], name='stocklog_tenant_created_idx'),
+            # A product's history (?product=), newest first
+            models.Index(fields=['tenant', 'product', 'created_at'], name='stocklog_tenant_product_idx'),
+        ]
+
     def __str__(self):
         return f"{self.product.name}: {self.change_amount}"
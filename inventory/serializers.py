@@ -1,15 +1,18 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from inventory.models import Product, StockLog, ServiceProductRequirement, Supplier
+from core.serializers import TenantModelSerializer
 
 
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(TenantModelSerializer):
     class Meta:
         model = Supplier
         fields = ['id', 'name', 'contact_name', 'email', 'phone', 'address', 'is_active', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TenantModelSerializer):
     stock_status = serializers.SerializerMethodField()
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     
@@ -25,12 +28,12 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_stock_status(self, obj):
         if obj.current_stock <= obj.reorder_level:
             return 'LOW'
-        elif obj.current_stock <= obj.reorder_level * 1.5:
+        elif obj.current_stock <= obj.reorder_level * Decimal('1.5'):
             return 'MEDIUM'
         return 'GOOD'
 
 
-class StockLogSerializer(serializers.ModelSerializer):
+class StockLogSerializer(TenantModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     
     class Meta:
@@ -39,7 +42,7 @@ class StockLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class ServiceProductRequirementSerializer(serializers.ModelSerializer):
+class ServiceProductRequirementSerializer(TenantModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     service_name = serializers.CharField(source='service.name', read_only=True)
     
@@ -0,0 +1,223 @@
+"""
+Loyalty points earned on payment.
+
+A paid Job or Visit of a registered customer earns ``spend ×
+LoyaltyConfiguration.points_per_dollar × tier multiplier`` points, rounded
+down. Spend is the pre-tax services subtotal (the job's item prices,
+``Visit.subtotal``; tax and tips earn nothing) and the multiplier is that
+of the customer's current tier (loyalty.tiers). Tenants without a
+LoyaltyConfiguration earn nothing.
+
+loyalty.signals runs ``award_job`` / ``award_visit`` once a payment has
+committed; the ``backfill_loyalty_points`` command replays historical
+payments through ``backfill``. Every award, in one transaction:
+
+- adds the points through loyalty.ledger (Customer balances and tier, an
+  EARNED LoyaltyTransaction),
+- adds them to the customer's CustomerLoyalty, the balance redemptions
+  draw on, creating it when missing,
+- records an EARNED PointTransaction lot for the job or visit, expiring
+  ``points_expiry_days`` after the payment.
+
+The lot makes awards idempotent: payments that have one are not pending,
+and a partial unique constraint rejects a concurrent second award.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import ROUND_DOWN
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef, Sum
+from django.utils import timezone
+
+from customers.models import Customer
+from loyalty import ledger
+from loyalty.models import CustomerLoyalty, LoyaltyConfiguration, PointTransaction
+from loyalty.tiers import tier_table
+from operations.models import Job, Visit
+
+Program = namedtuple('Program', 'points_per_dollar expiry_days')
+
+# One payment to award; ``source`` is the PointTransaction field pointing at it
+Earning = namedtuple('Earning', 'source source_id customer_id spend paid_on label')
+
+
+def load_program(tenant_id):
+    """The tenant's earning rules, or None when it has no LoyaltyConfiguration"""
+    row = (
+        LoyaltyConfiguration.all_objects.filter(tenant_id=tenant_id)
+        .order_by('-updated_at', '-id')
+        .values_list('points_per_dollar', 'points_expiry_days')
+        .first()
+    )
+    return Program(*row) if row else None
+
+
+def earned_points(spend, points_per_dollar, multiplier):
+    return int((spend * points_per_dollar * multiplier).to_integral_value(rounding=ROUND_DOWN))
+
+
+def _not_awarded(source):
+    return ~Exists(PointTransaction.all_objects.filter(transaction_type='EARNED', **{source: OuterRef('pk')}))
+
+
+def pending_jobs(tenant_id):
+    """PAID jobs of the tenant that have not earned points yet, by id"""
+    return (
+        Job.all_objects.filter(tenant_id=tenant_id, status='PAID')
+        .filter(_not_awarded('job'))
+        .annotate(spend=Sum('items__price'))
+        .order_by('pk')
+        # updated_at is when the job last changed, normally its move to PAID
+        .values_list('pk', 'customer_id', 'spend', 'updated_at')
+    )
+
+
+def pending_visits(tenant_id):
+    """PAID visits of registered customers of the tenant that have not earned points yet, by id"""
+    return (
+        Visit.all_objects.filter(tenant_id=tenant_id, status='PAID', customer__isnull=False)
+        .filter(_not_awarded('visit'))
+        .order_by('pk')
+        .values_list('pk', 'customer_id', 'subtotal', 'paid_at', 'ticket_id')
+    )
+
+
+def _job_earning(row):
+    pk, customer_id, spend, paid_at = row
+    return Earning('job', pk, customer_id, spend, timezone.localdate(paid_at), f'Job #{pk}')
+
+
+def _visit_earning(row):
+    pk, customer_id, spend, paid_at, ticket_id = row
+    paid_on = timezone.localdate(paid_at) if paid_at else timezone.localdate()
+    return Earning('visit', pk, customer_id, spend, paid_on, f'Visit {ticket_id}')
+
+
+# source -> (pending payments of a tenant, row -> Earning)
+SOURCES = {
+    'job': (pending_jobs, _job_earning),
+    'visit': (pending_visits, _visit_earning),
+}
+
+
+def award(tenant_id, earnings, program=None):
+    """
+    Award ``earnings`` of customers of one tenant in one transaction, with a
+    constant number of queries per ledger.BATCH_SIZE customers. Returns the
+    number of payments that earned points.
+    """
+    if program is None:
+        program = load_program(tenant_id)
+    if program is None or not earnings:
+        return 0
+
+    tiers = tier_table(tenant_id)
+    current_tiers = dict(
+        Customer.all_objects.filter(tenant_id=tenant_id, pk__in={earning.customer_id for earning in earnings})
+        .values_list('pk', 'current_tier_id')
+    )
+    awards = []
+    for earning in earnings:
+        if earning.customer_id not in current_tiers or not earning.spend:
+            continue
+        points = earned_points(
+            earning.spend, program.points_per_dollar, tiers.multiplier(current_tiers[earning.customer_id])
+        )
+        if points > 0:
+            awards.append((earning, points))
+    if not awards:
+        return 0
+
+    with transaction.atomic():
+        ledger.adjust_many(
+            tenant_id,
+            [(earning.customer_id, points, f'Earned: {earning.label}') for earning, points in awards],
+            transaction_type='EARNED',
+        )
+
+        accounts = _accounts(tenant_id, {earning.customer_id for earning, _ in awards})
+        totals = {}
+        for earning, points in awards:
+            account_id = accounts[earning.customer_id]
+            totals[account_id] = totals.get(account_id, 0) + points
+        account_ids = sorted(totals)
+        for start in range(0, len(account_ids), ledger.BATCH_SIZE):
+            batch = {pk: totals[pk] for pk in account_ids[start:start + ledger.BATCH_SIZE]}
+            CustomerLoyalty.all_objects.filter(pk__in=batch).update(
+                total_points=F('total_points') + ledger.by_pk(batch),
+                available_points=F('available_points') + ledger.by_pk(batch),
+                updated_at=timezone.now(),
+            )
+
+        PointTransaction.all_objects.bulk_create([
+            PointTransaction(
+                tenant_id=tenant_id,
+                customer_loyalty_id=accounts[earning.customer_id],
+                points=points,
+                transaction_type='EARNED',
+                expires_at=(
+                    earning.paid_on + timedelta(days=program.expiry_days) if program.expiry_days else None
+                ),
+                description=f'Earned: {earning.label}',
+                **{f'{earning.source}_id': earning.source_id},
+            )
+            for earning, points in awards
+        ], batch_size=1000)
+    return len(awards)
+
+
+def _accounts(tenant_id, customer_ids):
+    """``{customer_id: CustomerLoyalty id}``, creating the missing accounts"""
+    accounts = dict(
+        CustomerLoyalty.all_objects.filter(customer_id__in=customer_ids).values_list('customer_id', 'pk')
+    )
+    missing = customer_ids - accounts.keys()
+    if missing:
+        CustomerLoyalty.all_objects.bulk_create(
+            [CustomerLoyalty(tenant_id=tenant_id, customer_id=customer_id) for customer_id in missing],
+            ignore_conflicts=True,
+        )
+        accounts.update(
+            CustomerLoyalty.all_objects.filter(customer_id__in=missing).values_list('customer_id', 'pk')
+        )
+    return accounts
+
+
+def _award_one(source, tenant_id, source_id):
+    pending, to_earning = SOURCES[source]
+    try:
+        return award(tenant_id, [to_earning(row) for row in pending(tenant_id).filter(pk=source_id)])
+    except IntegrityError:
+        # A concurrent save of the same payment awarded it first
+        return 0
+
+
+def award_job(tenant_id, job_id):
+    """Award a PAID job's points unless it already earned them"""
+    return _award_one('job', tenant_id, job_id)
+
+
+def award_visit(tenant_id, visit_id):
+    """Award a PAID visit's points unless it already earned them"""
+    return _award_one('visit', tenant_id, visit_id)
+
+
+def backfill(tenant_id, source, chunk_size=1000):
+    """
+    Award the tenant's pending ``source`` ('job' or 'visit') payments in id
+    order, one transaction per ``chunk_size`` payments. Tier multipliers are
+    those of the customers when their chunk runs. Yields ``(payments,
+    awarded)`` per chunk.
+    """
+    program = load_program(tenant_id)
+    if program is None:
+        return
+    pending, to_earning = SOURCES[source]
+    last_id = 0
+    while True:
+        rows = list(pending(tenant_id).filter(pk__gt=last_id)[:chunk_size])
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield len(rows), award(tenant_id, [to_earning(row) for row in rows], program)
@@ -0,0 +1,123 @@
+"""
+Expiry of loyalty points.
+
+EARNED PointTransaction lots carry ``expires_at`` (loyalty.accrual). Points
+are drawn first in, first out: redemptions and earlier expiries use up the
+lots that expire first. So once a customer's lots due on or before a day
+add up to more than has been drawn so far, the difference expires. Per
+CustomerLoyalty account::
+
+    due      = sum of EARNED lots with expires_at <= day
+    drawn    = -(sum of REDEEMED and EXPIRED transactions)
+    expiring = min(due - drawn, available_points)
+
+``expire_tenant`` walks the accounts that have due lots, found through the
+(tenant, expires_at) index on EARNED lots, in id order. Each chunk is one
+short transaction:
+
+- the chunk's CustomerLoyalty rows are locked in id order, so overlapping
+  runs queue instead of deadlocking,
+- one aggregate query computes ``expiring`` under the lock,
+- one UPDATE lowers the balances, and one bulk insert records the EXPIRED
+  transactions; Customer balances follow through loyalty.ledger.
+
+A second run finds nothing left to expire. Tenants share no rows, so they
+can be processed in parallel (``expire_loyalty_points --workers``).
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from loyalty import ledger
+from loyalty.models import CustomerLoyalty, PointTransaction
+from tenants.models import Tenant
+
+
+def due_accounts(tenant_id, day):
+    """Ids of the tenant's CustomerLoyalty accounts with lots due by ``day``, ascending"""
+    return (
+        PointTransaction.all_objects
+        .filter(tenant_id=tenant_id, transaction_type='EARNED', expires_at__lte=day)
+        .order_by('customer_loyalty_id')
+        .values_list('customer_loyalty_id', flat=True)
+        .distinct()
+    )
+
+
+def expire_tenant(tenant_id, day=None, chunk_size=500):
+    """
+    Expire the points of one tenant's lots due by ``day`` (default today),
+    ``chunk_size`` accounts per transaction.
+
+    Returns ``{'tenant': name, 'accounts', 'points', 'seconds'}``; ``accounts``
+    counts those that lost points.
+    """
+    day = day or timezone.localdate()
+    tenant = Tenant.objects.get(pk=tenant_id)
+    started = time.perf_counter()
+    accounts = points = 0
+    last_id = 0
+    while True:
+        account_ids = list(due_accounts(tenant_id, day).filter(customer_loyalty_id__gt=last_id)[:chunk_size])
+        if not account_ids:
+            break
+        last_id = account_ids[-1]
+        expired = expire_chunk(tenant_id, account_ids, day)
+        accounts += len(expired)
+        points += sum(expired.values())
+    return {
+        'tenant': tenant.name,
+        'accounts': accounts,
+        'points': points,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def expire_chunk(tenant_id, account_ids, day):
+    """Expire what is due by ``day`` on ``account_ids``; returns ``{account_id: points expired}``"""
+    with transaction.atomic():
+        balances = {
+            pk: (customer_id, available)
+            for pk, customer_id, available in (
+                CustomerLoyalty.all_objects.filter(tenant_id=tenant_id, pk__in=account_ids)
+                .select_for_update().order_by('pk')
+                .values_list('pk', 'customer_id', 'available_points')
+            )
+        }
+        totals = (
+            PointTransaction.all_objects.filter(customer_loyalty_id__in=balances)
+            .values('customer_loyalty_id')
+            .annotate(
+                due=Sum('points', filter=Q(transaction_type='EARNED', expires_at__lte=day), default=0),
+                drawn=Sum('points', filter=Q(transaction_type__in=['REDEEMED', 'EXPIRED']), default=0),
+            )
+            .values_list('customer_loyalty_id', 'due', 'drawn')
+        )
+        expiring = {}
+        for pk, due, drawn in totals:
+            # drawn is negative: redemptions and expiries are stored as such
+            points = min(due + drawn, balances[pk][1])
+            if points > 0:
+                expiring[pk] = points
+        if not expiring:
+            return {}
+
+        CustomerLoyalty.all_objects.filter(pk__in=expiring).update(
+            available_points=F('available_points') - ledger.by_pk(expiring),
+            updated_at=timezone.now(),
+        )
+        PointTransaction.all_objects.bulk_create([
+            PointTransaction(
+                tenant_id=tenant_id, customer_loyalty_id=pk, points=-points,
+                transaction_type='EXPIRED', description=f'Expired on {day}',
+            )
+            for pk, points in expiring.items()
+        ], batch_size=1000)
+        ledger.adjust_many(
+            tenant_id,
+            [(balances[pk][0], -points, f'Expired on {day}') for pk, points in expiring.items()],
+            transaction_type='EXPIRED',
+        )
+    return expiring
@@ -0,0 +1,170 @@
+"""
+Loyalty point ledger of customers.
+
+Balances live on Customer (``loyalty_points`` available, and
+``total_lifetime_points``, which decides the tier). Every change goes
+through this module, so it is applied by the database and never lost to a
+concurrent writer:
+
+- the balances are moved by one ``UPDATE ... SET x = x + delta ...
+  RETURNING`` per customer, or per batch of customers with a ``CASE`` on the
+  primary key, so no row is read into Python and written back,
+- the returned lifetime totals are resolved against the tenant's cached
+  tier table (loyalty.tiers) in memory; only customers whose tier changes
+  get a second UPDATE (one per target tier),
+- each adjustment is recorded as a LoyaltyTransaction, bulk-inserted.
+
+Positive adjustments count towards the lifetime total; negative ones only
+reduce the available balance, which ``floor_at_zero`` keeps from going
+negative. Adjustments only ever promote: a customer moves when the tier
+the lifetime total resolves to has a higher threshold than the current
+one, never to "no tier" or to a lower tier after thresholds were raised
+(that is ``recompute_tiers``' job).
+"""
+from django.db import connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.sql import UpdateQuery
+from django.utils import timezone
+
+from customers.models import Customer
+from loyalty.models import LoyaltyTransaction
+from loyalty.tiers import tier_table
+
+# Customers per UPDATE in adjust_many; bounds the size of the CASE statement
+BATCH_SIZE = 500
+
+BALANCE_FIELDS = ('loyalty_points', 'total_lifetime_points', 'current_tier_id', 'tier_achieved_date')
+
+
+def adjust(customer, points, reason, adjusted_by=None, transaction_type='ADJUSTMENT'):
+    """
+    Add ``points`` (negative to deduct) to ``customer`` and record the
+    LoyaltyTransaction. ``customer``'s balance and tier fields are refreshed
+    with the stored values.
+    """
+    balances = adjust_many(
+        customer.tenant_id, [(customer.pk, points, reason)],
+        adjusted_by=adjusted_by, transaction_type=transaction_type,
+    )
+    if customer.pk in balances:
+        _apply_balance(customer, balances[customer.pk])
+    return customer
+
+
+def adjust_many(tenant_id, adjustments, adjusted_by=None, transaction_type='ADJUSTMENT', floor_at_zero=False):
+    """
+    Apply ``[(customer_id, points, reason), ...]`` for customers of one
+    tenant and record one LoyaltyTransaction per entry. Runs a constant
+    number of queries per BATCH_SIZE customers, in one transaction. With
+    ``floor_at_zero`` the available balance stops at 0 rather than going
+    negative; the transactions still record the points asked for.
+
+    Returns ``{customer_id: (loyalty_points, total_lifetime_points,
+    current_tier_id, tier_achieved_date)}`` after the adjustment; unknown
+    customers are skipped.
+    """
+    deltas = {}
+    for customer_id, points, _ in adjustments:
+        available, lifetime = deltas.get(customer_id, (0, 0))
+        deltas[customer_id] = (available + points, lifetime + max(points, 0))
+    if not deltas:
+        return {}
+
+    tiers = tier_table(tenant_id)
+    balances = {}
+    with transaction.atomic():
+        customer_ids = sorted(deltas)
+        for start in range(0, len(customer_ids), BATCH_SIZE):
+            batch = customer_ids[start:start + BATCH_SIZE]
+            available = F('loyalty_points') + by_pk({pk: deltas[pk][0] for pk in batch})
+            if floor_at_zero:
+                available = Greatest(available, Value(0))
+            rows = update_returning(
+                Customer.objects.filter(tenant_id=tenant_id, pk__in=batch),
+                {
+                    'loyalty_points': available,
+                    'total_lifetime_points': F('total_lifetime_points') + by_pk({pk: deltas[pk][1] for pk in batch}),
+                    'updated_at': timezone.now(),
+                },
+                ('pk',) + BALANCE_FIELDS,
+            )
+            for customer_id, *balance in rows:
+                balances[customer_id] = tuple(balance)
+        _promote(balances, tiers)
+
+        LoyaltyTransaction.objects.bulk_create([
+            LoyaltyTransaction(
+                tenant_id=tenant_id, customer_id=customer_id, points=points, reason=reason,
+                transaction_type=transaction_type, adjusted_by=adjusted_by,
+            )
+            for customer_id, points, reason in adjustments
+            if customer_id in balances
+        ], batch_size=1000)
+    return balances
+
+
+def _promote(balances, tiers):
+    """Move customers whose lifetime total reached a higher tier than their current one"""
+    if not tiers:
+        return
+    today = timezone.localdate()
+    moves = {}
+    for customer_id, (available, lifetime, tier_id, achieved) in balances.items():
+        new_tier = tiers.resolve(lifetime)
+        if new_tier is None or new_tier == tier_id:
+            continue
+        current = tiers.threshold(tier_id)
+        if current is None or tiers.threshold(new_tier) > current:
+            moves.setdefault(new_tier, []).append(customer_id)
+            balances[customer_id] = (available, lifetime, new_tier, today)
+    for tier_id, customer_ids in moves.items():
+        Customer.objects.filter(pk__in=customer_ids).update(
+            current_tier_id=tier_id, tier_achieved_date=today
+        )
+
+
+def by_pk(values):
+    """``CASE id WHEN ... THEN value END`` for ``{pk: int value}`` of one batch"""
+    if len(values) == 1:
+        return Value(next(iter(values.values())))
+    return Case(
+        *[When(pk=pk, then=Value(value)) for pk, value in values.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _apply_balance(customer, balance):
+    for name, value in zip(BALANCE_FIELDS, balance):
+        setattr(customer, name, value)
+    # The stored values are now the loaded ones (core.models.DirtyFieldsMixin)
+    customer._snapshot_fields(BALANCE_FIELDS)
+
+
+def update_returning(queryset, values, returning):
+    """
+    Run ``queryset.update(**values)`` as one ``UPDATE ... RETURNING`` and
+    return the ``returning`` fields of the updated rows as tuples.
+
+    Django has no public API for this. The steps below mirror
+    QuerySet.update() and SQLUpdateCompiler as of Django 5.2 (chain to an
+    UpdateQuery, add_update_values, as_sql), which is why requirements.txt
+    pins Django to 5.2.x; before raising the pin, check that
+    LedgerTests.test_update_returning_matches_queryset_update still passes.
+    """
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    query.annotations = {}
+    connection = connections[queryset.db]
+    # as_sql() runs pre_sql_setup(), which rewrites filters across relations
+    # into a pk subquery as update() does
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    meta = queryset.model._meta
+    columns = ', '.join(
+        connection.ops.quote_name((meta.pk if name == 'pk' else meta.get_field(name)).column)
+        for name in returning
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} RETURNING {columns}', params)
+        return cursor.fetchall()
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from loyalty.accrual import SOURCES, backfill, load_program
+
+
+class Command(BaseCommand):
+    help = 'Awards loyalty points for paid jobs and visits that have not earned them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only backfill this tenant (default: all tenants)',
+        )
+        parser.add_argument(
+            '--source',
+            choices=sorted(SOURCES),
+            help='Only replay jobs or visits (default: both)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of payments awarded per transaction (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['subdomain']:
+            tenants = tenants.filter(subdomain=options['subdomain'])
+            if not tenants.exists():
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+
+        sources = [options['source']] if options['source'] else sorted(SOURCES)
+        chunk_size = max(options['chunk_size'], 1)
+
+        for tenant in tenants:
+            if load_program(tenant.id) is None:
+                self.stdout.write(f'{tenant.name}: no loyalty configuration, skipped')
+                continue
+
+            for source in sources:
+                started = time.monotonic()
+                payments = awarded = 0
+                for rows, earned in backfill(tenant.id, source, chunk_size):
+                    payments += rows
+                    awarded += earned
+                elapsed = time.monotonic() - started
+                rate = payments / elapsed if elapsed else 0
+                self.stdout.write(self.style.SUCCESS(
+                    f'{tenant.name}: {payments} paid {source}(s) replayed, {awarded} awarded '
+                    f'in {elapsed:.2f}s ({rate:.0f} rows/s)'
+                ))
@@ -0,0 +1,80 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from core.parallel import run_per_tenant
+from loyalty.expiry import expire_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Expires loyalty points whose lots are past their expiry date, oldest lots first. '
+        'Tenants run in parallel worker processes; re-runs expire nothing twice.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            dest='day',
+            type=date.fromisoformat,
+            help='Expire lots due on or before this day, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only expire this tenant (default: all tenants)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Worker processes; 1 runs in-process (default: 4)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Loyalty accounts expired per transaction (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+
+        tenants = Tenant.objects.all()
+        if options['subdomain']:
+            tenants = tenants.filter(subdomain=options['subdomain'])
+            if not tenants.exists():
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+        tenant_ids = list(tenants.values_list('id', flat=True))
+
+        started = time.perf_counter()
+        results = []
+        failures = 0
+
+        for tenant_id, result, error in run_per_tenant(
+            expire_tenant, tenant_ids, (options['day'], chunk_size), workers=options['workers']
+        ):
+            if error is not None:
+                failures += 1
+                self.stderr.write(self.style.ERROR(f'Tenant {tenant_id} failed: {error}'))
+            else:
+                results.append(self.report(result))
+
+        elapsed = time.perf_counter() - started
+        accounts = sum(result['accounts'] for result in results)
+        points = sum(result['points'] for result in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {points} points on {accounts} account(s) of {len(results)} tenant(s) in {elapsed:.1f}s'
+        ))
+        if failures:
+            raise CommandError(f'{failures} tenant(s) failed; re-run to retry them')
+
+    def report(self, result):
+        if result['accounts']:
+            self.stdout.write(
+                f"  {result['tenant']}: {result['points']} points on {result['accounts']} account(s) "
+                f"in {result['seconds']:.1f}s"
+            )
+        return result
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from loyalty.tiers import invalidate_tier_table, recompute_tiers
+
+
+class Command(BaseCommand):
+    help = 'Moves every customer to the loyalty tier their lifetime points reach under the current thresholds'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only recompute this tenant (default: all tenants)',
+        )
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['subdomain']:
+            tenants = tenants.filter(subdomain=options['subdomain'])
+            if not tenants.exists():
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+
+        for tenant in tenants:
+            # Tiers may have been edited outside the API (admin, shell)
+            invalidate_tier_table(tenant.id)
+            moved = recompute_tiers(tenant.id)
+            self.stdout.write(self.style.SUCCESS(f'{tenant.name}: {moved} customer(s) changed tier'))
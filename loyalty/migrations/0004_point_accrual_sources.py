@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loyalty', '0003_tenant_aware_managers'),
+        ('operations', '0007_tenant_aware_managers'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointtransaction',
+            name='visit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_transactions', to='operations.visit'),
+        ),
+        migrations.AddConstraint(
+            model_name='pointtransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('job__isnull', False), ('transaction_type', 'EARNED')), fields=('job',), name='pointtx_earned_job_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='pointtransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_type', 'EARNED'), ('visit__isnull', False)), fields=('visit',), name='pointtx_earned_visit_uniq'),
+        ),
+    ]
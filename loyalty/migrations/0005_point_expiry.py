@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loyalty', '0004_point_accrual_sources'),
+        ('operations', '0007_tenant_aware_managers'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loyaltytransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('EARNED', 'Earned'), ('ADJUSTMENT', 'Manual Adjustment'), ('REDEEMED', 'Redeemed'), ('BONUS', 'Bonus'), ('PENALTY', 'Penalty'), ('EXPIRED', 'Expired')], default='ADJUSTMENT', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='pointtransaction',
+            index=models.Index(condition=models.Q(('transaction_type', 'EARNED')), fields=['tenant', 'expires_at'], name='pointtx_tenant_expires_idx'),
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.utils import timezone
 from datetime import timedelta
 from core.models import TenantAwareModel
 from customers.models import Customer
-from operations.models import Job
+from operations.models import Job, Visit
 from services.models import Service
 
 class LoyaltyConfiguration(TenantAwareModel):
@@ -51,11 +51,32 @@ class PointTransaction(TenantAwareModel):
     
     customer_loyalty = models.ForeignKey(CustomerLoyalty, on_delete=models.CASCADE, related_name='transactions')
     job = models.ForeignKey(Job, on_delete=models.SET_NULL, null=True, blank=True, related_name='loyalty_transactions')
+    visit = models.ForeignKey(Visit, on_delete=models.SET_NULL, null=True, blank=True, related_name='loyalty_transactions')
     points = models.IntegerField()
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPE_CHOICES)
     expires_at = models.DateField(blank=True, null=True)
     description = models.CharField(max_length=255, blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            # A paid job or visit earns points once (loyalty.accrual)
+            models.UniqueConstraint(
+                fields=['job'], condition=models.Q(transaction_type='EARNED', job__isnull=False),
+                name='pointtx_earned_job_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['visit'], condition=models.Q(transaction_type='EARNED', visit__isnull=False),
+                name='pointtx_earned_visit_uniq',
+            ),
+        ]
+        indexes = [
+            # Point lots due to expire (loyalty.expiry)
+            models.Index(
+                fields=['tenant', 'expires_at'], condition=models.Q(transaction_type='EARNED'),
+                name='pointtx_tenant_expires_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type}: {self.points} pts"
 
@@ -71,6 +92,7 @@ class LoyaltyTransaction(TenantAwareModel):
         ('REDEEMED', 'Redeemed'),
         ('BONUS', 'Bonus'),
         ('PENALTY', 'Penalty'),
+        ('EXPIRED', 'Expired'),
     )
     
     customer = models.ForeignKey('customers.Customer', on_delete=models.CASCADE, related_name='loyalty_adjustments')
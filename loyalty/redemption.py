@@ -0,0 +1,68 @@
+"""
+Redemption of loyalty points.
+
+The balance check and the deduction are one statement, ``UPDATE ... SET
+available_points = available_points - n WHERE id = ... AND
+available_points >= n RETURNING available_points``. Of two simultaneous
+redemptions that together exceed the balance, the second UPDATE waits for
+the first to commit, re-evaluates its condition against the new balance
+and matches nothing. No row is read into Python and written back, so no
+lock is taken before the balance is known to suffice.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from loyalty import ledger
+from loyalty.models import CustomerLoyalty, PointTransaction
+
+
+class InsufficientPoints(Exception):
+    def __init__(self, required, available):
+        super().__init__(f'Insufficient points. Required: {required}, Available: {available}')
+        self.required = required
+        self.available = available
+
+
+def redeem(account, option, redeemed_by=None):
+    """
+    Deduct ``option.points_required`` (a RedemptionOption) from ``account``
+    (a CustomerLoyalty) and record the REDEEMED PointTransaction and ledger
+    entry, in one transaction. Returns the new available balance, also set
+    on ``account``.
+
+    Raises InsufficientPoints, with nothing written, when the balance does
+    not cover the option.
+    """
+    required = option.points_required
+    with transaction.atomic():
+        rows = ledger.update_returning(
+            CustomerLoyalty.all_objects.filter(pk=account.pk, available_points__gte=required),
+            {'available_points': F('available_points') - required, 'updated_at': timezone.now()},
+            ('available_points',),
+        )
+        if not rows:
+            available = (
+                CustomerLoyalty.all_objects.filter(pk=account.pk)
+                .values_list('available_points', flat=True).first()
+            )
+            raise InsufficientPoints(required, available or 0)
+
+        PointTransaction.all_objects.create(
+            tenant_id=account.tenant_id,
+            customer_loyalty_id=account.pk,
+            points=-required,
+            transaction_type='REDEEMED',
+            description=f'Redeemed: {option.name}',
+        )
+        # Keeps Customer.loyalty_points, which earned points also go to, in
+        # step. The guard above is on the account's balance, which may hold
+        # points the customer's does not, so the debit stops at zero.
+        ledger.adjust_many(
+            account.tenant_id, [(account.customer_id, -required, f'Redeemed: {option.name}')],
+            adjusted_by=redeemed_by, transaction_type='REDEEMED', floor_at_zero=True,
+        )
+
+    account.available_points = rows[0][0]
+    account._snapshot_fields(['available_points'])
+    return account.available_points
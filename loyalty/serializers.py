@@ -3,16 +3,17 @@ from loyalty.models import (
     LoyaltyConfiguration, LoyaltyTier, CustomerLoyalty,
     PointTransaction, RedemptionOption
 )
+from core.serializers import TenantModelSerializer
 
 
-class LoyaltyConfigurationSerializer(serializers.ModelSerializer):
+class LoyaltyConfigurationSerializer(TenantModelSerializer):
     class Meta:
         model = LoyaltyConfiguration
         fields = ['id', 'points_per_dollar', 'points_expiry_days', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class LoyaltyTierSerializer(serializers.ModelSerializer):
+class LoyaltyTierSerializer(TenantModelSerializer):
     tier_name = serializers.CharField(source='get_name_display', read_only=True)
     
     class Meta:
@@ -24,7 +25,7 @@ class LoyaltyTierSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class PointTransactionSerializer(serializers.ModelSerializer):
+class PointTransactionSerializer(TenantModelSerializer):
     class Meta:
         model = PointTransaction
         fields = [
@@ -34,7 +35,7 @@ class PointTransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class CustomerLoyaltySerializer(serializers.ModelSerializer):
+class CustomerLoyaltySerializer(TenantModelSerializer):
     tier_name = serializers.CharField(source='current_tier.get_name_display', read_only=True)
     tier_details = LoyaltyTierSerializer(source='current_tier', read_only=True)
     recent_transactions = PointTransactionSerializer(
@@ -53,7 +54,7 @@ class CustomerLoyaltySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'total_points', 'available_points', 'tier_achieved_date', 'created_at', 'updated_at']
 
 
-class RedemptionOptionSerializer(serializers.ModelSerializer):
+class RedemptionOptionSerializer(TenantModelSerializer):
     service_name = serializers.CharField(source='free_service.name', read_only=True, allow_null=True)
     
     class Meta:
@@ -0,0 +1,36 @@
+"""
+Signal receivers that award loyalty points (loyalty.accrual) once a Job or
+Visit moves to PAID and the payment has committed.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from loyalty import accrual
+from operations.models import Job, Visit
+
+
+def _became_paid(instance, created, update_fields):
+    if instance.status != 'PAID':
+        return False
+    if created:
+        return True
+    if update_fields is not None and 'status' not in update_fields:
+        return False
+    return instance.previous_value('status') != 'PAID'
+
+
+@receiver(post_save, sender=Job)
+def job_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or not _became_paid(instance, created, update_fields):
+        return
+    transaction.on_commit(partial(accrual.award_job, instance.tenant_id, instance.pk))
+
+
+@receiver(post_save, sender=Visit)
+def visit_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or instance.customer_id is None or not _became_paid(instance, created, update_fields):
+        return
+    transaction.on_commit(partial(accrual.award_visit, instance.tenant_id, instance.pk))
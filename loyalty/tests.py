@@ -1,3 +1,485 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Car, Customer
+from loyalty import expiry, ledger, redemption, tiers
+from loyalty.models import (
+    CustomerLoyalty, LoyaltyConfiguration, LoyaltyTier, LoyaltyTransaction, PointTransaction, RedemptionOption
+)
+from operations.models import Job, JobItem, Visit, VisitService
+from services.models import Category, Service
+from tenants.models import Tenant
+from users.models import User
+
+
+class LoyaltyTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        tiers._local_tables.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123', tenant=self.tenant, role='OWNER'
+        )
+        self.bronze = LoyaltyTier.objects.create(tenant=self.tenant, name='BRONZE', min_points_required=100)
+        self.silver = LoyaltyTier.objects.create(
+            tenant=self.tenant, name='SILVER', min_points_required=500, points_multiplier='1.50'
+        )
+        self.gold = LoyaltyTier.objects.create(
+            tenant=self.tenant, name='GOLD', min_points_required=1000, points_multiplier='2.00'
+        )
+        self.customer = self.make_customer(0)
+
+    def make_customer(self, number):
+        return Customer.objects.create(
+            tenant=self.tenant, first_name='Abebe', last_name=str(number), phone_number=f'+2519110{number:05d}'
+        )
+
+
+class LedgerTests(LoyaltyTestCase):
+    """Point adjustments are applied by the database, tiers resolved in memory"""
+
+    def test_adjust_moves_balances_and_tier(self):
+        ledger.adjust(self.customer, 600, 'Welcome bonus', adjusted_by=self.user, transaction_type='BONUS')
+        self.assertEqual((self.customer.loyalty_points, self.customer.total_lifetime_points), (600, 600))
+        self.assertEqual(self.customer.current_tier, self.silver)
+        self.assertIsNotNone(self.customer.tier_achieved_date)
+
+        self.customer.adjust_loyalty_points(-150, 'Correction')
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.loyalty_points, self.customer.total_lifetime_points), (450, 600))
+        # Deductions never demote
+        self.assertEqual(self.customer.current_tier_id, self.silver.id)
+        self.assertEqual(
+            list(LoyaltyTransaction.objects.order_by('id').values_list('points', 'transaction_type')),
+            [(600, 'BONUS'), (-150, 'ADJUSTMENT')],
+        )
+
+    def test_raised_thresholds_never_demote(self):
+        ledger.adjust(self.customer, 1200, 'Opening balance')
+        self.assertEqual(self.customer.current_tier_id, self.gold.id)
+
+        LoyaltyTier.objects.filter(pk=self.gold.pk).update(min_points_required=5000)
+        tiers.invalidate_tier_table(self.tenant.id)
+        # 1210 lifetime points now resolve to silver, below the customer's gold
+        ledger.adjust(self.customer, 10, 'Visit')
+        self.assertEqual(self.customer.current_tier_id, self.gold.id)
+
+        # A tier above the current one is still reached
+        LoyaltyTier.objects.filter(pk=self.silver.pk).update(min_points_required=6000)
+        tiers.invalidate_tier_table(self.tenant.id)
+        ledger.adjust(self.customer, 5000, 'Campaign')
+        self.assertEqual(self.customer.current_tier_id, self.silver.id)
+
+    def test_update_returning_matches_queryset_update(self):
+        # update_returning rebuilds QuerySet.update() from ORM internals; a
+        # Django upgrade that changes them must fail here first
+        ledger.adjust(self.customer, 1200, 'Opening balance')
+        queryset = Customer.objects.filter(tenant_id=self.tenant.id, current_tier__name='GOLD')
+        values = {'loyalty_points': F('loyalty_points') + 1}
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(queryset.update(**values), 1)
+        [expected] = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        with CaptureQueriesContext(connection) as queries:
+            rows = ledger.update_returning(queryset, values, ('pk', 'loyalty_points'))
+        [actual] = [query['sql'] for query in queries.captured_queries]
+
+        self.assertEqual(rows, [(self.customer.pk, 1202)])
+        self.assertEqual(actual, f'{expected} RETURNING "id", "loyalty_points"')
+
+    def test_concurrent_adjustments_are_not_lost(self):
+        first = Customer.objects.get(pk=self.customer.pk)
+        second = Customer.objects.get(pk=self.customer.pk)
+        first.adjust_loyalty_points(80, 'Cashier 1')
+        second.adjust_loyalty_points(70, 'Cashier 2')
+        self.assertEqual((second.loyalty_points, second.total_lifetime_points), (150, 150))
+        self.assertEqual(second.current_tier_id, self.bronze.id)
+
+    def test_adjust_many_runs_a_constant_number_of_queries(self):
+        customers = [self.make_customer(number) for number in range(1, 61)]
+        tiers.tier_table(self.tenant.id)
+
+        def run(batch):
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                balances = ledger.adjust_many(
+                    self.tenant.id, [(customer.id, 600, 'Campaign') for customer in batch]
+                )
+            return balances, len(queries.captured_queries)
+
+        balances, few = run(customers[:5])
+        balances, many = run(customers[5:])
+        self.assertEqual(few, many)
+        self.assertEqual(len(balances), 55)
+        self.assertEqual(
+            Customer.objects.filter(pk__in=[customer.id for customer in customers], current_tier=self.silver).count(), 60
+        )
+        self.assertEqual(LoyaltyTransaction.objects.count(), 60)
+
+    def test_adjust_many_sums_repeated_customers(self):
+        other = Customer.objects.create(
+            tenant=Tenant.objects.create(name='Other', subdomain='other'), first_name='Hana', phone_number='+251911999999'
+        )
+        balances = ledger.adjust_many(self.tenant.id, [
+            (self.customer.id, 700, 'Visit'), (self.customer.id, 400, 'Visit'), (self.customer.id, -50, 'Fix'),
+            (other.id, 100, 'Wrong tenant'),
+        ])
+        self.assertEqual(list(balances), [self.customer.id])
+        self.assertEqual(balances[self.customer.id][:3], (1050, 1100, self.gold.id))
+        other.refresh_from_db()
+        self.assertEqual(other.loyalty_points, 0)
+        self.assertEqual(LoyaltyTransaction.objects.count(), 3)
+
+    def test_adjust_endpoint_returns_the_new_balance(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            f'/api/v1/customers/{self.customer.id}/adjust_loyalty_points/', {'points': 120, 'reason': 'Goodwill'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['loyalty_points'], 120)
+
+
+class TierTableTests(LoyaltyTestCase):
+    """Tier tables are cached per tenant and re-read after LoyaltyTier writes"""
+
+    def test_resolve_uses_the_highest_threshold_reached(self):
+        table = tiers.tier_table(self.tenant.id)
+        self.assertEqual(
+            [table.resolve(points) for points in (0, 99, 100, 499, 500, 999, 1000, 50000)],
+            [None, None, self.bronze.id, self.bronze.id, self.silver.id, self.silver.id, self.gold.id, self.gold.id],
+        )
+        self.assertEqual(table.multiplier(self.gold.id), Decimal('2.00'))
+        self.assertEqual(table.multiplier(None), Decimal('1'))
+
+    def test_table_is_cached_until_a_tier_is_written_through_the_api(self):
+        tiers.tier_table(self.tenant.id)
+        with self.assertNumQueries(0):
+            tiers.tier_table(self.tenant.id)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f'/api/v1/loyalty-tiers/{self.silver.id}/', {'min_points_required': 300})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tiers.tier_table(self.tenant.id).resolve(300), self.silver.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete(f'/api/v1/loyalty-tiers/{self.gold.id}/')
+        self.assertEqual(tiers.tier_table(self.tenant.id).resolve(5000), self.silver.id)
+
+    def test_recompute_retiers_every_customer_in_one_update(self):
+        lifetimes = [50, 150, 450, 700, 1200]
+        customers = [self.make_customer(number) for number in range(1, len(lifetimes) + 1)]
+        for customer, lifetime in zip(customers, lifetimes):
+            ledger.adjust(customer, lifetime, 'Opening balance')
+        self.assertEqual(
+            [customer.current_tier_id for customer in customers],
+            [None, self.bronze.id, self.bronze.id, self.silver.id, self.gold.id],
+        )
+
+        # Bronze now starts above the first two customers, silver below the third
+        LoyaltyTier.objects.filter(pk=self.bronze.pk).update(min_points_required=200)
+        LoyaltyTier.objects.filter(pk=self.silver.pk).update(min_points_required=400)
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            moved = tiers.recompute_tiers(self.tenant.id)
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(moved, 2)
+        self.assertEqual(
+            [Customer.objects.get(pk=customer.pk).current_tier_id for customer in customers],
+            [None, None, self.silver.id, self.silver.id, self.gold.id],
+        )
+        self.assertIsNone(Customer.objects.get(pk=customers[1].pk).tier_achieved_date)
+
+    def test_recompute_command_reports_moved_customers(self):
+        ledger.adjust(self.customer, 600, 'Opening balance')
+        LoyaltyTier.objects.filter(pk=self.gold.pk).update(min_points_required=600)
+        out = StringIO()
+        call_command('recompute_loyalty_tiers', subdomain='test', stdout=out)
+        self.assertIn('1 customer(s) changed tier', out.getvalue())
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_tier_id, self.gold.id)
+
+
+class AccrualTests(LoyaltyTestCase):
+    """Paid jobs and visits earn points once, after the payment commits"""
+
+    def setUp(self):
+        super().setUp()
+        LoyaltyConfiguration.objects.create(tenant=self.tenant, points_per_dollar='2.00', points_expiry_days=365)
+        category = Category.objects.create(tenant=self.tenant, name='Wash')
+        self.service = Service.objects.create(
+            tenant=self.tenant, category=category, name='Full wash', price=Decimal('40.00'), duration_minutes=30
+        )
+        self.car = Car.objects.create(tenant=self.tenant, customer=self.customer, plate_number='AA-1234')
+
+    def make_job(self, customer, *prices):
+        car = self.car if customer == self.customer else Car.objects.create(
+            tenant=self.tenant, customer=customer, plate_number=f'AA-{customer.id}'
+        )
+        job = Job.objects.create(tenant=self.tenant, customer=customer, car=car)
+        for price in prices:
+            JobItem.objects.create(tenant=self.tenant, job=job, service=self.service, price=Decimal(price))
+        return job
+
+    def test_visit_payment_awards_points_once(self):
+        visit = Visit.objects.create(
+            tenant=self.tenant, customer=self.customer, customer_name='Abebe', car_info='Car', status='COMPLETED_WAITING_PICKUP'
+        )
+        VisitService.objects.create(tenant=self.tenant, visit=visit, service=self.service, price=Decimal('40.00'))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                f'/api/v1/visits/{visit.id}/process_payment/', {'payment_method': 'CASH', 'amount': '46.00', 'tip': '10.00'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+        # Tax and tip earn nothing: 40.00 x 2
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.loyalty_points, self.customer.current_tier_id), (80, None))
+        account = CustomerLoyalty.objects.get(customer=self.customer)
+        self.assertEqual((account.total_points, account.available_points), (80, 80))
+        lot = PointTransaction.objects.get(visit=visit)
+        self.assertEqual((lot.points, lot.transaction_type), (80, 'EARNED'))
+        self.assertEqual(lot.expires_at, timezone.localdate() + timedelta(days=365))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(f'/api/v1/visits/{visit.id}/process_payment/', {'payment_method': 'CASH', 'amount': '46.00'})
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.loyalty_points, 80)
+        self.assertEqual(PointTransaction.objects.count(), 1)
+
+    def test_paid_job_earns_with_the_tier_multiplier(self):
+        ledger.adjust(self.customer, 600, 'Opening balance')
+        job = self.make_job(self.customer, '20.00', '13.33')
+        job.status = 'PAID'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            job.save()
+        self.assertEqual(len(callbacks), 1)
+
+        # 33.33 x 2 x 1.5 (silver) = 99.99, rounded down
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.loyalty_points, self.customer.total_lifetime_points), (699, 699))
+        self.assertEqual(PointTransaction.objects.get(job=job).points, 99)
+        self.assertEqual(
+            LoyaltyTransaction.objects.filter(transaction_type='EARNED').values_list('reason', flat=True).get(),
+            f'Earned: Job #{job.id}',
+        )
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            job.save()
+        self.assertEqual(callbacks, [])
+
+    def test_backfill_replays_paid_jobs_and_visits_in_chunks(self):
+        customers = [self.make_customer(number) for number in range(1, 8)]
+        jobs = [self.make_job(customer, '60.00') for customer in customers]
+        self.make_job(self.customer, '500.00')
+        # Queryset updates skip the signals, as historical data would
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(status='PAID')
+        Visit.objects.create(
+            tenant=self.tenant, customer=self.customer, customer_name='Abebe', car_info='Car',
+            status='PAID', subtotal=Decimal('25.00'), paid_at=timezone.now() - timedelta(days=400),
+        )
+        Visit.objects.create(tenant=self.tenant, customer_name='Guest', car_info='Car', status='PAID', subtotal=Decimal('25.00'))
+
+        out = StringIO()
+        call_command('backfill_loyalty_points', subdomain='test', chunk_size=3, stdout=out)
+        self.assertIn('7 paid job(s) replayed, 7 awarded', out.getvalue())
+        self.assertIn('1 paid visit(s) replayed, 1 awarded', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+        self.assertEqual(
+            set(Customer.objects.filter(pk__in=[c.pk for c in customers]).values_list('loyalty_points', flat=True)),
+            {120},
+        )
+        self.assertEqual(Customer.objects.filter(current_tier=self.bronze).count(), 7)
+        lot = PointTransaction.objects.get(visit__isnull=False)
+        self.assertEqual(lot.points, 50)
+        self.assertLess(lot.expires_at, timezone.localdate())
+
+        out = StringIO()
+        call_command('backfill_loyalty_points', subdomain='test', stdout=out)
+        self.assertIn('0 paid job(s) replayed, 0 awarded', out.getvalue())
+        self.assertEqual(PointTransaction.objects.count(), 8)
+
+
+class ExpiryTests(LoyaltyTestCase):
+    """Due point lots expire oldest first, net of what was already drawn"""
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+
+    def earn(self, customer, points, expires_in):
+        account, _ = CustomerLoyalty.objects.get_or_create(tenant=self.tenant, customer=customer)
+        PointTransaction.objects.create(
+            tenant=self.tenant, customer_loyalty=account, points=points, transaction_type='EARNED',
+            expires_at=self.today + timedelta(days=expires_in),
+        )
+        CustomerLoyalty.objects.filter(pk=account.pk).update(
+            total_points=F('total_points') + points, available_points=F('available_points') + points
+        )
+        ledger.adjust(customer, points, 'Earned', transaction_type='EARNED')
+        return account
+
+    def redeem(self, account, points):
+        PointTransaction.objects.create(
+            tenant=self.tenant, customer_loyalty=account, points=-points, transaction_type='REDEEMED'
+        )
+        CustomerLoyalty.objects.filter(pk=account.pk).update(available_points=F('available_points') - points)
+
+    def test_expires_oldest_lots_net_of_redemptions(self):
+        account = self.earn(self.customer, 100, -10)
+        self.earn(self.customer, 50, 10)
+        self.redeem(account, 30)
+
+        result = expiry.expire_tenant(self.tenant.id)
+        self.assertEqual((result['accounts'], result['points']), (1, 70))
+        account.refresh_from_db()
+        self.assertEqual((account.available_points, account.total_points), (50, 150))
+        self.assertEqual(PointTransaction.objects.get(transaction_type='EXPIRED').points, -70)
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.loyalty_points, self.customer.total_lifetime_points), (80, 150))
+        self.assertEqual(LoyaltyTransaction.objects.get(transaction_type='EXPIRED').points, -70)
+
+        # Nothing is expired twice
+        self.assertEqual(expiry.expire_tenant(self.tenant.id)['points'], 0)
+        # The later lot expires once its day comes
+        self.assertEqual(expiry.expire_tenant(self.tenant.id, self.today + timedelta(days=10))['points'], 50)
+        account.refresh_from_db()
+        self.assertEqual(account.available_points, 0)
+
+    def test_never_expires_more_than_is_available(self):
+        account = self.earn(self.customer, 100, -1)
+        CustomerLoyalty.objects.filter(pk=account.pk).update(available_points=40)
+        self.assertEqual(expiry.expire_tenant(self.tenant.id)['points'], 40)
+        account.refresh_from_db()
+        self.assertEqual(account.available_points, 0)
+
+    def test_chunks_run_a_constant_number_of_queries(self):
+        accounts = [self.earn(self.make_customer(number), 200, -5) for number in range(1, 13)]
+
+        def run(account_ids):
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                expired = expiry.expire_chunk(self.tenant.id, account_ids, self.today)
+            return expired, len(queries.captured_queries)
+
+        tiers.tier_table(self.tenant.id)
+        expired, few = run([account.pk for account in accounts[:2]])
+        expired, many = run([account.pk for account in accounts[2:]])
+        self.assertEqual(few, many)
+        self.assertEqual(set(expired.values()), {200})
+
+        self.earn(self.customer, 10, -1)
+        out = StringIO()
+        call_command('expire_loyalty_points', subdomain='test', workers=1, chunk_size=5, stdout=out)
+        self.assertIn('Expired 10 points on 1 account(s) of 1 tenant(s)', out.getvalue())
+
+
+class RedemptionTests(LoyaltyTestCase):
+    """Redemptions deduct points only when the balance covers them"""
+
+    def setUp(self):
+        super().setUp()
+        self.account = CustomerLoyalty.objects.create(tenant=self.tenant, customer=self.customer, available_points=150)
+        self.option = RedemptionOption.objects.create(
+            tenant=self.tenant, name='Free wash', points_required=100, redemption_type='DISCOUNT', discount_value='10.00'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def redeem(self):
+        return self.client.post(
+            f'/api/v1/loyalty/{self.account.id}/redeem/', {'redemption_option_id': self.option.id}
+        )
+
+    def test_redeem_returns_the_new_balance(self):
+        response = self.redeem()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['loyalty']['available_points'], 50)
+        self.assertEqual(PointTransaction.objects.get(transaction_type='REDEEMED').points, -100)
+        self.assertEqual(
+            LoyaltyTransaction.objects.values_list('points', 'transaction_type', 'adjusted_by').get(),
+            (-100, 'REDEEMED', self.user.id),
+        )
+        # The customer's balance held no points of its own and stays at zero
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.loyalty_points, 0)
+
+    def test_redeem_debits_the_customer_balance(self):
+        Customer.objects.filter(pk=self.customer.pk).update(loyalty_points=120)
+        self.redeem()
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.loyalty_points, 20)
+
+    def test_insufficient_balance_writes_nothing(self):
+        self.redeem()
+        response = self.redeem()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Insufficient points. Required: 100, Available: 50')
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.available_points, 50)
+        self.assertEqual(PointTransaction.objects.filter(transaction_type='REDEEMED').count(), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite serialises writers with table locks, not row locks')
+class RedemptionConcurrencyTests(TransactionTestCase):
+    """Parallel redemptions on separate connections never overdraw the balance"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        customer = Customer.objects.create(tenant=self.tenant, first_name='Abebe', phone_number='+251911000001')
+        self.account = CustomerLoyalty.objects.create(tenant=self.tenant, customer=customer, available_points=300)
+        self.option = RedemptionOption.objects.create(
+            tenant=self.tenant, name='Free wash', points_required=100, redemption_type='DISCOUNT', discount_value='10.00'
+        )
+
+    def test_parallel_redemptions(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        outcomes = []
+        errors = []
+
+        def attempt():
+            try:
+                account = CustomerLoyalty.objects.get(pk=self.account.pk)
+                barrier.wait()
+                try:
+                    redemption.redeem(account, self.option)
+                    outcomes.append('redeemed')
+                except redemption.InsufficientPoints:
+                    outcomes.append('refused')
+            except Exception as exc:
+                # Would otherwise die with the thread and go unnoticed
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(outcomes), ['redeemed'] * 3 + ['refused'] * 5)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.available_points, 0)
+        self.assertEqual(PointTransaction.objects.filter(transaction_type='REDEEMED').count(), 3)
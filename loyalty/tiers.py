@@ -0,0 +1,154 @@
+"""
+Loyalty tier tables of tenants.
+
+A tenant's tiers are read on every point adjustment and accrual, and change
+rarely. ``tier_table(tenant_id)`` serves them as a TierTable (thresholds
+sorted ascending, resolved with bisect) from an in-process LRU, then the
+Django cache, and only then the database; the Django cache keeps tables
+for TIERS_CACHE_TIMEOUT only when it is shared between processes
+(core.localcache.shared_timeout). LoyaltyTierViewSet drops the
+cached table on every write (``invalidate_tier_table``); changing a
+threshold does not move existing customers until ``recompute_tiers`` (the
+``recompute_loyalty_tiers`` command) runs.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, DateField, Q, Value, When
+from django.utils import timezone
+
+from core.localcache import LocalCache, shared_timeout
+from customers.models import Customer
+from loyalty.models import LoyaltyTier
+
+TIERS_CACHE_TIMEOUT = 60 * 60
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_TTL = 30
+
+
+class TierTable:
+    """
+    Tiers of one tenant, lowest threshold first. Where two tiers share a
+    threshold the one created last wins, as the ordering by id decides.
+    """
+
+    __slots__ = ('thresholds', 'tier_ids', 'multipliers', 'tier_thresholds')
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.thresholds = [threshold for threshold, _, _ in rows]
+        self.tier_ids = [tier_id for _, tier_id, _ in rows]
+        self.multipliers = {tier_id: multiplier for _, tier_id, multiplier in rows}
+        self.tier_thresholds = {tier_id: threshold for threshold, tier_id, _ in rows}
+
+    def __bool__(self):
+        return bool(self.thresholds)
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    def resolve(self, lifetime_points):
+        """Id of the highest tier whose threshold ``lifetime_points`` reaches, or None"""
+        position = bisect_right(self.thresholds, lifetime_points)
+        return self.tier_ids[position - 1] if position else None
+
+    def multiplier(self, tier_id):
+        """Points multiplier of ``tier_id``; 1 without a tier"""
+        return self.multipliers.get(tier_id, Decimal('1'))
+
+    def threshold(self, tier_id):
+        """Points required for ``tier_id``; None without a tier or for a tier no longer in the table"""
+        return self.tier_thresholds.get(tier_id)
+
+    def ranges(self):
+        """
+        ``(tier_id, low, high)`` for every tier customers can resolve to,
+        ``high`` exclusive and None for the top tier.
+        """
+        bounds = self.thresholds[1:] + [None]
+        for tier_id, low, high in zip(self.tier_ids, self.thresholds, bounds):
+            if low != high:
+                yield tier_id, low, high
+
+
+_local_tables = LocalCache(max_size=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+
+
+def _tiers_key(tenant_id):
+    # Versioned with the pickled TierTable layout (its __slots__)
+    return f'loyalty:tiers:v2:{tenant_id}'
+
+
+def _load_tier_table(tenant_id):
+    return TierTable(
+        LoyaltyTier.all_objects.filter(tenant_id=tenant_id)
+        .values_list('min_points_required', 'id', 'points_multiplier')
+    )
+
+
+def tier_table(tenant_id):
+    """The tenant's TierTable, served from the in-process LRU, then the Django cache"""
+    table = _local_tables.get(tenant_id)
+    if table is not None:
+        return table
+
+    key = _tiers_key(tenant_id)
+    table = cache.get(key)
+    if table is None:
+        table = _load_tier_table(tenant_id)
+        cache.set(key, table, shared_timeout(TIERS_CACHE_TIMEOUT, LOCAL_CACHE_TTL))
+    _local_tables.set(tenant_id, table)
+    return table
+
+
+def invalidate_tier_table(tenant_id):
+    """
+    Drop the tenant's cached tiers after a LoyaltyTier write; again on
+    commit, so a copy cached from pre-commit data is not kept. Other
+    processes pick the change up once their LOCAL_CACHE_TTL runs out.
+    """
+    key = _tiers_key(tenant_id)
+
+    def drop():
+        cache.delete(key)
+        _local_tables.discard(tenant_id)
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def recompute_tiers(tenant_id):
+    """
+    Move every customer of the tenant to the tier its lifetime points
+    resolve to under the current thresholds, demoting as well as promoting
+    (customers below the lowest threshold lose their tier). One
+    ``UPDATE ... SET current_tier_id = CASE ...`` touches only the customers
+    whose tier changes; returns their number.
+    """
+    table = _load_tier_table(tenant_id)
+    today = timezone.localdate()
+
+    moved = Q(current_tier__isnull=False)
+    if table:
+        moved &= Q(total_lifetime_points__lt=table.thresholds[0])
+    whens = []
+    for tier_id, low, high in table.ranges():
+        in_range = Q(total_lifetime_points__gte=low)
+        if high is not None:
+            in_range &= Q(total_lifetime_points__lt=high)
+        moved |= in_range & ~Q(current_tier_id=tier_id)
+        whens.append(When(in_range, then=Value(tier_id)))
+
+    if whens:
+        tier = Case(*whens, default=Value(None), output_field=BigIntegerField())
+        achieved = Case(
+            When(total_lifetime_points__gte=table.thresholds[0], then=Value(today)),
+            default=Value(None), output_field=DateField(),
+        )
+    else:
+        tier = achieved = Value(None)
+    return Customer.all_objects.filter(Q(tenant_id=tenant_id) & moved).update(
+        current_tier_id=tier, tier_achieved_date=achieved, updated_at=timezone.now()
+    )
@@ -4,11 +4,13 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from datetime import timedelta
-from loyalty.models import CustomerLoyalty, PointTransaction, RedemptionOption, LoyaltyTier
+from loyalty.models import CustomerLoyalty, RedemptionOption, LoyaltyTier
 from loyalty.serializers import (
     CustomerLoyaltySerializer, PointTransactionSerializer,
     RedemptionOptionSerializer, LoyaltyTierSerializer
 )
+from loyalty import redemption
+from loyalty.tiers import invalidate_tier_table
 
 
 class CustomerLoyaltyViewSet(viewsets.ReadOnlyModelViewSet):
@@ -24,9 +26,7 @@ class CustomerLoyaltyViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['customer', 'current_tier']
     
     def get_queryset(self):
-        return CustomerLoyalty.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('customer', 'current_tier').prefetch_related('transactions')
+        return CustomerLoyalty.objects.select_related('customer', 'current_tier').prefetch_related('transactions')
     
     @action(detail=False, methods=['get'])
     def me(self, request):
@@ -64,25 +64,10 @@ class CustomerLoyaltyViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Check if customer has enough points
-        if loyalty.available_points < option.points_required:
-            return Response(
-                {'error': f'Insufficient points. Required: {option.points_required}, Available: {loyalty.available_points}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Deduct points
-        loyalty.available_points -= option.points_required
-        loyalty.save()
-        
-        # Create transaction
-        PointTransaction.objects.create(
-            tenant=request.user.tenant,
-            customer_loyalty=loyalty,
-            points=-option.points_required,
-            transaction_type='REDEEMED',
-            description=f"Redeemed: {option.name}"
-        )
+        try:
+            redemption.redeem(loyalty, option, redeemed_by=request.user)
+        except redemption.InsufficientPoints as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = self.get_serializer(loyalty)
         return Response({
@@ -98,9 +83,7 @@ class RedemptionOptionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['is_active', 'redemption_type']
     
     def get_queryset(self):
-        return RedemptionOption.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('free_service')
+        return RedemptionOption.objects.select_related('free_service')
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -111,7 +94,16 @@ class LoyaltyTierViewSet(viewsets.ModelViewSet):
     serializer_class = LoyaltyTierSerializer
     
     def get_queryset(self):
-        return LoyaltyTier.objects.filter(tenant=self.request.user.tenant).order_by('min_points_required')
+        return LoyaltyTier.objects.order_by('min_points_required')
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
+        invalidate_tier_table(self.request.user.tenant_id)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_tier_table(self.request.user.tenant_id)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_tier_table(self.request.user.tenant_id)
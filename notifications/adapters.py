@@ -0,0 +1,79 @@
+"""
+Channel adapters used by notifications.dispatch to deliver customer
+notifications.
+
+An adapter is instantiated once per worker process and its coroutine
+``send(notification, credentials)`` is awaited for each delivery. Raise
+DeliveryError for failures worth retrying and PermanentDeliveryError for
+those that are not (bad recipient, rejected credentials).
+
+The adapter for each channel is configured by dotted path in
+``settings.NOTIFICATION_ADAPTERS``; channels without one use FakeAdapter.
+"""
+import asyncio
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_ADAPTER = 'notifications.adapters.FakeAdapter'
+
+
+class DeliveryError(Exception):
+    """Delivery failed; the notification is retried with backoff"""
+
+
+class PermanentDeliveryError(DeliveryError):
+    """Delivery can never succeed; the notification is marked FAILED"""
+
+
+class ChannelAdapter:
+    """Base class for channel adapters"""
+
+    async def send(self, notification, credentials):
+        """
+        Deliver ``notification`` (a Notification instance, detached from the
+        database) using the tenant's NotificationChannel ``credentials``.
+        """
+        raise NotImplementedError
+
+
+class FakeAdapter(ChannelAdapter):
+    """
+    Local adapter that records deliveries in memory instead of calling a
+    provider. Used for development and tests.
+
+    ``failures`` maps a recipient to the number of deliveries to that
+    recipient that should fail before one succeeds (``None`` fails forever).
+    """
+    sent = []
+    failures = {}
+
+    def __init__(self, delay=0):
+        self.delay = delay
+
+    async def send(self, notification, credentials):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        remaining = self.failures.get(notification.recipient, 0)
+        if remaining is None:
+            raise PermanentDeliveryError(f'Recipient {notification.recipient} rejected')
+        if remaining:
+            self.failures[notification.recipient] = remaining - 1
+            raise DeliveryError(f'Provider unavailable for {notification.recipient}')
+        self.sent.append((notification.channel, notification.recipient, notification.subject, notification.message))
+
+    @classmethod
+    def reset(cls):
+        cls.sent.clear()
+        cls.failures.clear()
+
+
+def load_adapters():
+    """``{channel: adapter instance}`` for every notification channel"""
+    from notifications.models import Notification
+
+    configured = getattr(settings, 'NOTIFICATION_ADAPTERS', {})
+    return {
+        channel: import_string(configured.get(channel, DEFAULT_ADAPTER))()
+        for channel, _ in Notification.CHANNEL_CHOICES
+    }
@@ -0,0 +1,93 @@
+"""
+Per-user unread counters of system notifications.
+
+UnreadNotificationCounter holds the number of unread SystemNotifications of
+each user, so the badge (SystemNotificationViewSet.unread_count and the
+notification stream) reads one row instead of counting the user's history.
+
+Counters move with every write that changes unread rows:
+
+- single saves and deletes through notifications.signals,
+- bulk creates in notify_tenant and bulk reads in mark_all_read, explicitly.
+
+A user without a counter row has no unread notifications. Writes that
+bypass both paths (raw SQL, queryset.update elsewhere) make counters drift;
+reconcile() -- the reconcile_notification_counters command -- repairs them.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from notifications.models import SystemNotification, UnreadNotificationCounter
+
+
+def add_unread(tenant_id, user_ids, delta):
+    """Add ``delta`` to the unread counter of each of ``user_ids``"""
+    user_ids = list(user_ids)
+    if not delta or not user_ids:
+        return
+    if delta > 0:
+        # Make sure the rows exist, then increment; both are safe under concurrency
+        UnreadNotificationCounter.objects.bulk_create([
+            UnreadNotificationCounter(tenant_id=tenant_id, user_id=user_id, unread=0)
+            for user_id in user_ids
+        ], ignore_conflicts=True, batch_size=1000)
+    # A missing row already means zero unread, so decrements never create one
+    UnreadNotificationCounter.objects.filter(user_id__in=user_ids).update(
+        unread=F('unread') + delta, updated_at=timezone.now()
+    )
+
+
+def unread_count(user):
+    """Unread SystemNotifications of ``user``, in one query"""
+    from users.models import User
+
+    counter = UnreadNotificationCounter.objects.filter(user_id=OuterRef('pk')).values('unread')
+    # Only evaluated without a counter row; served by the partial
+    # (recipient, created_at) WHERE NOT is_read index
+    fallback = SystemNotification.objects.filter(
+        recipient_id=OuterRef('pk'), is_read=False
+    ).order_by().values('recipient_id').annotate(unread=Count('id')).values('unread')
+    unread = User.objects.filter(pk=user.id).annotate(
+        unread=Coalesce(Subquery(counter), Subquery(fallback), Value(0))
+    ).values_list('unread', flat=True).first()
+    return max(unread or 0, 0)
+
+
+def reconcile(tenant_id=None, dry_run=False):
+    """
+    Reset counters that disagree with the unread rows, optionally for one
+    tenant only. Returns ``{user_id: (counter, actual)}`` for every drifted
+    user (``counter`` is None when the row was missing).
+    """
+    notifications = SystemNotification.objects.filter(is_read=False)
+    counters = UnreadNotificationCounter.objects.all()
+    if tenant_id is not None:
+        notifications = notifications.filter(tenant_id=tenant_id)
+        counters = counters.filter(tenant_id=tenant_id)
+
+    actual = {
+        row['recipient_id']: (row['unread'], row['tenant_id'])
+        for row in notifications.values('recipient_id', 'tenant_id').annotate(unread=Count('id'))
+    }
+    current = dict(counters.values_list('user_id', 'unread'))
+    drift = {}
+    for user_id in set(actual) | set(current):
+        unread = actual.get(user_id, (0, None))[0]
+        if current.get(user_id) != unread:
+            drift[user_id] = (current.get(user_id), unread)
+    if dry_run or not drift:
+        return drift
+
+    UnreadNotificationCounter.objects.bulk_create([
+        UnreadNotificationCounter(tenant_id=actual[user_id][1], user_id=user_id, unread=0)
+        for user_id in drift if user_id not in current
+    ], ignore_conflicts=True, batch_size=1000)
+    # Recounted in the UPDATE itself, so increments since the scan above are kept
+    unread_rows = SystemNotification.objects.filter(
+        recipient_id=OuterRef('user_id'), is_read=False
+    ).order_by().values('recipient_id').annotate(unread=Count('id')).values('unread')
+    UnreadNotificationCounter.objects.filter(user_id__in=list(drift)).update(
+        unread=Coalesce(Subquery(unread_rows), Value(0)), updated_at=timezone.now()
+    )
+    return drift
@@ -0,0 +1,170 @@
+"""
+Outbox dispatch of customer notifications.
+
+Views only insert Notification rows (status PENDING); delivery happens in
+run_notification_worker processes:
+
+- claim_batch() locks due rows with SKIP LOCKED, so any number of workers
+  can share the table, and leases them (status SENDING, next_attempt_at in
+  the future). A lease that runs out -- the worker died -- makes the row
+  claimable again.
+- Dispatcher awaits the channel adapters (notifications.adapters) with at
+  most NOTIFICATION_CONCURRENCY deliveries in flight per channel.
+- A failed delivery is retried after an exponential backoff; after
+  NOTIFICATION_MAX_ATTEMPTS attempts, or a permanent error, the row is FAILED.
+  So is a row whose channel has no adapter in this worker.
+"""
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.adapters import PermanentDeliveryError, load_adapters
+from notifications.models import Notification, NotificationChannel
+
+DEFAULT_CONCURRENCY = 10
+LEASE_SECONDS = 300
+SEND_TIMEOUT_SECONDS = 30
+
+
+def max_attempts():
+    return getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+
+
+def backoff_delay(attempts):
+    """Wait before retrying a notification that has failed ``attempts`` times"""
+    base = getattr(settings, 'NOTIFICATION_RETRY_BASE_SECONDS', 30)
+    cap = getattr(settings, 'NOTIFICATION_RETRY_MAX_SECONDS', 60 * 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def claim_batch(limit):
+    """
+    Lease up to ``limit`` due notifications to this worker.
+
+    Returns ``[(notification, credentials)]`` where ``credentials`` is the
+    tenant's NotificationChannel.api_credentials (None when the tenant has
+    disabled the channel).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['PENDING', 'SENDING'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Notification.objects.filter(id__in=ids).update(
+            status='SENDING', next_attempt_at=now + timedelta(seconds=LEASE_SECONDS), updated_at=now
+        )
+    notifications = list(Notification.objects.filter(id__in=ids).order_by('next_attempt_at', 'id'))
+
+    channels = {
+        (channel.tenant_id, channel.channel_type): channel
+        for channel in NotificationChannel.objects.filter(
+            tenant_id__in={notification.tenant_id for notification in notifications},
+            channel_type__in={notification.channel for notification in notifications},
+        )
+    }
+    claimed = []
+    for notification in notifications:
+        channel = channels.get((notification.tenant_id, notification.channel))
+        if channel is None:
+            claimed.append((notification, {}))
+        else:
+            claimed.append((notification, channel.api_credentials if channel.is_active else None))
+    return claimed
+
+
+def record_success(notification):
+    now = timezone.now()
+    Notification.objects.filter(id=notification.id, status='SENDING').update(
+        status='SENT', sent_at=now, error_message=None, attempts=notification.attempts + 1, updated_at=now
+    )
+
+
+def record_failure(notification, error, permanent=False):
+    """Schedule a retry, or mark the notification FAILED when out of attempts"""
+    now = timezone.now()
+    attempts = notification.attempts + 1
+    if permanent or attempts >= max_attempts():
+        changes = {'status': 'FAILED'}
+    else:
+        changes = {'status': 'PENDING', 'next_attempt_at': now + backoff_delay(attempts)}
+    Notification.objects.filter(id=notification.id, status='SENDING').update(
+        error_message=error, attempts=attempts, updated_at=now, **changes
+    )
+
+
+class Dispatcher:
+    """
+    Delivers claimed notifications through the channel adapters. One
+    instance runs in each worker process's event loop.
+    """
+
+    def __init__(self, adapters=None, concurrency=None, batch_size=100):
+        self.adapters = adapters or load_adapters()
+        limits = {**getattr(settings, 'NOTIFICATION_CONCURRENCY', {}), **(concurrency or {})}
+        self.semaphores = {
+            channel: asyncio.Semaphore(limits.get(channel, DEFAULT_CONCURRENCY))
+            for channel in self.adapters
+        }
+        self.batch_size = batch_size
+
+    async def deliver(self, notification, credentials):
+        adapter = self.adapters.get(notification.channel)
+        if adapter is None:
+            await sync_to_async(record_failure)(
+                notification, f'No adapter is configured for the {notification.channel} channel', permanent=True
+            )
+            return False
+        async with self.semaphores[notification.channel]:
+            try:
+                if credentials is None:
+                    raise PermanentDeliveryError(f'{notification.channel} channel is disabled')
+                await asyncio.wait_for(adapter.send(notification, credentials), SEND_TIMEOUT_SECONDS)
+            except PermanentDeliveryError as exc:
+                await sync_to_async(record_failure)(notification, str(exc), permanent=True)
+                return False
+            except Exception as exc:
+                await sync_to_async(record_failure)(notification, str(exc) or exc.__class__.__name__)
+                return False
+        await sync_to_async(record_success)(notification)
+        return True
+
+    async def run_once(self):
+        """Claim one batch and deliver it; returns the number of notifications handled"""
+        claimed = await sync_to_async(claim_batch)(self.batch_size)
+        await asyncio.gather(*(self.deliver(notification, credentials) for notification, credentials in claimed))
+        return len(claimed)
+
+    async def run(self, poll_interval=1.0, drain=False):
+        """
+        Deliver until cancelled, keeping up to ``batch_size`` notifications in
+        flight. With ``drain`` the loop returns once nothing is due.
+
+        Returns the number of notifications handled.
+        """
+        in_flight = set()
+        handled = 0
+        while True:
+            if len(in_flight) < self.batch_size:
+                claimed = await sync_to_async(claim_batch)(self.batch_size - len(in_flight))
+                handled += len(claimed)
+                in_flight.update(
+                    asyncio.create_task(self.deliver(notification, credentials))
+                    for notification, credentials in claimed
+                )
+            if not in_flight:
+                if drain:
+                    return handled
+                await asyncio.sleep(poll_interval)
+                continue
+            _, in_flight = await asyncio.wait(
+                in_flight, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+            )
@@ -0,0 +1,74 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from notifications.models import SystemNotification
+from notifications.utils import create_notification_if_enabled, notify_tenant
+from tenants.models import Tenant
+from users.models import User
+
+ROLES = ['OWNER', 'MANAGER', 'FRONT_DESK', 'WORKER', 'STAFF']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway tenant with N users and compares broadcasting an event through '
+        'create_notification_if_enabled per user against notify_tenant'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500, help='Users to seed (default: 500)')
+        parser.add_argument('--events', type=int, default=20, help='Broadcasts per approach (default: 20)')
+        parser.add_argument(
+            '--category', type=str, default='LOW_STOCK', help='Category to broadcast (default: LOW_STOCK)'
+        )
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.create(name='Fan-out benchmark', subdomain=f'fanout-bench-{uuid.uuid4().hex[:8]}')
+        try:
+            User.objects.bulk_create([
+                User(
+                    username=f'{tenant.subdomain}-{number}',
+                    tenant=tenant,
+                    role=ROLES[number % len(ROLES)],
+                    password='!',
+                )
+                for number in range(options['users'])
+            ])
+            category = options['category']
+            users = list(User.objects.filter(tenant=tenant).select_related('tenant'))
+
+            def legacy():
+                for user in users:
+                    create_notification_if_enabled(user, category, 'Low stock', 'Benchmark event')
+
+            def fan_out():
+                notify_tenant(tenant, category, 'Low stock', 'Benchmark event')
+
+            for name, run in (('per user', legacy), ('notify_tenant', fan_out)):
+                timings, queries = self.measure(tenant, run, options['events'])
+                created = SystemNotification.objects.filter(tenant=tenant).count() // options['events']
+                self.stdout.write(
+                    f'{name:<14} {created} notifications/event, {queries} queries/event, '
+                    f'p50={statistics.median(timings):8.2f}ms max={max(timings):8.2f}ms'
+                )
+        finally:
+            tenant.delete()
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def measure(self, tenant, run, events):
+        run()  # warm caches and create missing preference rows
+        SystemNotification.objects.filter(tenant=tenant).delete()
+        timings = []
+        for _ in range(events):
+            # The query log is capped; per-user broadcasts overflow it
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings, len(queries.captured_queries)
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from notifications.retention import purge_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Purges system and customer notifications older than each tenant's retention policy, "
+        'archiving them to the archive table or compressed JSONL files. Rows move in small '
+        'transactions, so it can run alongside live traffic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only purge this tenant (default: all tenants)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows moved per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between chunks (default: 0)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be purged',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        tenants = Tenant.objects.order_by('name')
+        if options['subdomain']:
+            tenants = tenants.filter(subdomain=options['subdomain'])
+            if not tenants.exists():
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+
+        started = time.perf_counter()
+        totals = {}
+        for tenant in tenants:
+            results = purge_tenant(
+                tenant.id, chunk_size=chunk_size, pause=options['pause'], dry_run=options['dry_run']
+            )
+            for kind, result in results.items():
+                totals[kind] = totals.get(kind, 0) + result['rows']
+                if result['rows']:
+                    self.stdout.write(
+                        f"  {tenant.name}: {result['rows']} {kind.lower()} notification(s) "
+                        f"in {result['seconds']:.1f}s ({self.rate(result['rows'], result['seconds'])} rows/s)"
+                    )
+
+        elapsed = time.perf_counter() - started
+        moved = sum(totals.values())
+        summary = ', '.join(f'{rows} {kind.lower()}' for kind, rows in sorted(totals.items())) or 'nothing'
+        if options['dry_run']:
+            self.stdout.write(f'Would purge {summary} (dry run, nothing changed)')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Purged {summary} in {elapsed:.1f}s ({self.rate(moved, elapsed)} rows/s)'
+            ))
+
+    def rate(self, rows, seconds):
+        return f'{rows / seconds if seconds else 0:.0f}'
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Tenant
+from notifications.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recounts unread system notifications and repairs per-user unread counters that have drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subdomain',
+            type=str,
+            help='Only reconcile this tenant (default: all tenants)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted counters without repairing them',
+        )
+
+    def handle(self, *args, **options):
+        tenant_id = None
+        if options['subdomain']:
+            try:
+                tenant_id = Tenant.objects.get(subdomain=options['subdomain']).id
+            except Tenant.DoesNotExist:
+                raise CommandError(f'Tenant with subdomain "{options["subdomain"]}" not found')
+
+        drift = reconcile(tenant_id=tenant_id, dry_run=options['dry_run'])
+        for user_id, (counter, actual) in sorted(drift.items()):
+            self.stdout.write(f'  user {user_id}: counter {"missing" if counter is None else counter}, actual {actual}')
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drift)} counter(s) drifted (dry run, nothing changed)')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drift)} counter(s)'))
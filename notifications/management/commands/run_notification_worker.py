@@ -0,0 +1,84 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.parallel import run_in_processes
+from notifications.dispatch import Dispatcher
+from notifications.models import Notification
+
+
+def _concurrency(value):
+    try:
+        channel, limit = value.split('=')
+        channel, limit = channel.upper(), int(limit)
+    except ValueError:
+        raise ValueError(f'{value!r} is not CHANNEL=LIMIT')
+    if channel not in dict(Notification.CHANNEL_CHOICES) or limit < 1:
+        raise ValueError(f'{value!r} is not CHANNEL=LIMIT')
+    return channel, limit
+
+
+def _run(concurrency, batch_size, poll_interval, drain):
+    dispatcher = Dispatcher(concurrency=concurrency, batch_size=batch_size)
+    return asyncio.run(dispatcher.run(poll_interval=poll_interval, drain=drain))
+
+
+class Command(BaseCommand):
+    help = (
+        'Delivers queued customer notifications (SMS, WhatsApp, Telegram, Email) through the '
+        'configured channel adapters. Run as many workers as needed; they share the queue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Worker processes; 1 runs in-process (default: 1)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Notifications in flight per process (default: 100)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=_concurrency,
+            action='append',
+            default=[],
+            help='Per-channel limit of concurrent deliveries per process, e.g. SMS=5 (repeatable)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds between queue polls when idle (default: 1.0)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no notification is due instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        args = (dict(options['concurrency']), options['batch_size'], options['poll_interval'], options['once'])
+
+        self.stdout.write(f"Starting {options['processes']} notification worker process(es)")
+        try:
+            if options['processes'] <= 1:
+                handled = _run(*args)
+            else:
+                exit_codes = run_in_processes(_run, options['processes'], args)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+            return
+
+        if options['processes'] <= 1:
+            self.stdout.write(self.style.SUCCESS(f'Handled {handled} notification(s)'))
+            return
+        failed = sum(1 for code in exit_codes if code)
+        if failed:
+            raise CommandError(f'{failed} worker process(es) failed')
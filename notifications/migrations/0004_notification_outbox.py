@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def retire_placeholder_rows(apps, schema_editor):
+    # The old placeholder send() never delivered anything and left rows PENDING;
+    # do not let the new workers deliver that backlog of stale messages.
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.filter(status='PENDING').update(
+        status='FAILED', error_message='Not delivered: created before queued delivery was available'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_discount_fields_and_per_tenant_numbers'),
+        ('customers', '0003_customer_search_document'),
+        ('notifications', '0003_systemnotification_category_and_more'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When a worker may next pick this up'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('SENDING', 'Sending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='notification_queue_idx'),
+        ),
+        migrations.RunPython(retire_placeholder_rows, migrations.RunPython.noop),
+    ]
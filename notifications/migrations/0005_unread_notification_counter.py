@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:57
+
+import core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    SystemNotification = apps.get_model('notifications', 'SystemNotification')
+    UnreadNotificationCounter = apps.get_model('notifications', 'UnreadNotificationCounter')
+    rows = (
+        SystemNotification.objects.filter(is_read=False)
+        .values('recipient_id', 'tenant_id').annotate(unread=models.Count('id'))
+    )
+    UnreadNotificationCounter.objects.bulk_create([
+        UnreadNotificationCounter(user_id=row['recipient_id'], tenant_id=row['tenant_id'], unread=row['unread'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_outbox'),
+        ('tenants', '0004_alter_tenant_language'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadNotificationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('unread', models.IntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=(core.models.DirtyFieldsMixin, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='systemnotification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient', '-created_at'], name='sysnotif_unread_idx'),
+        ),
+        migrations.AddField(
+            model_name='unreadnotificationcounter',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant'),
+        ),
+        migrations.AddField(
+            model_name='unreadnotificationcounter',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='unread_notification_counter', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:00
+
+import core.models
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_discount_fields_and_per_tenant_numbers'),
+        ('customers', '0003_customer_search_document'),
+        ('notifications', '0005_unread_notification_counter'),
+        ('tenants', '0004_alter_tenant_language'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SYSTEM', 'System notification'), ('CUSTOMER', 'Customer notification')], max_length=10)),
+                ('original_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(help_text='When the original row was created')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificationRetentionPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('system_notification_days', models.PositiveIntegerField(blank=True, default=90, help_text='Days to keep in-app notifications; empty keeps them forever', null=True)),
+                ('notification_days', models.PositiveIntegerField(blank=True, default=365, help_text='Days to keep sent or failed customer notifications; empty keeps them forever', null=True)),
+                ('archive', models.CharField(choices=[('TABLE', 'Archive table'), ('FILE', 'Compressed JSONL files'), ('NONE', 'Delete without archiving')], default='TABLE', max_length=10)),
+            ],
+            bases=(core.models.DirtyFieldsMixin, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['tenant', 'created_at'], name='notif_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemnotification',
+            index=models.Index(fields=['tenant', 'created_at'], name='sysnotif_tenant_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationarchive',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant'),
+        ),
+        migrations.AddField(
+            model_name='notificationretentionpolicy',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchive',
+            index=models.Index(fields=['tenant', 'kind', 'created_at'], name='notification_archive_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationretentionpolicy',
+            constraint=models.UniqueConstraint(fields=('tenant',), name='unique_retention_policy_per_tenant'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_keyset_pagination_indexes'),
+        ('customers', '0003_customer_search_document'),
+        ('notifications', '0006_notification_retention'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_tenant_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['tenant', 'created_at', 'id'], name='notif_tenant_created_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 from core.models import TenantAwareModel
@@ -35,6 +36,7 @@ class Notification(TenantAwareModel):
     )
     STATUS_CHOICES = (
         ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
         ('SENT', 'Sent'),
         ('FAILED', 'Failed'),
     )
@@ -50,18 +52,36 @@ class Notification(TenantAwareModel):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     sent_at = models.DateTimeField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
+
+    # Outbox state, maintained by notifications.dispatch
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="When a worker may next pick this up")
     
     # Link to document
     receipt = models.ForeignKey(Receipt, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
     invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
 
+    class Meta:
+        indexes = [
+            # Queue scan of notifications.dispatch.claim_batch
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_queue_idx'),
+            # Retention purge (notifications.retention) and keyset pages (core.pagination)
+            models.Index(fields=['tenant', 'created_at', 'id'], name='notif_tenant_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.get_notification_type_display()} to {self.customer} via {self.get_channel_display()} ({self.status})"
 
     def send(self):
-        """Placeholder for actual sending logic"""
-        # TODO: Implement actual API calls based on channel
-        # For now, just mark as sent
+        """
+        Queue the notification for delivery. Rows are created PENDING, so new
+        notifications are already queued; this puts a FAILED one back in line.
+        The run_notification_worker command does the actual sending.
+        """
+        self.status = 'PENDING'
+        self.error_message = None
+        self.attempts = 0
+        self.next_attempt_at = timezone.now()
         self.save()
         return True
 
@@ -112,128 +132,87 @@ class SystemNotification(TenantAwareModel):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES, default='INFO')
-from django.db import models
-from django.utils import timezone
-from core.models import TenantAwareModel
-from customers.models import Customer
-from billing.models import Receipt, Invoice
-
-class NotificationChannel(TenantAwareModel):
-    CHANNEL_TYPE_CHOICES = (
-        ('WHATSAPP', 'WhatsApp'),
-        ('TELEGRAM', 'Telegram'),
-        ('EMAIL', 'Email'),
-        ('SMS', 'SMS'),
-    )
+    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, null=True, blank=True, help_text="Business-specific notification category")
+    link = models.CharField(max_length=255, blank=True, null=True, help_text="Optional link to navigate to")
     
-    channel_type = models.CharField(max_length=20, choices=CHANNEL_TYPE_CHOICES)
-    is_active = models.BooleanField(default=True)
-    api_credentials = models.JSONField(default=dict, help_text="Store API keys, tokens, etc.")
-
     class Meta:
-        unique_together = ('tenant', 'channel_type')
+        ordering = ['-created_at']
+        indexes = [
+            # Unread list and the unread COUNT fallback of notifications.counters
+            models.Index(
+                fields=['recipient', '-created_at'], condition=models.Q(is_read=False), name='sysnotif_unread_idx'
+            ),
+            # Retention purge (notifications.retention)
+            models.Index(fields=['tenant', 'created_at'], name='sysnotif_tenant_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.get_channel_type_display()} ({'Active' if self.is_active else 'Inactive'})"
+        return f"{self.title} - {self.recipient} ({'Read' if self.is_read else 'Unread'})"
 
-class Notification(TenantAwareModel):
-    NOTIFICATION_TYPE_CHOICES = (
-        ('RECEIPT', 'Receipt'),
-        ('INVOICE', 'Invoice'),
-    )
-    CHANNEL_CHOICES = (
-        ('WHATSAPP', 'WhatsApp'),
-        ('TELEGRAM', 'Telegram'),
-        ('EMAIL', 'Email'),
-        ('SMS', 'SMS'),
-    )
-    STATUS_CHOICES = (
-        ('PENDING', 'Pending'),
-        ('SENT', 'Sent'),
-        ('FAILED', 'Failed'),
-    )
-    
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='notifications')
-    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES)
-    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
-    recipient = models.CharField(max_length=255, help_text="Phone number or email")
-    
-    subject = models.CharField(max_length=255, blank=True, null=True)
-    message = models.TextField()
-    
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
-    sent_at = models.DateTimeField(blank=True, null=True)
-    error_message = models.TextField(blank=True, null=True)
-    
-    # Link to document
-    receipt = models.ForeignKey(Receipt, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
-    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
+
+class UnreadNotificationCounter(TenantAwareModel):
+    """
+    Number of unread SystemNotifications of a user, maintained by
+    notifications.counters so the badge never has to count. A missing row
+    means no unread notifications; reconcile_notification_counters repairs drift.
+    """
+    user = models.OneToOneField('users.User', on_delete=models.CASCADE, related_name='unread_notification_counter')
+    unread = models.IntegerField(default=0)
 
     def __str__(self):
-        return f"{self.get_notification_type_display()} to {self.customer} via {self.get_channel_display()} ({self.status})"
+        return f"{self.user_id}: {self.unread} unread"
 
-    def send(self):
-        """Placeholder for actual sending logic"""
-        # TODO: Implement actual API calls based on channel
-        # For now, just mark as sent
-        self.save()
-        return True
 
-class SystemNotification(TenantAwareModel):
+class NotificationRetentionPolicy(TenantAwareModel):
     """
-    In-app notifications for system users (Staff, Managers, Owners).
-    Separate from customer notifications (SMS/Email).
+    How long a tenant keeps notifications before purge_notifications removes
+    them, and where removed rows go. Tenants without a policy get the defaults.
     """
-    NOTIFICATION_TYPE_CHOICES = (
-        ('INFO', 'Info'),
-        ('WARNING', 'Warning'),
-        ('SUCCESS', 'Success'),
-        ('ERROR', 'Error'),
+    ARCHIVE_CHOICES = (
+        ('TABLE', 'Archive table'),
+        ('FILE', 'Compressed JSONL files'),
+        ('NONE', 'Delete without archiving'),
     )
-    
-    CATEGORY_CHOICES = (
-        # Jobs
-        ('JOB_CREATED', 'Job Created'),
-        ('JOB_ASSIGNED', 'Job Assigned'),
-        ('JOB_STARTED', 'Job Started'),
-        ('JOB_COMPLETED', 'Job Completed'),
-        ('JOB_CANCELLED', 'Job Cancelled'),
-        
-        # Payments
-        ('PAYMENT_RECEIVED', 'Payment Received'),
-        ('PAYMENT_FAILED', 'Payment Failed'),
-        ('INVOICE_GENERATED', 'Invoice Generated'),
-        ('PAYMENT_DUE', 'Payment Due'),
-        
-        # Inventory
-        ('LOW_STOCK', 'Low Stock'),
-        ('OUT_OF_STOCK', 'Out of Stock'),
-        ('STOCK_REPLENISHED', 'Stock Replenished'),
-        
-        # Customer
-        ('NEW_CUSTOMER', 'New Customer'),
-        ('LOYALTY_MILESTONE', 'Loyalty Milestone'),
-        ('LOYALTY_REWARD_EARNED', 'Loyalty Reward Earned'),
-        
-        # System
-        ('SYSTEM_ALERT', 'System Alert'),
-        ('SYSTEM_ERROR', 'System Error'),
-        ('SYSTEM_UPDATE', 'System Update'),
+
+    system_notification_days = models.PositiveIntegerField(
+        null=True, blank=True, default=90, help_text="Days to keep in-app notifications; empty keeps them forever"
+    )
+    notification_days = models.PositiveIntegerField(
+        null=True, blank=True, default=365,
+        help_text="Days to keep sent or failed customer notifications; empty keeps them forever"
     )
+    archive = models.CharField(max_length=10, choices=ARCHIVE_CHOICES, default='TABLE')
 
-    recipient = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='system_notifications')
-    title = models.CharField(max_length=255)
-    message = models.TextField()
-    is_read = models.BooleanField(default=False)
-    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES, default='INFO')
-    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, null=True, blank=True, help_text="Business-specific notification category")
-    link = models.CharField(max_length=255, blank=True, null=True, help_text="Optional link to navigate to")
-    
     class Meta:
-        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant'], name='unique_retention_policy_per_tenant'),
+        ]
 
     def __str__(self):
-        return f"{self.title} - {self.recipient} ({'Read' if self.is_read else 'Unread'})"
+        return f"{self.tenant_id}: {self.system_notification_days}/{self.notification_days} days ({self.archive})"
+
+
+class NotificationArchive(models.Model):
+    """Compact copy of a purged SystemNotification or Notification row"""
+    KIND_CHOICES = (
+        ('SYSTEM', 'System notification'),
+        ('CUSTOMER', 'Customer notification'),
+    )
+
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    original_id = models.BigIntegerField()
+    created_at = models.DateTimeField(help_text="When the original row was created")
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'kind', 'created_at'], name='notification_archive_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.original_id} ({self.created_at:%Y-%m-%d})"
 
 
 class RoleNotificationPreference(TenantAwareModel):
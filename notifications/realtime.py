@@ -0,0 +1,138 @@
+"""
+Real-time push of system notifications to logged-in users.
+
+notifications.streams serves a Server-Sent Events stream per user; it
+subscribes to the configured broker (``settings.NOTIFICATION_BROKER``)
+and relays every event published for that user:
+
+- ``notification``: a new SystemNotification, with ``unread_delta`` 1
+- ``unread``: a change of the unread count, e.g. ``{"unread_delta": -3}``
+  after mark_all_read
+
+Events are published from the notification creation path
+(notifications.utils) and the mark_read/mark_all_read actions, once the
+surrounding transaction commits.
+
+InMemoryBroker only reaches streams served by the same process, which is
+enough for a single ASGI node. For several nodes, implement Broker on top
+of a shared pub/sub (e.g. Redis PUBLISH/SUBSCRIBE on a per-user channel)
+and point NOTIFICATION_BROKER at it.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'notifications.realtime.InMemoryBroker'
+
+
+class Broker:
+    """Fans out per-user events from publishers to stream subscribers"""
+
+    def publish(self, user_id, event):
+        """
+        Deliver ``event`` (a JSON-serializable dict with a ``type`` key) to
+        every subscription of ``user_id``. Called from sync code.
+        """
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        """Return a Subscription receiving the user's events. Called from the event loop."""
+        raise NotImplementedError
+
+
+class Subscription:
+    """Events for one stream; ``await get()`` the next event and ``close()`` when done"""
+
+    def __init__(self, on_close=None):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.on_close = on_close
+
+    def put(self, event):
+        """Queue an event from any thread"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        if self.on_close is not None:
+            self.on_close(self)
+            self.on_close = None
+
+
+class InMemoryBroker(Broker):
+    """Broker for a single process: subscriptions are held in a dict per user"""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(on_close=lambda closed: self._unsubscribe(user_id, closed))
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[user_id]
+
+    def subscriber_count(self, user_id):
+        with self._lock:
+            return len(self._subscriptions.get(user_id, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'NOTIFICATION_BROKER', DEFAULT_BROKER))()
+    return _broker
+
+
+def publish_created(notifications):
+    """Push newly created SystemNotifications to their recipients after commit"""
+    from notifications.serializers import SystemNotificationSerializer
+
+    if not notifications:
+        return
+    events = [
+        (notification.recipient_id, {
+            'type': 'notification',
+            'unread_delta': 0 if notification.is_read else 1,
+            'notification': SystemNotificationSerializer(notification).data,
+        })
+        for notification in notifications
+    ]
+
+    def send():
+        broker = get_broker()
+        for user_id, event in events:
+            broker.publish(user_id, event)
+
+    transaction.on_commit(send)
+
+
+def publish_unread_delta(user_id, delta):
+    """Push a change of the user's unread count after commit"""
+    if delta:
+        transaction.on_commit(lambda: get_broker().publish(user_id, {'type': 'unread', 'unread_delta': delta}))
@@ -0,0 +1,156 @@
+"""
+Retention of SystemNotification and customer Notification rows.
+
+Each tenant's NotificationRetentionPolicy says how many days rows are kept
+and where purged rows go: the NotificationArchive table, gzip-compressed
+JSONL files under NOTIFICATION_ARCHIVE_DIR, or nowhere. Customer
+notifications are only purged once delivered or failed.
+
+Rows are moved oldest first, ``chunk_size`` per transaction. Each chunk
+locks only the rows it moves (SKIP LOCKED, so it never waits on live
+writers), archives them and deletes them. Unread counters
+(notifications.counters) are adjusted for purged unread rows.
+
+Table archives are written in the chunk's transaction. File archives are
+appended once it commits, so a rolled back chunk never leaves rows in a
+file that are still in the database; a crash between the commit and the
+write loses that chunk's archive, so use TABLE where that matters.
+"""
+import gzip
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from notifications.counters import add_unread
+from notifications.models import (
+    Notification, NotificationArchive, NotificationRetentionPolicy, SystemNotification
+)
+
+# kind -> (model, policy field with the retention days, rows that may be purged)
+KINDS = {
+    'SYSTEM': (SystemNotification, 'system_notification_days', Q()),
+    'CUSTOMER': (Notification, 'notification_days', Q(status__in=['SENT', 'FAILED'])),
+}
+
+
+def policy_for(tenant_id):
+    """The tenant's retention policy, or an unsaved one with the defaults"""
+    policy = NotificationRetentionPolicy.objects.filter(tenant_id=tenant_id).first()
+    return policy or NotificationRetentionPolicy(tenant_id=tenant_id)
+
+
+def archive_dir():
+    return Path(getattr(settings, 'NOTIFICATION_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'notifications'))
+
+
+def expired(tenant_id, kind, days, now=None):
+    """Rows of ``kind`` older than ``days`` for the tenant"""
+    model, _, purgeable = KINDS[kind]
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return model.objects.filter(purgeable, tenant_id=tenant_id, created_at__lt=cutoff)
+
+
+def purge_tenant(tenant_id, chunk_size=1000, pause=0, dry_run=False, now=None):
+    """
+    Purge the tenant's expired notifications according to its policy.
+
+    Args:
+        tenant_id: Tenant to purge
+        chunk_size: Rows moved per transaction
+        pause: Seconds to sleep between chunks, to leave room for live traffic
+        dry_run: Only count the expired rows
+
+    Returns ``{kind: {'rows': n, 'seconds': s}}`` for each kind with a TTL.
+    """
+    policy = policy_for(tenant_id)
+    now = now or timezone.now()
+    results = {}
+    for kind, (_, days_field, _) in KINDS.items():
+        days = getattr(policy, days_field)
+        if days is None:
+            continue
+        started = time.perf_counter()
+        if dry_run:
+            rows = expired(tenant_id, kind, days, now).count()
+        else:
+            target = _archive_file(tenant_id, kind, now) if policy.archive == 'FILE' else None
+            rows = 0
+            while True:
+                moved = purge_chunk(tenant_id, kind, days, chunk_size, policy.archive, target, now)
+                rows += moved
+                if moved < chunk_size:
+                    break
+                if pause:
+                    time.sleep(pause)
+        results[kind] = {'rows': rows, 'seconds': time.perf_counter() - started}
+    return results
+
+
+def purge_chunk(tenant_id, kind, days, chunk_size, archive, target=None, now=None):
+    """Archive and delete up to ``chunk_size`` of the oldest expired rows; returns the number moved"""
+    model = KINDS[kind][0]
+    with transaction.atomic():
+        rows = list(
+            expired(tenant_id, kind, days, now).select_for_update(skip_locked=True)
+            .order_by('created_at', 'id').values()[:chunk_size]
+        )
+        if not rows:
+            return 0
+
+        if archive == 'TABLE':
+            NotificationArchive.objects.bulk_create([
+                NotificationArchive(
+                    tenant_id=tenant_id, kind=kind, original_id=row['id'], created_at=row['created_at'], data=row
+                )
+                for row in rows
+            ])
+        elif archive == 'FILE':
+            lines = [json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows]
+            transaction.on_commit(lambda: _append_archive(target, lines))
+
+        if kind == 'SYSTEM':
+            _release_unread(tenant_id, rows)
+        _delete_rows(model, [row['id'] for row in rows])
+    return len(rows)
+
+
+def _append_archive(target, lines):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Each chunk appends one gzip member; readers see a single stream
+    with gzip.open(target, 'at', encoding='utf-8') as handle:
+        handle.writelines(lines)
+
+
+def _delete_rows(model, ids):
+    """
+    One DELETE by primary key. The rows have no dependents, and
+    QuerySet.delete() would send per-row signals that adjust the unread
+    counters one UPDATE at a time, on top of _release_unread.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def _release_unread(tenant_id, rows):
+    unread = {}
+    for row in rows:
+        if not row['is_read']:
+            unread[row['recipient_id']] = unread.get(row['recipient_id'], 0) + 1
+    by_count = {}
+    for user_id, count in unread.items():
+        by_count.setdefault(count, []).append(user_id)
+    for count, user_ids in by_count.items():
+        add_unread(tenant_id, user_ids, -count)
+
+
+def _archive_file(tenant_id, kind, now):
+    return archive_dir() / str(tenant_id) / f'{kind.lower()}-{now:%Y%m%d%H%M%S}.jsonl.gz'
@@ -1,8 +1,11 @@
 from rest_framework import serializers
-from notifications.models import Notification, NotificationChannel, SystemNotification, RoleNotificationPreference
+from notifications.models import (
+    Notification, NotificationChannel, NotificationRetentionPolicy, SystemNotification, RoleNotificationPreference
+)
+from core.serializers import TenantModelSerializer
 
 
-class NotificationChannelSerializer(serializers.ModelSerializer):
+class NotificationChannelSerializer(TenantModelSerializer):
     channel_name = serializers.CharField(source='get_channel_type_display', read_only=True)
     
     class Meta:
@@ -12,7 +15,7 @@ class NotificationChannelSerializer(serializers.ModelSerializer):
         # Don't expose api_credentials for security
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TenantModelSerializer):
     customer_name = serializers.SerializerMethodField()
     channel_name = serializers.CharField(source='get_channel_display', read_only=True)
     notification_type_name = serializers.CharField(source='get_notification_type_display', read_only=True)
@@ -22,23 +25,30 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'customer', 'customer_name', 'notification_type', 'notification_type_name',
             'channel', 'channel_name', 'recipient', 'subject', 'message',
-            'status', 'sent_at', 'error_message', 'created_at'
+            'status', 'sent_at', 'error_message', 'attempts', 'next_attempt_at', 'created_at'
         ]
-        read_only_fields = ['id', 'status', 'sent_at', 'error_message', 'created_at']
+        read_only_fields = ['id', 'status', 'sent_at', 'error_message', 'attempts', 'next_attempt_at', 'created_at']
     
     def get_customer_name(self, obj):
         return f"{obj.customer.first_name} {obj.customer.last_name}"
 
 
-class SystemNotificationSerializer(serializers.ModelSerializer):
+class SystemNotificationSerializer(TenantModelSerializer):
     class Meta:
         model = SystemNotification
         fields = ['id', 'title', 'message', 'is_read', 'notification_type', 'category', 'link', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class RoleNotificationPreferenceSerializer(serializers.ModelSerializer):
+class RoleNotificationPreferenceSerializer(TenantModelSerializer):
     class Meta:
         model = RoleNotificationPreference
         fields = '__all__'
         read_only_fields = ['id', 'tenant', 'created_at', 'updated_at']
+
+
+class NotificationRetentionPolicySerializer(TenantModelSerializer):
+    class Meta:
+        model = NotificationRetentionPolicy
+        fields = ['id', 'system_notification_days', 'notification_days', 'archive', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
@@ -0,0 +1,35 @@
+"""
+Signal receivers that keep UnreadNotificationCounter (notifications.counters)
+in step with single SystemNotification saves and deletes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from notifications.counters import add_unread
+from notifications.models import SystemNotification
+from tenants.models import Tenant
+from users.models import User
+
+
+@receiver(post_save, sender=SystemNotification)
+def system_notification_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if not instance.is_read:
+            add_unread(instance.tenant_id, [instance.recipient_id], 1)
+        return
+    if update_fields is not None and 'is_read' not in update_fields:
+        return
+    was_read = instance.previous_value('is_read')
+    if was_read is not None and was_read != instance.is_read:
+        add_unread(instance.tenant_id, [instance.recipient_id], -1 if instance.is_read else 1)
+
+
+@receiver(post_delete, sender=SystemNotification)
+def system_notification_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (User, Tenant)) or getattr(origin, 'model', None) in (User, Tenant):
+        # The counter goes away with the user/tenant delete
+        return
+    if not instance.is_read:
+        add_unread(instance.tenant_id, [instance.recipient_id], -1)
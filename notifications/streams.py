@@ -0,0 +1,96 @@
+"""
+Server-Sent Events stream of system notifications (see notifications.realtime).
+
+GET /api/v1/system-notifications/stream/ answers with ``text/event-stream``:
+first an ``unread`` event carrying the current ``unread_count``, then every
+event published for the user, with a comment line every KEEPALIVE_SECONDS
+so proxies keep the connection open.
+
+EventSource cannot send headers, so the JWT access token may be passed as
+``?token=`` as well as in the Authorization header. The stream needs an
+ASGI server (config.asgi); under WSGI each open stream would hold a worker
+thread.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from core.authentication import TenantJWTAuthentication
+from notifications.counters import unread_count
+from notifications.realtime import get_broker
+
+KEEPALIVE_SECONDS = 20
+
+
+def _authenticate(request):
+    """User for the request's JWT (header or ``token`` query param), or None"""
+    authentication = TenantJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        raw_token = request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _format(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+class EventStream:
+    """
+    Async iterable of SSE chunks for one subscription. StreamingHttpResponse
+    calls ``close()`` when the response ends, which drops the subscription.
+    """
+
+    def __init__(self, unread_count, subscription):
+        self.unread_count = unread_count
+        self.subscription = subscription
+
+    async def __aiter__(self):
+        try:
+            yield _format('unread', {'unread_count': self.unread_count})
+            while True:
+                try:
+                    event = await asyncio.wait_for(self.subscription.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield _format(event['type'], event)
+        finally:
+            self.close()
+
+    def close(self):
+        self.subscription.close()
+
+
+@require_GET
+async def notification_stream(request):
+    user = await sync_to_async(_authenticate)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+    # The tenant context (core.tenancy) falls back to request.user for tokens passed as ?token=
+    request.user = user
+
+    # Subscribe before counting, so no event falls between the two
+    subscription = get_broker().subscribe(user.id)
+    try:
+        unread = await sync_to_async(unread_count)(user)
+    except Exception:
+        subscription.close()
+        raise
+
+    response = StreamingHttpResponse(
+        EventStream(unread, subscription), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
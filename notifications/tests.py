@@ -1,3 +1,437 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from billing.models import Receipt
+from customers.models import Car, Customer
+from notifications.adapters import FakeAdapter
+from notifications.counters import reconcile
+from notifications.dispatch import Dispatcher
+from notifications.realtime import get_broker
+from notifications.retention import purge_tenant
+from notifications.models import (
+    Notification, NotificationArchive, NotificationChannel, NotificationRetentionPolicy, RoleNotificationPreference,
+    SystemNotification, UnreadNotificationCounter
+)
+from notifications.utils import create_notification_if_enabled, notify_tenant
+from operations.models import Job
+from tenants.models import Tenant
+from users.models import User
+
+
+class SendReceiptTests(TestCase):
+    """Sending a receipt only queues the notification"""
+
+    def setUp(self):
+        cache.clear()
+        FakeAdapter.reset()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123', tenant=self.tenant, role='OWNER'
+        )
+        customer = Customer.objects.create(
+            tenant=self.tenant, first_name='Abebe', last_name='Kebede',
+            phone_number='+251911000002', email='abebe@example.com'
+        )
+        car = Car.objects.create(tenant=self.tenant, customer=customer, plate_number='AA-1234')
+        job = Job.objects.create(tenant=self.tenant, customer=customer, car=car, status='PAID')
+        self.receipt = Receipt.objects.create(
+            tenant=self.tenant, job=job, subtotal=Decimal('100'), total=Decimal('100')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_send_inserts_a_pending_notification(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/v1/receipts/{self.receipt.id}/send/', {'channel': 'SMS'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        # Fetch the receipt, insert the notification
+        self.assertEqual(len(queries.captured_queries), 2)
+        notification = Notification.objects.get(id=response.data['notification_id'])
+        self.assertEqual(notification.status, 'PENDING')
+        self.assertEqual(notification.recipient, '+251911000002')
+        self.assertEqual(FakeAdapter.sent, [])
+
+
+class NotifyTenantTests(TestCase):
+    """Broadcasts reach every user whose role has the category enabled, in constant queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.owner = User.objects.create_user(username='owner', password='testpass123', tenant=self.tenant, role='OWNER')
+        self.managers = [
+            User.objects.create_user(username=f'manager{n}', password='testpass123', tenant=self.tenant, role='MANAGER')
+            for n in range(3)
+        ]
+        self.staff = [
+            User.objects.create_user(username=f'staff{n}', password='testpass123', tenant=self.tenant, role='STAFF')
+            for n in range(5)
+        ]
+        other = Tenant.objects.create(name='Other Car Spa', subdomain='other')
+        User.objects.create_user(username='other-owner', password='testpass123', tenant=other, role='OWNER')
+
+    def recipients(self, category):
+        return set(SystemNotification.objects.filter(category=category).values_list('recipient_id', flat=True))
+
+    def test_notifies_enabled_roles_with_constant_queries(self):
+        notify_tenant(self.tenant, 'LOW_STOCK', 'Low stock', 'Wax is running low')  # warm the cache
+        SystemNotification.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            created = notify_tenant(self.tenant, 'LOW_STOCK', 'Low stock', 'Wax is running low')
+
+        self.assertEqual(len(created), 9)
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']],
+            # Recipients, notifications, then the unread counters
+            ['SELECT', 'INSERT', 'INSERT', 'UPDATE'],
+        )
+        # PAYMENT_DUE is off for staff by default
+        notify_tenant(self.tenant, 'PAYMENT_DUE', 'Payment due', 'Invoice overdue', exclude=[self.owner.id])
+        self.assertEqual(self.recipients('PAYMENT_DUE'), {user.id for user in self.managers})
+
+    def test_single_notifications_use_cached_preferences(self):
+        create_notification_if_enabled(self.owner, 'JOB_CREATED', 'Job created', 'Job #1')  # warm the cache
+
+        with CaptureQueriesContext(connection) as queries:
+            created = create_notification_if_enabled(self.staff[0], 'JOB_ASSIGNED', 'Job assigned', 'Job #1')
+            skipped = create_notification_if_enabled(self.staff[0], 'JOB_CREATED', 'Job created', 'Job #1')
+
+        self.assertIsNotNone(created)
+        self.assertIsNone(skipped)
+        # The notification and its recipient's unread counter
+        self.assertEqual([query['sql'].split()[0] for query in queries.captured_queries], ['INSERT', 'INSERT', 'UPDATE'])
+
+    def test_preference_changes_apply_to_the_next_broadcast(self):
+        notify_tenant(self.tenant, 'LOW_STOCK', 'Low stock', 'Wax is running low')
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        client.get('/api/v1/role-notification-preferences/initialize_defaults/')
+        prefs = RoleNotificationPreference.objects.get(tenant=self.tenant, role='STAFF')
+        response = client.patch(
+            f'/api/v1/role-notification-preferences/{prefs.id}/', {'low_stock_enabled': False}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        SystemNotification.objects.all().delete()
+
+        notify_tenant(self.tenant, 'LOW_STOCK', 'Low stock', 'Wax is running low')
+
+        self.assertEqual(self.recipients('LOW_STOCK'), {self.owner.id, *(user.id for user in self.managers)})
+
+
+class UnreadCounterTests(TestCase):
+    """The unread badge is served from the maintained counter"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(username='owner', password='testpass123', tenant=self.tenant, role='OWNER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/system-notifications/unread_count/')
+        self.assertEqual(len(queries.captured_queries), 1)
+        return response.data['count']
+
+    def counter(self):
+        return UnreadNotificationCounter.objects.get(user=self.user).unread
+
+    def test_counter_follows_creates_and_reads(self):
+        for _ in range(3):
+            notify_tenant(self.tenant, 'LOW_STOCK', 'Low stock', 'Wax is running low')
+        create_notification_if_enabled(self.user, 'JOB_CREATED', 'Job created', 'Job #1')
+        self.assertEqual(self.unread_count(), 4)
+
+        notification = SystemNotification.objects.filter(recipient=self.user).first()
+        self.client.post(f'/api/v1/system-notifications/{notification.id}/mark_read/')
+        self.client.post(f'/api/v1/system-notifications/{notification.id}/mark_read/')
+        self.assertEqual(self.unread_count(), 3)
+
+        SystemNotification.objects.filter(recipient=self.user, is_read=False).first().delete()
+        self.assertEqual(self.counter(), 2)
+
+        self.client.post('/api/v1/system-notifications/mark_all_read/')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_reconcile_repairs_drift(self):
+        for _ in range(3):
+            notify_tenant(self.tenant, 'LOW_STOCK', 'Low stock', 'Wax is running low')
+        # Writes that bypass the counter
+        SystemNotification.objects.filter(recipient=self.user).update(is_read=True)
+        SystemNotification.objects.filter(pk=SystemNotification.objects.first().pk).update(is_read=False)
+        self.assertEqual(self.counter(), 3)
+
+        self.assertEqual(reconcile(dry_run=True), {self.user.id: (3, 1)})
+        self.assertEqual(self.counter(), 3)
+        reconcile()
+        self.assertEqual(self.counter(), 1)
+        self.assertEqual(reconcile(), {})
+
+
+class RetentionTests(TestCase):
+    """purge_notifications moves expired rows out in chunks"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(username='owner', password='testpass123', tenant=self.tenant, role='OWNER')
+        self.customer = Customer.objects.create(
+            tenant=self.tenant, first_name='Abebe', last_name='Kebede', phone_number='+251911000002'
+        )
+        old = timezone.now() - timedelta(days=400)
+        for number in range(5):
+            create_notification_if_enabled(self.user, 'JOB_CREATED', 'Job created', f'Job #{number}')
+        for status_value in ['SENT', 'FAILED', 'PENDING']:
+            Notification.objects.create(
+                tenant=self.tenant, customer=self.customer, notification_type='RECEIPT',
+                channel='SMS', recipient='+251911000002', message='Thanks', status=status_value
+            )
+        SystemNotification.objects.filter(message__in=['Job #0', 'Job #1', 'Job #2']).update(created_at=old)
+        Notification.objects.update(created_at=old)
+        self.recent = create_notification_if_enabled(self.user, 'JOB_CREATED', 'Job created', 'Recent')
+
+    def test_expired_rows_move_to_the_archive_table(self):
+        results = purge_tenant(self.tenant.id, chunk_size=2)
+
+        self.assertEqual({kind: result['rows'] for kind, result in results.items()}, {'SYSTEM': 3, 'CUSTOMER': 2})
+        self.assertEqual(SystemNotification.objects.filter(recipient=self.user).count(), 3)
+        self.assertEqual(list(Notification.objects.values_list('status', flat=True)), ['PENDING'])
+        self.assertEqual(NotificationArchive.objects.filter(kind='SYSTEM').count(), 3)
+        archived = NotificationArchive.objects.filter(kind='CUSTOMER').order_by('original_id').first()
+        self.assertEqual(archived.data['status'], 'SENT')
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.user).unread, 3)
+
+    def test_file_archive_and_tenant_ttls(self):
+        NotificationRetentionPolicy.objects.create(
+            tenant=self.tenant, system_notification_days=None, notification_days=30, archive='FILE'
+        )
+        with tempfile.TemporaryDirectory() as directory, override_settings(NOTIFICATION_ARCHIVE_DIR=directory):
+            with self.captureOnCommitCallbacks(execute=True):
+                results = purge_tenant(self.tenant.id, chunk_size=1)
+            files = list(Path(directory).rglob('*.jsonl.gz'))
+            with gzip.open(files[0], 'rt') as handle:
+                rows = [json.loads(line) for line in handle]
+
+        self.assertEqual(set(results), {'CUSTOMER'})
+        self.assertEqual(len(files), 1)
+        self.assertEqual([row['status'] for row in rows], ['SENT', 'FAILED'])
+        self.assertEqual(SystemNotification.objects.count(), 6)
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    def test_rolled_back_chunks_write_no_file(self):
+        NotificationRetentionPolicy.objects.create(tenant=self.tenant, archive='FILE')
+
+        class Abort(Exception):
+            pass
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(NOTIFICATION_ARCHIVE_DIR=directory):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(Abort), transaction.atomic():
+                    purge_tenant(self.tenant.id)
+                    raise Abort
+            self.assertEqual(list(Path(directory).rglob('*.jsonl.gz')), [])
+        self.assertEqual(Notification.objects.count(), 3)
+
+
+class NotificationStreamTests(TestCase):
+    """The SSE stream pushes new notifications and unread count changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(username='owner', password='testpass123', tenant=self.tenant, role='OWNER')
+        SystemNotification.objects.create(tenant=self.tenant, recipient=self.user, title='Welcome', message='Hello')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def broadcast(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_tenant(self.tenant, 'LOW_STOCK', 'Low stock', 'Wax is running low')
+
+    def mark_all_read(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/v1/system-notifications/mark_all_read/')
+
+    async def test_stream_relays_events(self):
+        response = await self.async_client.get('/api/v1/system-notifications/stream/', {'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(stream), b'event: unread\ndata: {"unread_count": 1}\n\n')
+
+            await sync_to_async(self.broadcast)()
+            event = (await anext(stream)).decode()
+            self.assertTrue(event.startswith('event: notification\n'))
+            self.assertIn('"unread_delta": 1', event)
+            self.assertIn('"title": "Low stock"', event)
+
+            await sync_to_async(self.mark_all_read)()
+            event = (await anext(stream)).decode()
+            self.assertEqual(event, 'event: unread\ndata: {"type": "unread", "unread_delta": -2}\n\n')
+        finally:
+            response.close()
+        self.assertEqual(get_broker().subscriber_count(self.user.id), 0)
+
+    async def test_stream_requires_a_valid_token(self):
+        response = await self.async_client.get('/api/v1/system-notifications/stream/', {'token': 'invalid'})
+        self.assertEqual(response.status_code, 401)
+
+
+class ConcurrencyProbe(FakeAdapter):
+    """Fake adapter that records the highest number of deliveries in flight"""
+    in_flight = 0
+    peak = 0
+
+    async def send(self, notification, credentials):
+        ConcurrencyProbe.in_flight += 1
+        ConcurrencyProbe.peak = max(ConcurrencyProbe.peak, ConcurrencyProbe.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            await super().send(notification, credentials)
+        finally:
+            ConcurrencyProbe.in_flight -= 1
+
+
+class DispatchTests(TransactionTestCase):
+    """Workers deliver queued notifications through the channel adapters"""
+
+    def setUp(self):
+        FakeAdapter.reset()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.customer = Customer.objects.create(
+            tenant=self.tenant, first_name='Abebe', last_name='Kebede', phone_number='+251911000002'
+        )
+
+    def tearDown(self):
+        # Deliveries record their results from asgiref's worker thread
+        asyncio.run(sync_to_async(connections.close_all)())
+
+    def queue(self, recipient, channel='SMS'):
+        return Notification.objects.create(
+            tenant=self.tenant, customer=self.customer, notification_type='RECEIPT',
+            channel=channel, recipient=recipient, message='Thank you for your visit!'
+        )
+
+    def drain(self, **kwargs):
+        return asyncio.run(Dispatcher(**kwargs).run(poll_interval=0.01, drain=True))
+
+    def test_pending_notifications_are_sent(self):
+        first = self.queue('+251911000002')
+        second = self.queue('abebe@example.com', channel='EMAIL')
+
+        self.assertEqual(self.drain(), 2)
+
+        for notification in (first, second):
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, 'SENT')
+            self.assertEqual(notification.attempts, 1)
+            self.assertIsNotNone(notification.sent_at)
+        self.assertEqual(
+            sorted(recipient for _, recipient, _, _ in FakeAdapter.sent),
+            ['+251911000002', 'abebe@example.com'],
+        )
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        notification = self.queue('+251911000002')
+        FakeAdapter.failures['+251911000002'] = 1
+
+        before = timezone.now()
+        self.drain()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'PENDING')
+        self.assertEqual(notification.attempts, 1)
+        self.assertTrue(notification.error_message)
+        self.assertGreaterEqual(notification.next_attempt_at, before + timedelta(seconds=30))
+
+        # Not due yet
+        self.assertEqual(self.drain(), 0)
+
+        Notification.objects.filter(id=notification.id).update(next_attempt_at=timezone.now())
+        self.drain()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'SENT')
+        self.assertEqual(notification.attempts, 2)
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_notification_fails_after_max_attempts(self):
+        notification = self.queue('+251911000002')
+        FakeAdapter.failures['+251911000002'] = 5
+
+        for _ in range(2):
+            Notification.objects.filter(id=notification.id).update(next_attempt_at=timezone.now())
+            self.drain()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'FAILED')
+        self.assertEqual(notification.attempts, 2)
+        self.assertEqual(FakeAdapter.sent, [])
+
+    def test_permanent_errors_and_disabled_channels_fail_immediately(self):
+        rejected = self.queue('+251911000002')
+        FakeAdapter.failures['+251911000002'] = None
+        NotificationChannel.objects.create(tenant=self.tenant, channel_type='TELEGRAM', is_active=False)
+        disabled = self.queue('@abebe', channel='TELEGRAM')
+
+        self.drain()
+
+        for notification in (rejected, disabled):
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, 'FAILED')
+            self.assertEqual(notification.attempts, 1)
+        self.assertEqual(FakeAdapter.sent, [])
+
+    @skipUnless(connection.vendor == 'postgresql', "Spawned workers cannot open SQLite's in-memory test database")
+    def test_spawned_worker_processes_drain_the_queue(self):
+        notifications = [self.queue(f'+25191100000{number}') for number in range(4)]
+
+        call_command('run_notification_worker', '--processes=2', '--once', '--poll-interval=0.01', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(Notification.objects.filter(pk__in=[n.pk for n in notifications]).values_list('status', flat=True)),
+            ['SENT'] * 4,
+        )
+
+    def test_channels_without_an_adapter_fail(self):
+        unsupported = self.queue('@abebe', channel='TELEGRAM')
+        sent = self.queue('+251911000002')
+
+        self.assertEqual(self.drain(adapters={'SMS': FakeAdapter()}), 2)
+
+        unsupported.refresh_from_db()
+        self.assertEqual(unsupported.status, 'FAILED')
+        self.assertEqual(unsupported.error_message, 'No adapter is configured for the TELEGRAM channel')
+        sent.refresh_from_db()
+        self.assertEqual(sent.status, 'SENT')
+
+    def test_per_channel_concurrency_limit(self):
+        for number in range(10):
+            self.queue(f'+2519110000{number:02d}')
+        ConcurrencyProbe.peak = 0
+        adapters = {channel: ConcurrencyProbe() for channel, _ in Notification.CHANNEL_CHOICES}
+
+        self.drain(adapters=adapters, concurrency={'SMS': 3})
+
+        self.assertEqual(ConcurrencyProbe.peak, 3)
+        self.assertEqual(Notification.objects.filter(status='SENT').count(), 10)
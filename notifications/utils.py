@@ -1,7 +1,21 @@
 """
 Utility functions for notification system
 """
+from django.core.cache import cache
+from django.db import transaction
+
+from core.localcache import LocalCache, shared_timeout
+from notifications.counters import add_unread
 from notifications.models import SystemNotification, RoleNotificationPreference
+from notifications.realtime import publish_created
+
+# Role preferences are cached per tenant in the Django cache and, in front of
+# it, in an in-process LRU whose entries expire after LOCAL_CACHE_TTL seconds.
+# The Django cache keeps them for PREFERENCES_CACHE_TIMEOUT when it is shared
+# between processes, and for LOCAL_CACHE_TTL as well when it is not.
+PREFERENCES_CACHE_TIMEOUT = 60 * 60
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_TTL = 30
 
 # Default notification preferences by role
 DEFAULT_ROLE_PREFERENCES = {
@@ -92,6 +106,9 @@ CATEGORY_FIELD_MAP = {
     'SYSTEM_UPDATE': 'system_update_enabled',
 }
 
+# Bit of each category in the cached role preference bitsets
+CATEGORY_BITS = {category: 1 << index for index, category in enumerate(CATEGORY_FIELD_MAP)}
+
 # Map category to notification type
 CATEGORY_TYPE_MAP = {
     'JOB_CREATED': 'INFO',
@@ -134,33 +151,160 @@ def create_notification_if_enabled(user, category, title, message, link=None):
     Returns:
         SystemNotification instance if created, None otherwise
     """
-    # Get role preferences for user's role
-    try:
-        prefs = RoleNotificationPreference.objects.get(
-            tenant=user.tenant,
-            role=user.role
-        )
-    except RoleNotificationPreference.DoesNotExist:
-        # If no preferences exist, use defaults
-        prefs_data = DEFAULT_ROLE_PREFERENCES.get(user.role, {})
-        prefs = RoleNotificationPreference.objects.create(
-            tenant=user.tenant,
-            role=user.role,
-            **prefs_data
-        )
-    
-    # Check if this category is enabled for the user's role
-    field_name = CATEGORY_FIELD_MAP.get(category)
-    if field_name and getattr(prefs, field_name, True):
-        # Role has this category enabled, create notification
-        notification_type = get_type_from_category(category)
-        return SystemNotification.objects.create(
-            recipient=user,
-            title=title,
-            message=message,
-            category=category,
-            notification_type=notification_type,
-            link=link,
-            tenant=user.tenant
+    if not category_enabled(user.tenant_id, user.role, category):
+        return None
+    notification = SystemNotification.objects.create(
+        recipient=user,
+        title=title,
+        message=message,
+        category=category,
+        notification_type=get_type_from_category(category),
+        link=link,
+        tenant_id=user.tenant_id
+    )
+    publish_created([notification])
+    return notification
+
+
+_local_preferences = LocalCache(max_size=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+
+
+def _preferences_key(tenant_id):
+    return f'notifications:role-masks:{tenant_id}'
+
+
+def category_mask(categories):
+    """Bitset of ``categories`` (see CATEGORY_BITS)"""
+    mask = 0
+    for category in categories:
+        mask |= CATEGORY_BITS.get(category, 0)
+    return mask
+
+
+def _default_preferences(role):
+    """Field values a RoleNotificationPreference row created for ``role`` would get"""
+    values = {
+        field_name: RoleNotificationPreference._meta.get_field(field_name).default
+        for field_name in CATEGORY_FIELD_MAP.values()
+    }
+    values.update(DEFAULT_ROLE_PREFERENCES.get(role, {}))
+    return values
+
+
+def _load_role_masks(tenant_id):
+    from users.models import User
+
+    rows = {
+        prefs.role: {field_name: getattr(prefs, field_name) for field_name in CATEGORY_FIELD_MAP.values()}
+        for prefs in RoleNotificationPreference.objects.filter(tenant_id=tenant_id)
+    }
+    masks = {}
+    for role, _ in User.ROLE_CHOICES:
+        values = rows.get(role) or _default_preferences(role)
+        masks[role] = category_mask(
+            category for category, field_name in CATEGORY_FIELD_MAP.items() if values[field_name]
         )
-    return None
+    return masks
+
+
+def role_preferences(tenant_id):
+    """
+    ``{role: bitset of enabled categories}`` for every user role of the
+    tenant. Roles without a RoleNotificationPreference row get the defaults
+    such a row would be created with.
+
+    Served from the in-process LRU, then the Django cache, and only then
+    built from the database.
+    """
+    masks = _local_preferences.get(tenant_id)
+    if masks is not None:
+        return masks
+
+    key = _preferences_key(tenant_id)
+    masks = cache.get(key)
+    if masks is None:
+        masks = _load_role_masks(tenant_id)
+        cache.set(key, masks, shared_timeout(PREFERENCES_CACHE_TIMEOUT, LOCAL_CACHE_TTL))
+    _local_preferences.set(tenant_id, masks)
+    return masks
+
+
+def category_enabled(tenant_id, role, category):
+    """Whether ``role`` receives ``category`` notifications in the tenant"""
+    bit = CATEGORY_BITS.get(category)
+    if bit is None:
+        return False
+    masks = role_preferences(tenant_id)
+    if role not in masks:
+        # Not one of User.ROLE_CHOICES; a row created for it would get the model defaults
+        return bool(_default_preferences(role)[CATEGORY_FIELD_MAP[category]])
+    return bool(masks[role] & bit)
+
+
+def invalidate_role_preferences(tenant_id):
+    """
+    Drop the tenant's cached preferences after a RoleNotificationPreference
+    write; again on commit, so a copy cached from pre-commit data is not kept.
+    Other processes pick the change up once their LOCAL_CACHE_TTL runs out
+    (see core.localcache.shared_timeout).
+    """
+    key = _preferences_key(tenant_id)
+
+    def drop():
+        cache.delete(key)
+        _local_preferences.discard(tenant_id)
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def notify_tenant(tenant, category, title, message, link=None, roles=None, exclude=None):
+    """
+    Create a notification for every active user of the tenant whose role has
+    ``category`` enabled.
+
+    Args:
+        tenant: Tenant whose users are notified
+        category: Notification category (e.g., 'LOW_STOCK')
+        title: Notification title
+        message: Notification message
+        link: Optional link to navigate to
+        roles: Only notify these roles (default: all roles)
+        exclude: User ids not to notify (e.g., the user who caused the event)
+
+    Returns:
+        List of created SystemNotification instances
+    """
+    from users.models import User
+
+    bit = CATEGORY_BITS.get(category, 0)
+    enabled_roles = [
+        role for role, mask in role_preferences(tenant.id).items()
+        if mask & bit and (roles is None or role in roles)
+    ]
+    if not enabled_roles:
+        return []
+
+    recipients = User.objects.filter(tenant=tenant, is_active=True, role__in=enabled_roles)
+    if exclude:
+        recipients = recipients.exclude(pk__in=exclude)
+
+    notification_type = get_type_from_category(category)
+    recipient_ids = list(recipients.order_by('id').values_list('id', flat=True))
+    with transaction.atomic():
+        notifications = SystemNotification.objects.bulk_create([
+            SystemNotification(
+                recipient_id=recipient_id,
+                title=title,
+                message=message,
+                category=category,
+                notification_type=notification_type,
+                link=link,
+                tenant=tenant
+            )
+            for recipient_id in recipient_ids
+        ], batch_size=1000)
+        # bulk_create sends no signals; see notifications.counters
+        add_unread(tenant.id, recipient_ids, 1)
+    publish_created(notifications)
+    return notifications
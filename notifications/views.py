@@ -2,10 +2,18 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from notifications.models import Notification, NotificationChannel, SystemNotification, RoleNotificationPreference
-from notifications.serializers import NotificationSerializer, NotificationChannelSerializer, SystemNotificationSerializer, RoleNotificationPreferenceSerializer
-from notifications.utils import DEFAULT_ROLE_PREFERENCES
+from notifications.models import (
+    Notification, NotificationChannel, NotificationRetentionPolicy, SystemNotification, RoleNotificationPreference
+)
+from notifications.serializers import (
+    NotificationSerializer, NotificationChannelSerializer, NotificationRetentionPolicySerializer,
+    SystemNotificationSerializer, RoleNotificationPreferenceSerializer
+)
+from notifications.counters import add_unread, unread_count
+from notifications.realtime import publish_unread_delta
+from notifications.utils import DEFAULT_ROLE_PREFERENCES, invalidate_role_preferences
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -22,14 +30,11 @@ class NotificationViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return Notification.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('customer')
+        return Notification.objects.select_related('customer')
     
     def perform_create(self, serializer):
-        notification = serializer.save(tenant=self.request.user.tenant)
-        # Automatically send notification after creation
-        notification.send()
+        # Saved PENDING, i.e. queued for run_notification_worker
+        serializer.save(tenant=self.request.user.tenant)
     
     @action(detail=True, methods=['post'])
     def resend(self, request, pk=None):
@@ -41,13 +46,14 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 {'error': 'Notification already sent'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if notification.status == 'SENDING':
+            return Response(
+                {'error': 'Notification is being sent'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Reset status and try sending again
-        notification.status = 'PENDING'
-        notification.error_message = None
-        notification.save()
-        
-        success = notification.send()
+        # Put it back in the queue with a fresh set of attempts
+        notification.send()
         
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
@@ -60,12 +66,43 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
     filterset_fields = ['channel_type', 'is_active']
     
     def get_queryset(self):
-        return NotificationChannel.objects.filter(tenant=self.request.user.tenant)
+        return NotificationChannel.objects.all()
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
 
 
+class NotificationRetentionPolicyViewSet(viewsets.ModelViewSet):
+    """
+    Retention policy of the tenant's notifications (at most one per tenant),
+    applied by the purge_notifications command. Tenants without one keep
+    in-app notifications 90 days and customer notifications 365 days.
+    """
+    serializer_class = NotificationRetentionPolicySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.role not in ['OWNER', 'MANAGER']:
+            return NotificationRetentionPolicy.objects.none()
+        return NotificationRetentionPolicy.objects.all()
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role not in ['OWNER', 'MANAGER']:
+            return Response(
+                {'error': 'Only admins can configure notification retention'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if NotificationRetentionPolicy.objects.filter(tenant=request.user.tenant).exists():
+            return Response(
+                {'error': 'A retention policy already exists; update it instead'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(tenant=self.request.user.tenant)
+
+
 class SystemNotificationViewSet(viewsets.ModelViewSet):
     """
     ViewSet for System Notifications (In-App).
@@ -83,21 +120,26 @@ class SystemNotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get the count of unread notifications"""
-        count = self.get_queryset().filter(is_read=False).count()
-        return Response({'count': count})
+        return Response({'count': unread_count(request.user)})
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark a single notification as read"""
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        if not notification.is_read:
+            notification.is_read = True
+            notification.save()
+            publish_unread_delta(request.user.id, -1)
         return Response({'status': 'marked as read'})
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read for the current user"""
-        self.get_queryset().filter(is_read=False).update(is_read=True)
+        with transaction.atomic():
+            marked = self.get_queryset().filter(is_read=False).update(is_read=True)
+            # update() sends no signals; see notifications.counters
+            add_unread(request.user.tenant_id, [request.user.id], -marked)
+        publish_unread_delta(request.user.id, -marked)
         return Response({'status': 'all marked as read'})
 
 
@@ -113,7 +155,7 @@ class RoleNotificationPreferenceViewSet(viewsets.ModelViewSet):
         # Only allow OWNER and MANAGER to access
         if self.request.user.role not in ['OWNER', 'MANAGER']:
             return RoleNotificationPreference.objects.none()
-        return RoleNotificationPreference.objects.filter(tenant=self.request.user.tenant)
+        return RoleNotificationPreference.objects.all()
     
     def perform_create(self, serializer):
         # Only OWNER and MANAGER can create
@@ -123,6 +165,15 @@ class RoleNotificationPreferenceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         serializer.save(tenant=self.request.user.tenant)
+        invalidate_role_preferences(self.request.user.tenant_id)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_role_preferences(self.request.user.tenant_id)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_role_preferences(self.request.user.tenant_id)
     
     @action(detail=False, methods=['get'])
     def initialize_defaults(self, request):
@@ -142,6 +193,8 @@ class RoleNotificationPreferenceViewSet(viewsets.ModelViewSet):
             )
             if created:
                 created_prefs.append(prefs)
+        if created_prefs:
+            invalidate_role_preferences(request.user.tenant_id)
         
         serializer = self.get_serializer(created_prefs, many=True)
         return Response({
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+def seed_visit_sequences(apps, schema_editor):
+    """Start each tenant's visit sequence after its highest existing V-### ticket"""
+    Visit = apps.get_model('operations', 'Visit')
+    TenantSequence = apps.get_model('core', 'TenantSequence')
+    last_numbers = {}
+    for tenant_id, ticket_id in Visit.objects.values_list('tenant_id', 'ticket_id').iterator():
+        prefix, _, number = ticket_id.partition('-')
+        if prefix == 'V' and number.isdigit():
+            last_numbers[tenant_id] = max(last_numbers.get(tenant_id, 0), int(number))
+    for tenant_id, last_value in last_numbers.items():
+        TenantSequence.objects.update_or_create(
+            tenant_id=tenant_id, name='visit', defaults={'last_value': last_value}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_tenantsequence'),
+        ('customers', '0002_alter_car_options_alter_customer_options_and_more'),
+        ('operations', '0003_qcchecklistitem_service_visit_visitservice_and_more'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visit',
+            name='ticket_id',
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='visit',
+            constraint=models.UniqueConstraint(fields=('tenant', 'ticket_id'), name='unique_visit_ticket_per_tenant'),
+        ),
+        migrations.RunPython(seed_visit_sequences, migrations.RunPython.noop),
+    ]
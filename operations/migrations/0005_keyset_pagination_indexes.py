@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_search_document'),
+        ('operations', '0004_visit_ticket_per_tenant'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['tenant', 'created_at', 'id'], name='job_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['tenant', 'checked_in_at', 'id'], name='visit_tenant_checked_in_idx'),
+        ),
+    ]
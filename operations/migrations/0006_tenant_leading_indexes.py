@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:12
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built and dropped without locking out writes to the tables
+    atomic = False
+
+    dependencies = [
+        ('customers', '0004_tenant_leading_indexes'),
+        ('operations', '0005_keyset_pagination_indexes'),
+        ('services', '0002_service_image_alter_service_duration_minutes_and_more'),
+        ('staff', '0003_add_staff_fields_and_emergency_contact'),
+        ('tenants', '0004_alter_tenant_language'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='visit',
+            name='operations__ticket__fc7c87_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='visit',
+            name='operations__status_4dd88a_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='visit',
+            name='operations__custome_b5bc87_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='visit',
+            name='operations__phone_n_d898fb_idx',
+        ),
+        migrations.AlterField(
+            model_name='visit',
+            name='ticket_id',
+            field=models.CharField(max_length=20),
+        ),
+        AddIndexConcurrently(
+            model_name='job',
+            index=models.Index(fields=['tenant', 'status', 'created_at'], name='job_tenant_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='job',
+            index=models.Index(fields=['tenant', 'payment_method', 'created_at'], name='job_tenant_method_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobitem',
+            index=models.Index(fields=['tenant', 'job'], include=('service', 'price'), name='jobitem_tenant_job_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobtask',
+            index=models.Index(fields=['tenant', 'created_at', 'id'], name='jobtask_tenant_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobtask',
+            index=models.Index(fields=['tenant', 'status', 'created_at'], name='jobtask_tenant_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='visit',
+            index=models.Index(fields=['tenant', 'status', 'checked_in_at'], name='visit_tenant_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='visit',
+            index=models.Index(fields=['tenant', 'customer_type', 'checked_in_at'], name='visit_tenant_type_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='visit',
+            index=models.Index(fields=['tenant', 'phone_number'], name='visit_tenant_phone_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.utils import timezone
 from decimal import Decimal
 from core.models import TenantAwareModel
+from core.sequences import next_value
 from customers.models import Customer, Car
 from services.models import Service
 from staff.models import Staff
@@ -36,6 +37,18 @@ class Job(TenantAwareModel):
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
 
+    # Set automatically on the matching status transition (see DirtyFieldsMixin)
+    status_timestamps = {'COMPLETED': 'completed_at'}
+
+    class Meta:
+        indexes = [
+            # Keyset pages of the job list (core.pagination)
+            models.Index(fields=['tenant', 'created_at', 'id'], name='job_tenant_created_idx'),
+            # ?status= and ?payment_method= on the job list
+            models.Index(fields=['tenant', 'status', 'created_at'], name='job_tenant_status_idx'),
+            models.Index(fields=['tenant', 'payment_method', 'created_at'], name='job_tenant_method_idx'),
+        ]
+
     def __str__(self):
         return f"Job #{self.id} - {self.car} ({self.status})"
 
@@ -44,6 +57,12 @@ class JobItem(TenantAwareModel):
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
     price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Price at the time of booking")
 
+    class Meta:
+        indexes = [
+            # Revenue and service counts per tenant read items without visiting the table
+            models.Index(fields=['tenant', 'job'], include=['service', 'price'], name='jobitem_tenant_job_idx'),
+        ]
+
     def __str__(self):
         return f"{self.service.name} for Job #{self.job.id}"
 
@@ -62,6 +81,14 @@ class JobTask(TenantAwareModel):
     start_time = models.DateTimeField(blank=True, null=True)
     end_time = models.DateTimeField(blank=True, null=True)
 
+    status_timestamps = {'IN_PROGRESS': 'start_time', 'DONE': 'end_time'}
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'created_at', 'id'], name='jobtask_tenant_created_idx'),
+            models.Index(fields=['tenant', 'status', 'created_at'], name='jobtask_tenant_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.task_name} - {self.staff} ({self.status})"
 
@@ -90,8 +117,8 @@ class Visit(TenantAwareModel):
         ('ACCOUNT', 'Account'),
     )
     
-    # Auto-generated ticket ID
-    ticket_id = models.CharField(max_length=20, unique=True, db_index=True)
+    # Auto-generated ticket ID (unique per tenant)
+    ticket_id = models.CharField(max_length=20)
     
     # Customer info (nullable for guests)
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='visits')
@@ -129,13 +156,25 @@ class Visit(TenantAwareModel):
     # Notes
     notes = models.TextField(blank=True, null=True)
     
+    status_timestamps = {
+        'IN_PROGRESS': 'started_at',
+        'COMPLETED_WAITING_PICKUP': 'completed_at',
+        'PAID': 'paid_at',
+    }
+    
     class Meta:
         ordering = ['-checked_in_at']
         indexes = [
-            models.Index(fields=['ticket_id']),
-            models.Index(fields=['status']),
-            models.Index(fields=['customer_type']),
-            models.Index(fields=['phone_number']),
+            # Keyset pages of the visit list (core.pagination)
+            models.Index(fields=['tenant', 'checked_in_at', 'id'], name='visit_tenant_checked_in_idx'),
+            # ?status= and ?customer_type= on the visit list, and the phone lookup;
+            # ticket_id is served by unique_visit_ticket_per_tenant
+            models.Index(fields=['tenant', 'status', 'checked_in_at'], name='visit_tenant_status_idx'),
+            models.Index(fields=['tenant', 'customer_type', 'checked_in_at'], name='visit_tenant_type_idx'),
+            models.Index(fields=['tenant', 'phone_number'], name='visit_tenant_phone_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'ticket_id'], name='unique_visit_ticket_per_tenant'),
         ]
     
     def __str__(self):
@@ -144,34 +183,20 @@ class Visit(TenantAwareModel):
     def save(self, *args, **kwargs):
         # Auto-generate ticket ID on creation
         if not self.ticket_id:
-            # Get the last visit for this tenant
-            last_visit = Visit.objects.filter(tenant=self.tenant).order_by('-id').first()
-            if last_visit and last_visit.ticket_id.startswith('V-'):
-                try:
-                    last_number = int(last_visit.ticket_id.split('-')[1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            self.ticket_id = f"V-{new_number:03d}"
-        
-        # Update timestamps based on status
-        if self.pk:
-            old_visit = Visit.objects.get(pk=self.pk)
-            if old_visit.status != self.status:
-                if self.status == 'IN_PROGRESS' and not self.started_at:
-                    self.started_at = timezone.now()
-                elif self.status == 'COMPLETED_WAITING_PICKUP' and not self.completed_at:
-                    self.completed_at = timezone.now()
-                elif self.status == 'PAID' and not self.paid_at:
-                    self.paid_at = timezone.now()
+            self.ticket_id = f"V-{next_value(self.tenant_id, 'visit'):03d}"
         
+        # Status timestamps are set by DirtyFieldsMixin from status_timestamps,
+        # comparing against the status loaded with the instance (no extra query)
         super().save(*args, **kwargs)
     
-    def calculate_totals(self):
-        """Calculate subtotal, tax, and total from services"""
-        self.subtotal = sum((vs.price for vs in self.visit_services.all()), Decimal('0.00'))
+    def calculate_totals(self, visit_services=None):
+        """
+        Calculate subtotal, tax, and total from services.
+        Pass ``visit_services`` when the caller already holds them to skip the query.
+        """
+        if visit_services is None:
+            visit_services = self.visit_services.all()
+        self.subtotal = sum((vs.price for vs in visit_services), Decimal('0.00'))
         # Tax rate: 15% (can be made configurable)
         self.tax = self.subtotal * Decimal('0.15')
         self.total = self.subtotal + self.tax + self.tip
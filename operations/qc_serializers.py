@@ -1,15 +1,16 @@
 from rest_framework import serializers
 from operations.qc_models import QCChecklistItem, JobQCRecord, QCChecklistResponse
+from core.serializers import TenantModelSerializer
 
 
-class QCChecklistItemSerializer(serializers.ModelSerializer):
+class QCChecklistItemSerializer(TenantModelSerializer):
     class Meta:
         model = QCChecklistItem
         fields = ['id', 'name', 'order', 'is_active', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class QCChecklistResponseSerializer(serializers.ModelSerializer):
+class QCChecklistResponseSerializer(TenantModelSerializer):
     item_name = serializers.CharField(source='checklist_item.name', read_only=True)
     
     class Meta:
@@ -18,7 +19,7 @@ class QCChecklistResponseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class JobQCRecordSerializer(serializers.ModelSerializer):
+class JobQCRecordSerializer(TenantModelSerializer):
     responses = QCChecklistResponseSerializer(many=True, read_only=True)
     checked_by_name = serializers.SerializerMethodField()
     
@@ -19,7 +19,7 @@ class QCChecklistItemViewSet(viewsets.ModelViewSet):
     ordering = ['order', 'name']
     
     def get_queryset(self):
-        return QCChecklistItem.objects.filter(tenant=self.request.user.tenant)
+        return QCChecklistItem.objects.all()
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -37,9 +37,7 @@ class JobQCRecordViewSet(viewsets.ModelViewSet):
     filterset_fields = ['job', 'passed']
     
     def get_queryset(self):
-        return JobQCRecord.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('job', 'checked_by').prefetch_related('responses')
+        return JobQCRecord.objects.select_related('job', 'checked_by').prefetch_related('responses')
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant, checked_by=self.request.user)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from operations.models import Job, JobItem, JobTask
+from core.serializers import TenantModelSerializer
 
 
-class JobTaskSerializer(serializers.ModelSerializer):
+class JobTaskSerializer(TenantModelSerializer):
     service_name = serializers.CharField(source='job_item.service.name', read_only=True)
     customer_name = serializers.SerializerMethodField()
     car_info = serializers.SerializerMethodField()
@@ -36,7 +37,7 @@ class JobTaskSerializer(serializers.ModelSerializer):
         return None
 
 
-class JobItemSerializer(serializers.ModelSerializer):
+class JobItemSerializer(TenantModelSerializer):
     service_name = serializers.CharField(source='service.name', read_only=True)
     tasks = JobTaskSerializer(many=True, read_only=True)
     
@@ -46,7 +47,7 @@ class JobItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class JobListSerializer(serializers.ModelSerializer):
+class JobListSerializer(TenantModelSerializer):
     customer_name = serializers.SerializerMethodField()
     car_info = serializers.SerializerMethodField()
     items = JobItemSerializer(many=True, read_only=True)
@@ -71,7 +72,7 @@ class JobListSerializer(serializers.ModelSerializer):
         return sum(item.price for item in obj.items.all())
 
 
-class JobDetailSerializer(serializers.ModelSerializer):
+class JobDetailSerializer(TenantModelSerializer):
     customer_name = serializers.SerializerMethodField()
     car_info = serializers.SerializerMethodField()
     items = JobItemSerializer(many=True, read_only=True)
@@ -1,3 +1,205 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import TenantSequence
+from core.sequences import next_value, reset_blocks
+from customers.models import Car, Customer
+from customers.search import trigram_available
+from operations.models import Visit
+from services import pricing
+from services.models import CarType, Category, Service, ServicePrice
+from tenants.models import Tenant
+from users.models import User
+
+
+class VisitTicketAllocationTests(TransactionTestCase):
+    """Ticket IDs come from the per-tenant sequence, even under parallel check-ins"""
+    CHECK_INS = 300
+    WORKERS = 20
+
+    def setUp(self):
+        cache.clear()
+        reset_blocks()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(
+            username='frontdesk', password='testpass123', tenant=self.tenant, role='FRONT_DESK'
+        )
+
+    def check_in(self, number):
+        try:
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.post('/api/v1/visits/', {
+                'customer_type': 'GUEST',
+                'customer_name': f'Guest {number}',
+                'car_info': 'Toyota Corolla',
+            }, format='json')
+            return response.status_code, response.data.get('ticket_id')
+        finally:
+            connection.close()
+
+    @skipUnless(connection.vendor == 'postgresql', 'SQLite serialises writers with table locks, not row locks')
+    def test_parallel_check_ins_get_unique_gapless_tickets(self):
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self.check_in, range(self.CHECK_INS)))
+
+        self.assertEqual([code for code, _ in results], [201] * self.CHECK_INS)
+        tickets = {ticket for _, ticket in results}
+        self.assertEqual(tickets, {f'V-{number:03d}' for number in range(1, self.CHECK_INS + 1)})
+        self.assertEqual(Visit.objects.filter(tenant=self.tenant).count(), self.CHECK_INS)
+
+    def test_ticket_numbers_are_per_tenant(self):
+        other = Tenant.objects.create(name='Other Car Spa', subdomain='other')
+        first = Visit.objects.create(tenant=self.tenant, customer_type='GUEST', customer_name='A', car_info='Car')
+        second = Visit.objects.create(tenant=other, customer_type='GUEST', customer_name='B', car_info='Car')
+        self.assertEqual(first.ticket_id, 'V-001')
+        self.assertEqual(second.ticket_id, 'V-001')
+
+    def test_block_preallocation_serves_numbers_from_memory(self):
+        values = [next_value(self.tenant.id, 'receipt', block_size=10) for _ in range(25)]
+
+        self.assertEqual(values, list(range(1, 26)))
+        sequence = TenantSequence.objects.get(tenant=self.tenant, name='receipt')
+        self.assertEqual(sequence.last_value, 30)
+
+
+class VisitSearchQueryCountTests(TestCase):
+    """Search results and their vehicles are built from a constant number of queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(
+            username='frontdesk', password='testpass123', tenant=self.tenant, role='FRONT_DESK'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Cached per process after the first call
+        trigram_available()
+
+    def add_customers(self, count, cars_each):
+        start = Customer.objects.count()
+        for number in range(start, start + count):
+            customer = Customer.objects.create(
+                tenant=self.tenant, first_name='Abebe', last_name=f'Kebede{number}',
+                phone_number=f'09110000{number:02d}'
+            )
+            for car_number in range(cars_each):
+                Car.objects.create(
+                    tenant=self.tenant, customer=customer, plate_number=f'AA{number:02d}{car_number:02d}'
+                )
+
+    def search(self, query):
+        response = self.client.get('/api/v1/visits/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_query_count_does_not_grow_with_results(self):
+        self.add_customers(1, cars_each=1)
+        with self.assertNumQueries(2):
+            results = self.search('abebe')
+        self.assertEqual(len(results), 1)
+
+        self.add_customers(24, cars_each=3)
+        with self.assertNumQueries(2):
+            results = self.search('abebe')
+        self.assertEqual(len(results), 20)  # the endpoint returns the top 20
+        self.assertTrue(all(result['vehicles'] for result in results))
+
+    def test_deleted_vehicles_are_excluded(self):
+        self.add_customers(1, cars_each=2)
+        Car.objects.get(plate_number='AA0001').soft_delete()
+
+        results = self.search('abebe')
+
+        self.assertEqual([vehicle['plate_number'] for vehicle in results[0]['vehicles']], ['AA0000'])
+
+
+class VisitAddServicesTests(TestCase):
+    """Attaching services is a fixed number of queries however many are added"""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name='Test Car Spa', subdomain='test')
+        self.user = User.objects.create_user(
+            username='frontdesk', password='testpass123', tenant=self.tenant, role='FRONT_DESK'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(tenant=self.tenant, name='Wash')
+        self.suv = CarType.objects.create(tenant=self.tenant, name='SUV')
+
+    def add_services(self, count):
+        services = []
+        for number in range(count):
+            service = Service.objects.create(
+                tenant=self.tenant, category=self.category, name=f'Service {number}',
+                price=Decimal('10.00'), duration_minutes=30
+            )
+            ServicePrice.objects.create(tenant=self.tenant, service=service, car_type=self.suv, price=Decimal('15.00'))
+            services.append(service)
+        return services
+
+    def new_visit(self):
+        return Visit.objects.create(
+            tenant=self.tenant, customer_type='GUEST', customer_name='Guest', car_info='Car', car_type='suv'
+        )
+
+    def attach(self, visit, services):
+        response = self.client.post(
+            f'/api/v1/visits/{visit.id}/add_services/',
+            {'service_ids': [service.id for service in services]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_does_not_grow_with_services(self):
+        few = self.add_services(1)
+        many = self.add_services(10)
+
+        first, second = self.new_visit(), self.new_visit()
+        # Build the cached pricing matrix outside the measured requests
+        pricing.get_matrix(self.tenant.id)
+
+        with CaptureQueriesContext(connection) as one_service:
+            self.attach(first, few)
+        with CaptureQueriesContext(connection) as ten_services:
+            self.attach(second, many)
+
+        self.assertEqual(len(ten_services.captured_queries), len(one_service.captured_queries))
+
+    def test_car_type_prices_and_totals(self):
+        services = self.add_services(2)
+        plain = Service.objects.create(
+            tenant=self.tenant, category=self.category, name='Plain', price=Decimal('20.00'), duration_minutes=30
+        )
+        visit = self.new_visit()
+        self.attach(visit, services[:1])
+
+        data = self.attach(visit, services + [plain])
+
+        self.assertEqual(sorted(item['price'] for item in data['services']), ['15.00', '15.00', '20.00'])
+        visit.refresh_from_db()
+        self.assertEqual(visit.subtotal, Decimal('50.00'))
+        self.assertEqual(visit.total, Decimal('57.50'))
+        self.assertEqual(data['total'], '57.50')
+
+    def test_service_missing_from_cached_matrix_is_priced(self):
+        pricing.get_matrix(self.tenant.id)
+        # bulk_create skips the signals that retire the matrix, as a write
+        # whose invalidation has not reached this worker would
+        service = Service.objects.bulk_create([Service(
+            tenant=self.tenant, category=self.category, name='New', price=Decimal('25.00'), duration_minutes=30
+        )])[0]
+
+        data = self.attach(self.new_visit(), [service])
+
+        self.assertEqual([item['price'] for item in data['services']], ['25.00'])
@@ -27,9 +27,7 @@ class JobViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return Job.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('customer', 'car').prefetch_related('items__service', 'items__tasks')
+        return Job.objects.select_related('customer', 'car').prefetch_related('items__service', 'items__tasks')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -50,26 +48,20 @@ class JobViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def add_item(self, request, pk=None):
         """Add a service to this job"""
-        from services.models import Service, ServicePrice
+        from services.models import Service
+        from services import pricing
         
         job = self.get_object()
         service_id = request.data.get('service_id')
         
         try:
             service = Service.objects.get(id=service_id, tenant=request.user.tenant)
-        except Service.DoesNotExist:
+        except (Service.DoesNotExist, ValueError, TypeError):
             return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Get price based on car type
+        # Get price based on car type (falls back to the service's base price)
         car_type = job.car.car_type if hasattr(job.car, 'car_type') else None
-        price = service.price  # Default
-        
-        if car_type:
-            try:
-                service_price = ServicePrice.objects.get(service=service, car_type=car_type)
-                price = service_price.price
-            except ServicePrice.DoesNotExist:
-                pass
+        price = pricing.resolve(request.user.tenant.id, [service.id], car_type)[service.id].price
         
         # Create job item
         job_item = JobItem.objects.create(
@@ -193,9 +185,7 @@ class JobTaskViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return JobTask.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('job_item__job__customer', 'job_item__job__car', 'job_item__service', 'staff')
+        return JobTask.objects.select_related('job_item__job__customer', 'job_item__job__car', 'job_item__service', 'staff')
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
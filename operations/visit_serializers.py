@@ -2,9 +2,10 @@ from rest_framework import serializers
 from operations.models import Visit, VisitService
 from customers.models import Customer, Car
 from services.models import Service
+from core.serializers import TenantModelSerializer
 
 
-class VisitServiceSerializer(serializers.ModelSerializer):
+class VisitServiceSerializer(TenantModelSerializer):
     """Serializer for services within a visit"""
     service_name = serializers.CharField(source='service.name', read_only=True)
     
@@ -14,7 +15,7 @@ class VisitServiceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class VisitListSerializer(serializers.ModelSerializer):
+class VisitListSerializer(TenantModelSerializer):
     """Serializer for visit list view (queue)"""
     services = VisitServiceSerializer(source='visit_services', many=True, read_only=True)
     
@@ -29,7 +30,7 @@ class VisitListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'ticket_id', 'checked_in_at']
 
 
-class VisitDetailSerializer(serializers.ModelSerializer):
+class VisitDetailSerializer(TenantModelSerializer):
     """Serializer for visit detail view"""
     services = VisitServiceSerializer(source='visit_services', many=True, read_only=True)
     
@@ -46,7 +47,7 @@ class VisitDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'ticket_id', 'checked_in_at', 'created_at', 'updated_at']
 
 
-class VisitCreateSerializer(serializers.ModelSerializer):
+class VisitCreateSerializer(TenantModelSerializer):
     """Serializer for creating visits"""
     
     class Meta:
@@ -101,7 +102,7 @@ class SearchResultSerializer(serializers.Serializer):
     vehicles = serializers.ListField(child=serializers.DictField())
 
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(TenantModelSerializer):
     """Serializer for vehicle in search results"""
     make_name = serializers.SerializerMethodField()
     model_name = serializers.SerializerMethodField()
@@ -3,15 +3,22 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch
 from operations.models import Visit, VisitService
 from operations.visit_serializers import (
     VisitListSerializer, VisitDetailSerializer, VisitCreateSerializer,
-    SearchResultSerializer, VehicleSerializer, AddServicesSerializer,
+    VisitServiceSerializer, SearchResultSerializer, VehicleSerializer, AddServicesSerializer,
     ProcessPaymentSerializer, ConvertToCustomerSerializer, LinkCustomerSerializer
 )
 from customers.models import Customer, Car
+from customers.search import search_customers
 from services.models import Service
+from services import pricing
+
+# Customers returned by visit search. The search used to return up to 10
+# name/phone hits plus up to 10 more plate hits; the ranked list keeps that cap.
+SEARCH_RESULT_LIMIT = 20
 
 
 class VisitViewSet(viewsets.ModelViewSet):
@@ -35,9 +42,7 @@ class VisitViewSet(viewsets.ModelViewSet):
     ordering = ['-checked_in_at']
     
     def get_queryset(self):
-        return Visit.objects.filter(
-            tenant=self.request.user.tenant
-        ).select_related('customer', 'car').prefetch_related('visit_services__service')
+        return Visit.objects.select_related('customer', 'car').prefetch_related('visit_services__service')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -60,55 +65,26 @@ class VisitViewSet(viewsets.ModelViewSet):
         if not query:
             return Response({'results': []})
         
-        # Search customers by phone or name
-        customers = Customer.objects.filter(
-            tenant=request.user.tenant
-        ).filter(
-            Q(phone_number__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        ).prefetch_related('cars').distinct()[:10]
-        
-        # Also search by plate number
-        cars_by_plate = Car.objects.filter(
-            tenant=request.user.tenant,
-            plate_number__icontains=query,
-            is_deleted=False
-        ).select_related('customer').distinct()[:10]
-        
-        # Combine results
-        customer_ids = set()
-        results = []
-        
-        # Add customers from direct search
-        for customer in customers:
-            if customer.id not in customer_ids:
-                customer_ids.add(customer.id)
-                vehicles = VehicleSerializer(
-                    customer.cars.filter(is_deleted=False),
-                    many=True
-                ).data
-                results.append({
-                    'customer_id': customer.id,
-                    'customer_name': f"{customer.first_name} {customer.last_name}",
-                    'phone': customer.phone_number,
-                    'vehicles': vehicles
-                })
-        
-        # Add customers from plate search
-        for car in cars_by_plate:
-            if car.customer.id not in customer_ids:
-                customer_ids.add(car.customer.id)
-                vehicles = VehicleSerializer(
-                    car.customer.cars.filter(is_deleted=False),
-                    many=True
-                ).data
-                results.append({
-                    'customer_id': car.customer.id,
-                    'customer_name': f"{car.customer.first_name} {car.customer.last_name}",
-                    'phone': car.customer.phone_number,
-                    'vehicles': vehicles
-                })
+        # Phone, name and plate hits all come ranked from the customer search document;
+        # active vehicles for every hit are fetched in one batched query
+        active_cars = Prefetch(
+            'cars',
+            queryset=Car.objects.filter(is_deleted=False).select_related('make', 'model'),
+            to_attr='active_cars'
+        )
+        customers = search_customers(
+            Customer.objects.filter(tenant=request.user.tenant), query
+        ).prefetch_related(active_cars)[:SEARCH_RESULT_LIMIT]
+        
+        results = [
+            {
+                'customer_id': customer.id,
+                'customer_name': f"{customer.first_name} {customer.last_name}",
+                'phone': customer.phone_number,
+                'vehicles': VehicleSerializer(customer.active_cars, many=True).data
+            }
+            for customer in customers
+        ]
         
         return Response({'results': results})
     
@@ -119,60 +95,49 @@ class VisitViewSet(viewsets.ModelViewSet):
         serializer = AddServicesSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        service_ids = serializer.validated_data['service_ids']
+        service_ids = set(serializer.validated_data['service_ids'])
         
         # Get services
-        services = Service.objects.filter(
+        services = list(Service.objects.filter(
             id__in=service_ids,
             tenant=request.user.tenant
-        )
+        ))
         
-        if services.count() != len(service_ids):
+        if len(services) != len(service_ids):
             return Response(
                 {'error': 'One or more services not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Add services to visit
-        for service in services:
-            # Check if already added
-            if VisitService.objects.filter(visit=visit, service=service).exists():
-                continue
-            
-            # Determine price based on car type
-            price = service.price
-            if visit.car_type:
-                from services.models import ServicePrice
-                try:
-                    # Use filter().first() to avoid MultipleObjectsReturned and Handle Case Sensitivity
-                    service_price = ServicePrice.objects.filter(
-                        service=service,
-                        car_type__name__iexact=visit.car_type
-                    ).first()
-                    
-                    if service_price:
-                        price = service_price.price
-                except Exception as e:
-                    print(f"Error finding price: {e}")
-                    pass
-            
-            # Create visit service
-            VisitService.objects.create(
+        # Existing rows come from the prefetch in get_queryset
+        visit_services = list(visit.visit_services.all())
+        attached = {vs.service_id for vs in visit_services}
+        new_services = [service for service in services if service.id not in attached]
+        
+        # Car-type prices for all new services from the cached pricing matrix
+        prices = pricing.resolve(request.user.tenant.id, [service.id for service in new_services], visit.car_type)
+        
+        new_visit_services = [
+            VisitService(
                 tenant=request.user.tenant,
                 visit=visit,
                 service=service,
-                price=price,
+                # Deleted since it was loaded above: charge the base price it was loaded with
+                price=prices[service.id].price if service.id in prices else service.price,
                 is_addon=False  # Can be enhanced to detect add-ons
             )
+            for service in sorted(new_services, key=lambda service: service.id)
+        ]
         
-        # Recalculate totals
-        # Refresh from db to clear prefetch_related cache and see new services
-        visit.refresh_from_db()
-        visit.calculate_totals()
+        with transaction.atomic():
+            VisitService.objects.bulk_create(new_visit_services)
+            visit_services.extend(new_visit_services)
+            visit.calculate_totals(visit_services)
         
         # Return updated visit
-        serializer = VisitDetailSerializer(visit)
-        return Response(serializer.data)
+        data = VisitDetailSerializer(visit).data
+        data['services'] = VisitServiceSerializer(visit_services, many=True).data
+        return Response(data)
     
     @action(detail=True, methods=['post'])
     def process_payment(self, request, pk=None):
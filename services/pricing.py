@@ -0,0 +1,190 @@
+"""
+Per-tenant pricing matrix (Service x CarType).
+
+The whole matrix of a tenant -- base price/duration per service and the
+ServicePrice overrides per car type -- is built in three queries and kept
+in two layers:
+
+- the Django cache, shared by all workers (settings require REDIS_URL in
+  production), keyed by the tenant's current version token, so every
+  worker reuses one build;
+- an in-process copy, reused while the version token is unchanged.
+
+Writes to Service, ServicePrice and CarType (services.signals) replace the
+version token, so every layer rebuilds on the next read. Writes that skip
+the signals (bulk_create, queryset updates) are caught by ``resolve`` and
+``service_names``, which rebuild when asked for a service the matrix does
+not know.
+"""
+import uuid
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+ResolvedPrice = namedtuple('ResolvedPrice', ['price', 'duration_minutes', 'car_type_id'])
+
+_local_matrices = {}
+
+
+def _version_key(tenant_id):
+    return f'pricing:version:{tenant_id}'
+
+
+def _matrix_key(tenant_id, version):
+    return f'pricing:matrix:{tenant_id}:{version}'
+
+
+def current_version(tenant_id):
+    """Version token of the tenant's matrix, created if the cache has none"""
+    key = _version_key(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, CACHE_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(tenant_id):
+    """
+    Retire the tenant's cached matrix. The token is replaced right away (so
+    this connection sees its own writes) and again on commit (so a matrix
+    built by another worker from pre-commit data is not reused).
+    """
+    def bump():
+        cache.set(_version_key(tenant_id), uuid.uuid4().hex, CACHE_TIMEOUT)
+        _local_matrices.pop(tenant_id, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def build_matrix(tenant_id):
+    """Load the tenant's full pricing matrix from the database"""
+    from services.models import CarType, Service, ServicePrice
+
+    services = {
+        service_id: {'name': name, 'price': price, 'duration_minutes': duration}
+        for service_id, name, price, duration in Service.objects.filter(
+            tenant_id=tenant_id
+        ).values_list('id', 'name', 'price', 'duration_minutes')
+    }
+    car_types = dict(CarType.objects.filter(tenant_id=tenant_id).values_list('id', 'name'))
+    overrides = {}
+    for service_id, car_type_id, price, duration in ServicePrice.objects.filter(
+        tenant_id=tenant_id
+    ).values_list('service_id', 'car_type_id', 'price', 'duration_minutes'):
+        overrides[(service_id, car_type_id)] = (price, duration)
+
+    # Case-insensitive name lookup; the first car type wins when names collide
+    car_types_by_name = {}
+    for car_type_id in sorted(car_types):
+        car_types_by_name.setdefault(car_types[car_type_id].lower(), car_type_id)
+
+    return {
+        'services': services,
+        'car_types': car_types,
+        'car_types_by_name': car_types_by_name,
+        'overrides': overrides,
+    }
+
+
+def get_matrix(tenant_id, rebuild=False):
+    """The tenant's matrix from the cache layers; ``rebuild`` skips them and reloads it"""
+    version = current_version(tenant_id)
+    local = _local_matrices.get(tenant_id)
+    if not rebuild and local is not None and local[0] == version:
+        return local[1]
+
+    key = _matrix_key(tenant_id, version)
+    matrix = None if rebuild else cache.get(key)
+    if matrix is None:
+        matrix = build_matrix(tenant_id)
+        cache.set(key, matrix, CACHE_TIMEOUT)
+    _local_matrices[tenant_id] = (version, matrix)
+    return matrix
+
+
+def car_type_id_for(matrix, car_type):
+    """
+    Normalize ``car_type`` -- a CarType, its id, or a name such as Car.car_type
+    ('SUV') matched case-insensitively -- to a CarType id of the matrix.
+    """
+    if car_type is None or car_type == '':
+        return None
+    if hasattr(car_type, 'pk'):
+        return car_type.pk
+    if isinstance(car_type, int):
+        return car_type if car_type in matrix['car_types'] else None
+    return matrix['car_types_by_name'].get(str(car_type).lower())
+
+
+def resolve(tenant_id, service_ids, car_type=None):
+    """
+    Price and duration of each service for a car type.
+
+    Returns ``{service_id: ResolvedPrice}``; the car type's ServicePrice
+    override wins, otherwise the service's base price and duration. Ids that
+    do not belong to the tenant are left out.
+    """
+    matrix = get_matrix(tenant_id)
+    if any(service_id not in matrix['services'] for service_id in service_ids):
+        # Created since the matrix was built without its invalidation reaching us
+        matrix = get_matrix(tenant_id, rebuild=True)
+    car_type_id = car_type_id_for(matrix, car_type)
+    resolved = {}
+    for service_id in service_ids:
+        service = matrix['services'].get(service_id)
+        if service is None:
+            continue
+        override = matrix['overrides'].get((service_id, car_type_id))
+        if override is None:
+            resolved[service_id] = ResolvedPrice(service['price'], service['duration_minutes'], None)
+        else:
+            price, duration = override
+            resolved[service_id] = ResolvedPrice(
+                price, duration if duration is not None else service['duration_minutes'], car_type_id
+            )
+    return resolved
+
+
+def service_names(tenant_id, service_ids=()):
+    """
+    ``{service_id: name}`` for the tenant, from the cached matrix. Like
+    ``resolve``, rebuilds the matrix when one of ``service_ids`` is missing.
+    """
+    matrix = get_matrix(tenant_id)
+    if any(service_id not in matrix['services'] for service_id in service_ids):
+        matrix = get_matrix(tenant_id, rebuild=True)
+    return {service_id: service['name'] for service_id, service in matrix['services'].items()}
+
+
+def price_matrix(tenant_id):
+    """The tenant's matrix in the shape served by GET /services/price-matrix/"""
+    version = current_version(tenant_id)
+    matrix = get_matrix(tenant_id)
+    pricing = {}
+    for (service_id, car_type_id), (price, duration) in sorted(matrix['overrides'].items()):
+        pricing.setdefault(service_id, {})[car_type_id] = {
+            'price': price,
+            'duration_minutes': duration if duration is not None else matrix['services'][service_id]['duration_minutes'],
+        }
+    return {
+        'version': version,
+        'car_types': [
+            {'id': car_type_id, 'name': name}
+            for car_type_id, name in sorted(matrix['car_types'].items())
+        ],
+        'services': [
+            {
+                'id': service_id,
+                'name': service['name'],
+                'base_price': service['price'],
+                'base_duration': service['duration_minutes'],
+                'car_type_pricing': pricing.get(service_id, {}),
+            }
+            for service_id, service in sorted(matrix['services'].items())
+        ],
+    }
@@ -1,22 +1,23 @@
 from rest_framework import serializers
 from services.models import Service, Category, CarType, ServicePrice
+from core.serializers import TenantModelSerializer
 
 
-class CarTypeSerializer(serializers.ModelSerializer):
+class CarTypeSerializer(TenantModelSerializer):
     class Meta:
         model = CarType
         fields = ['id', 'name', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TenantModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ServicePriceSerializer(serializers.ModelSerializer):
+class ServicePriceSerializer(TenantModelSerializer):
     car_type_name = serializers.CharField(source='car_type.name', read_only=True)
     
     class Meta:
@@ -25,7 +26,7 @@ class ServicePriceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class ServiceListSerializer(serializers.ModelSerializer):
+class ServiceListSerializer(TenantModelSerializer):
     """Lightweight serializer for list views"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     image_url = serializers.SerializerMethodField()
@@ -43,7 +44,7 @@ class ServiceListSerializer(serializers.ModelSerializer):
         return None
 
 
-class ServiceDetailSerializer(serializers.ModelSerializer):
+class ServiceDetailSerializer(TenantModelSerializer):
     """Detailed serializer with pricing for all car types"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     prices = ServicePriceSerializer(many=True, read_only=True)
